@@ -3,20 +3,212 @@
 # ------------------------------------------------------------------------------------------------------------------ #
 
 
+import json
 import os
 import sys
-from typing import List
-
-from compiler.assembler import Assembler
+from typing import Optional, Tuple, Dict
 
 
 def _assembler_stderr(warning: str, message: str) -> None:
     print(f'[Assembler] ({warning}): {message}', file=sys.stderr)
 
 
-def _bin_loader(path_to_bin_file: str) -> List[str]:
-    with open(path_to_bin_file, 'r') as file:
-        return list(map(lambda line: line.replace('\n', ''), file.readlines()))
+def _pop_flag(flag: str) -> bool:
+    if flag in sys.argv:
+        sys.argv.pop(sys.argv.index(flag))
+        return True
+    return False
+
+
+def _pop_option(option: str) -> Optional[str]:
+    if option not in sys.argv:
+        return None
+    index = sys.argv.index(option)
+    sys.argv.pop(index)
+    try:
+        return sys.argv.pop(index)
+    except IndexError:
+        raise ValueError(f'Missing value for "{option}"')
+
+
+def _pop_int_option(option: str, default: Optional[int] = None, minimum: int = 0) -> Optional[int]:
+    value = _pop_option(option)
+    if value is None:
+        return default
+    try:
+        integer = int(value)
+    except ValueError:
+        raise ValueError(f'"{option}" expects a number, not "{value}"')
+    if integer < minimum:
+        raise ValueError(f'"{option}" must be at least {minimum}')
+    return integer
+
+
+def _pop_assembler_options() -> Dict[str, object]:
+    return {
+        'optimize': _pop_flag('-optimize'),
+        'compact_encoding': _pop_flag('-compact'),
+        'ram_size_in_bytes': _pop_int_option('-ram', 256, minimum=1),
+    }
+
+
+def _pop_job_options() -> Tuple[Optional[int], int, Optional[str]]:
+    jobs = _pop_int_option('-jobs', minimum=1)
+    max_cycles = _pop_int_option('-max-cycles', 0)
+    output_folder = _pop_option('-out')
+    return jobs, max_cycles, output_folder
+
+
+def _batch_main(should_also_run: bool, assembler_options: Dict[str, object]) -> int:
+    from runner.batch import process_files
+    from runner.paths import expand_paths
+
+    try:
+        jobs, max_cycles, output_folder = _pop_job_options()
+    except ValueError as err:
+        _assembler_stderr('Error', str(err))
+        return 2
+
+    paths = expand_paths(sys.argv[1:])
+    if not paths:
+        _assembler_stderr('Error', 'No files to assemble')
+        return 2
+
+    failures = 0
+    for result in process_files(paths, output_folder, should_also_run, max_cycles, jobs, assembler_options):
+        failures += result['status'] != 'ok'
+        print(json.dumps(result), flush=True)
+    return 1 if failures else 0
+
+
+def _connect_main(socket_path: str, should_also_run: bool, assembler_options: Dict[str, object]) -> int:
+    from runner.client import DaemonClient
+    from runner.paths import expand_paths
+
+    try:
+        jobs, max_cycles, output_folder = _pop_job_options()
+    except ValueError as err:
+        _assembler_stderr('Error', str(err))
+        return 2
+
+    requests = []
+    for path in expand_paths(sys.argv[1:]):
+        operation = 'run' if path.endswith('.bin') else 'assemble_and_run' if should_also_run else 'assemble'
+        request = {
+            'op': operation, 'path': os.path.abspath(path), 'max_cycles': max_cycles, 'options': assembler_options
+        }
+        if output_folder is not None:
+            request['output'] = os.path.abspath(output_folder)
+        requests.append(request)
+
+    if not requests:
+        _assembler_stderr('Error', 'No files to assemble')
+        return 2
+
+    failures = 0
+    with DaemonClient(socket_path) as client:
+        for response in client.requests(requests):
+            failures += response['status'] != 'ok'
+            print(json.dumps(response), flush=True)
+    return 1 if failures else 0
+
+
+def _watch_main(should_also_run: bool, assembler_options: Dict[str, object]) -> int:
+    from runner.paths import expand_paths
+    from runner.watch import WatchSession
+
+    reset_registers = _pop_flag('-reset-registers')
+    try:
+        output_folder = _pop_option('-out')
+    except ValueError as err:
+        _assembler_stderr('Error', str(err))
+        return 2
+    paths = sys.argv[1:]
+    assembly_files = [path for path in expand_paths(paths) if path.endswith('.asm')]
+    if not assembly_files:
+        _assembler_stderr('Error', 'No files to watch')
+        return 2
+
+    session = WatchSession(
+        paths,
+        output_folder=output_folder,
+        assembler_options=assembler_options,
+        run_path=assembly_files[0] if should_also_run else None,
+        reset_registers=reset_registers,
+    )
+    try:
+        session.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+DEVICES = ('console', 'interrupts')
+
+
+def _pop_device_options() -> Dict[str, Optional[int]]:
+    """Addresses to map devices at when running, None for the devices that are left out."""
+    return {device: _pop_int_option(f'-{device}') for device in DEVICES}
+
+
+def _run_image_file(
+        path_to_bin_file: str,
+        compact_encoding: bool = False,
+        device_options: Optional[Dict[str, Optional[int]]] = None,
+        core_count: int = 1
+):
+    from computer.computer import Computer
+    from computer.devices import ConsoleDevice
+    from computer.multicore import MultiCoreComputer
+    from computer.source_map import SourceMap
+    from runner.batch import load_bin_file
+    image = load_bin_file(path_to_bin_file)
+    computer_options = {
+        'source_map': SourceMap.load_for_image(path_to_bin_file),
+        'compact_encoding': compact_encoding,
+        'ram_size_in_bytes': len(image),
+    }
+    computer = MultiCoreComputer(core_count, **computer_options) if core_count > 1 else Computer(**computer_options)
+    computer.ram.from_list(image)
+    device_options = device_options or {}
+    if device_options.get('console') is not None:
+        computer.map_device(device_options['console'], ConsoleDevice())
+    if device_options.get('interrupts') is not None:
+        # the vector table, then a timer right after it
+        interrupt_controller = computer.map_interrupt_controller(device_options['interrupts'])
+        computer.map_timer(device_options['interrupts'] + interrupt_controller.size_in_bytes)
+    computer.run()
+    computer.status()
+
+
+def _link_main(
+        output_file_path: str,
+        should_also_run: bool,
+        assembler_options: Dict[str, object],
+        device_options: Optional[Dict[str, Optional[int]]] = None,
+        core_count: int = 1
+) -> int:
+    from compiler.errors import CompilerError
+    from compiler.linker import Linker, load_object
+
+    paths = sys.argv[1:]
+    if not paths:
+        _assembler_stderr('Error', 'No files to link')
+        return 2
+
+    try:
+        linker = Linker(
+            [load_object(path, **assembler_options) for path in paths],
+            ram_size_in_bytes=assembler_options['ram_size_in_bytes']
+        )
+        linker.write(output_file_path)
+    except (CompilerError, OSError) as err:
+        _assembler_stderr('Error', str(err))
+        return 1
+
+    if should_also_run:
+        _run_image_file(output_file_path, assembler_options['compact_encoding'], device_options, core_count)
+    return 0
 
 
 def _main():
@@ -24,11 +216,53 @@ def _main():
         return _assembler_stderr('Error', 'This is a command line interface. Please run it with the necessary arguments'
                                           '. example: "python3 asm-cli.py my_script.asm"')
 
-    should_also_run = False
+    should_also_run = _pop_flag('-run')
+    should_batch = _pop_flag('-batch')
+    should_watch = _pop_flag('-watch')
+    try:
+        assembler_options = _pop_assembler_options()
+        device_options = _pop_device_options()
+        core_count = _pop_int_option('-cores', 1, minimum=1)
+        daemon_socket_path = _pop_option('-daemon')
+        connect_socket_path = _pop_option('-connect')
+        link_output_path = _pop_option('-link')
+    except ValueError as err:
+        _assembler_stderr('Error', str(err))
+        sys.exit(2)
+
+    # batch, watch and daemon runs use plain computers, so these would silently make programs behave differently
+    if should_batch or should_watch or daemon_socket_path is not None or connect_socket_path is not None:
+        machine_options = [f'-{device}' for device in DEVICES if device_options[device] is not None]
+        if core_count > 1:
+            machine_options.append('-cores')
+        if machine_options:
+            _assembler_stderr(
+                'Error', f'{", ".join(machine_options)} can only be used to run a single file or linked objects'
+            )
+            sys.exit(2)
+
+    if should_batch:
+        sys.exit(_batch_main(should_also_run, assembler_options))
+
+    if should_watch:
+        sys.exit(_watch_main(should_also_run, assembler_options))
 
-    if '-run' in sys.argv:
-        sys.argv.pop(sys.argv.index('-run'))
-        should_also_run = True
+    if daemon_socket_path is not None:
+        from runner.daemon import serve
+        return serve(daemon_socket_path)
+
+    if connect_socket_path is not None:
+        sys.exit(_connect_main(connect_socket_path, should_also_run, assembler_options))
+
+    if link_output_path is not None:
+        sys.exit(_link_main(link_output_path, should_also_run, assembler_options, device_options, core_count))
+
+    from compiler.assembler import Assembler
+    from runner.batch import load_bin_file
+
+    should_report = _pop_flag('-report')
+    should_disassemble = _pop_flag('-disasm')
+    should_write_object = _pop_flag('-object')
 
     try:
         assembly_file_path = sys.argv[1]
@@ -36,7 +270,7 @@ def _main():
         return _assembler_stderr('Error', 'Missing "file_path" parameter')
 
     if not os.path.isfile(assembly_file_path):
-        assembly_file_path = f'{os.getcwd()}\\{assembly_file_path}'
+        assembly_file_path = os.path.join(os.getcwd(), assembly_file_path)
         if not os.path.isfile(assembly_file_path):
             return _assembler_stderr('Error', f'file "{assembly_file_path}" does not exist')
 
@@ -53,7 +287,29 @@ def _main():
             _assembler_stderr('Warning', 'output_folder not set. Using the current assembly script folder as '
                                          'the output folder')
 
-        asm = Assembler(path_to_assembly_file=assembly_file_path, output_path=output_folder)
+        if should_write_object:
+            from compiler.object_file import ObjectFile, assemble_object
+            object_file = assemble_object(assembly_file_path, **assembler_options)
+            return object_file.save(ObjectFile.path_for_source(assembly_file_path, output_folder))
+
+        # each core gets a stack of its own
+        from compiler.optimizer import DEFAULT_STACK_SIZE_IN_BYTES
+        asm = Assembler(
+            path_to_assembly_file=assembly_file_path,
+            output_path=output_folder,
+            stack_size_in_bytes=core_count * DEFAULT_STACK_SIZE_IN_BYTES,
+            **assembler_options
+        )
+        if should_report:
+            from compiler.analysis import CostEstimator
+            return print(CostEstimator(asm).report())
+        if should_disassemble:
+            from compiler.disassembler import Disassembler
+            disassembler = Disassembler(
+                asm.get_source_map(), asm.operation_compiler.compact_encoding, asm.ram_size_in_bytes
+            )
+            return print(disassembler.listing(asm.assemble()))
+
         output_file_path = asm.compile()
 
     else:
@@ -61,13 +317,17 @@ def _main():
             return _assembler_stderr('Error', 'Wrong file format. It should end with ".bin"')
 
         output_file_path = assembly_file_path
+        if should_disassemble:
+            from compiler.disassembler import Disassembler
+            from computer.source_map import SourceMap
+            image = load_bin_file(output_file_path)
+            disassembler = Disassembler(
+                SourceMap.load_for_image(output_file_path), assembler_options['compact_encoding'], len(image)
+            )
+            return print(disassembler.listing(image))
 
     if should_also_run or run_only:
-        from computer.computer import Computer
-        computer = Computer()
-        computer.ram.from_list(_bin_loader(output_file_path))
-        computer.run()
-        computer.status()
+        _run_image_file(output_file_path, assembler_options['compact_encoding'], device_options, core_count)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,381 @@
+from math import ceil
+from typing import Dict, List, Optional, Set
+
+from computer import isa
+from .assembler import Assembler
+from .optimizer import BLOCK_OPERATIONS, JUMP_OPERATIONS, RETURN_OPERATIONS, register_usage
+
+TEXT_SECTION = '.text'
+
+DEFAULT_CYCLE_COST = 1
+CYCLE_COSTS: Dict[str, int] = isa.CYCLE_COSTS
+
+
+def get_statement_address(statement: Optional[str]) -> Optional[int]:
+    """Turns an assembled operand (`$n` or an 8 bit binary string) into an integer address."""
+    if statement is None:
+        return None
+    if statement.startswith('$'):
+        try:
+            return int(statement[1:])
+        except ValueError:
+            return None
+    try:
+        return int(statement, 2)
+    except ValueError:
+        return None
+
+
+class CostEstimator:
+    """Static cycle-cost estimation of an assembled program, without running it.
+
+    Builds the control-flow graph of `.text` and of every subroutine, finds the loops through dominators and assumes
+    each loop runs `loop_iterations` times. Calls cost the whole estimated cost of the called subroutine.
+
+    `memcpy` and `memset` cost what the DMA unit takes for `cx` bytes (see `DirectMemoryAccessController`) when an
+    `ldi cx` earlier in the same basic block gives the length. Otherwise only the DMA setup is counted, and the report
+    lists them as variable cost.
+    """
+
+    def __init__(
+            self,
+            assembler: Assembler,
+            loop_iterations: int = 10,
+            dma_setup_cycles: int = 1,
+            dma_bytes_per_cycle: int = 4
+    ):
+        self.assembler = assembler
+        self.loop_iterations = loop_iterations
+        self.dma_setup_cycles = dma_setup_cycles
+        self.dma_bytes_per_cycle = dma_bytes_per_cycle
+
+        self.program = self._get_program()
+        self.entries = {TEXT_SECTION: 0}
+        for subroutine in assembler.subroutines:
+            self.entries[subroutine['label']] = int(subroutine['ram_address'], 2)
+
+        self.blocks = self._get_basic_blocks()
+        for owner in self.entries:
+            self._set_loop_depths(owner)
+        self.function_frequencies = self._get_function_frequencies()
+
+    def _get_program(self) -> Dict[int, Dict]:
+        """Every instruction by address, with the function it belongs to and its size in bytes."""
+        program = {}
+        get_size = self.assembler.operation_compiler.get_instruction_size
+        address = 0
+        for instruction in self.assembler.instructions:
+            program[address] = {**instruction, 'owner': TEXT_SECTION, 'size': get_size(instruction)}
+            address += program[address]['size']
+        for subroutine in self.assembler.subroutines:
+            address = int(subroutine['ram_address'], 2)
+            for line in subroutine['lines']:
+                program[address] = {**line, 'owner': subroutine['label'], 'size': get_size(line)}
+                address += program[address]['size']
+        return program
+
+    def _get_next_address(self, address: int) -> int:
+        return address + self.program[address]['size']
+
+    def cycle_cost(self, instruction: Dict) -> int:
+        cost = CYCLE_COSTS.get(instruction['operation'], DEFAULT_CYCLE_COST)
+        if instruction['operation'] not in BLOCK_OPERATIONS:
+            return cost
+        # the CPU stalls until the transfer is done
+        length = instruction.get('block_length')
+        transfer_cycles = ceil(length / self.dma_bytes_per_cycle) if length is not None else 0
+        return cost + self.dma_setup_cycles + transfer_cycles - 1
+
+    def _get_immediate_value(self, instruction: Dict) -> Optional[int]:
+        """The constant of an `ldi`, a decimal number or an address the assembler resolved to a binary string."""
+        value = instruction['second_statement']
+        if value is None:
+            return None
+        operation_compiler = self.assembler.operation_compiler
+        address_size_in_bits = 8 * operation_compiler.address_size_in_bytes
+        if len(value) in (8, address_size_in_bits) and operation_compiler.is_binary_string(value):
+            return int(value, 2)
+        try:
+            return int(value)
+        except ValueError:
+            return None
+
+    def _set_block_lengths(self, addresses: List[int]):
+        """Gives each `memcpy`/`memset` of a basic block the length in `cx` when an `ldi cx` before it sets it."""
+        length: Optional[int] = None
+        for address in addresses:
+            instruction = self.program[address]
+            if instruction['operation'] in BLOCK_OPERATIONS:
+                instruction['block_length'] = length
+            elif instruction['operation'] == 'ldi' and instruction['first_statement'] == 'cx':
+                length = self._get_immediate_value(instruction)
+            elif instruction['operation'] == 'call' or 'cx' in register_usage(instruction)[1]:
+                length = None
+
+    def variable_cost_addresses(self) -> List[int]:
+        """`memcpy`s and `memset`s whose length is not known, so only their DMA setup is counted."""
+        return [
+            address for address, instruction in sorted(self.program.items())
+            if instruction['operation'] in BLOCK_OPERATIONS and instruction.get('block_length') is None
+        ]
+
+    def _get_target(self, instruction: Dict) -> Optional[int]:
+        address = get_statement_address(instruction['first_statement'])
+        return address if address in self.program else None
+
+    def _get_leaders(self) -> Set[int]:
+        leaders = set(self.entries.values())
+        for address, instruction in self.program.items():
+            if instruction['operation'] in JUMP_OPERATIONS:
+                leaders.add(self._get_next_address(address))
+                target = self._get_target(instruction)
+                if target is not None:
+                    leaders.add(target)
+            elif instruction['operation'] in RETURN_OPERATIONS:
+                leaders.add(self._get_next_address(address))
+        return leaders
+
+    def _get_basic_blocks(self) -> Dict[int, Dict]:
+        leaders = self._get_leaders()
+        blocks: Dict[int, Dict] = {}
+        for start in sorted(leaders):
+            if start not in self.program:
+                continue
+            addresses = [start]
+            while True:
+                instruction = self.program[addresses[-1]]
+                next_address = self._get_next_address(addresses[-1])
+                if instruction['operation'] in JUMP_OPERATIONS + RETURN_OPERATIONS:
+                    break
+                if next_address not in self.program or next_address in leaders:
+                    break
+                addresses.append(next_address)
+
+            last_instruction = self.program[addresses[-1]]
+            successors = []
+            if last_instruction['operation'] in JUMP_OPERATIONS:
+                target = self._get_target(last_instruction)
+                if target is not None:
+                    successors.append(target)
+            if last_instruction['operation'] not in ('jmp',) + RETURN_OPERATIONS:
+                next_address = self._get_next_address(addresses[-1])
+                if next_address in self.program:
+                    successors.append(next_address)
+
+            self._set_block_lengths(addresses)
+            blocks[start] = {
+                'start': start,
+                'addresses': addresses,
+                'owner': self.program[start]['owner'],
+                'successors': successors,
+                'calls': [
+                    self.program[address]['first_statement'] for address in addresses
+                    if self.program[address]['operation'] == 'call'
+                ],
+                'cycles': sum(self.cycle_cost(self.program[address]) for address in addresses),
+                'loop_depth': 0,
+            }
+        return blocks
+
+    def _get_reachable_blocks(self, owner: str) -> List[int]:
+        """Blocks of a function reachable from its entry, in depth-first order."""
+        result = []
+        visited = set()
+        to_visit = [self.entries[owner]]
+        while to_visit:
+            start = to_visit.pop()
+            if start in visited or start not in self.blocks or self.blocks[start]['owner'] != owner:
+                continue
+            visited.add(start)
+            result.append(start)
+            to_visit += reversed(self.blocks[start]['successors'])
+        return result
+
+    def _get_dominators(self, owner: str, nodes: List[int]) -> Dict[int, Set[int]]:
+        predecessors: Dict[int, List[int]] = {node: [] for node in nodes}
+        for node in nodes:
+            for successor in self.blocks[node]['successors']:
+                if successor in predecessors:
+                    predecessors[successor].append(node)
+
+        entry = self.entries[owner]
+        dominators = {node: set(nodes) for node in nodes}
+        dominators[entry] = {entry}
+        changed = True
+        while changed:
+            changed = False
+            for node in nodes:
+                if node == entry:
+                    continue
+                node_predecessors = [dominators[predecessor] for predecessor in predecessors[node]]
+                new_dominators = {node} | (set.intersection(*node_predecessors) if node_predecessors else set())
+                if new_dominators != dominators[node]:
+                    dominators[node] = new_dominators
+                    changed = True
+        return dominators
+
+    def _set_loop_depths(self, owner: str):
+        nodes = self._get_reachable_blocks(owner)
+        dominators = self._get_dominators(owner, nodes)
+
+        loops: Dict[int, Set[int]] = {}
+        for node in nodes:
+            for successor in self.blocks[node]['successors']:
+                if successor in dominators.get(node, ()):
+                    body = loops.setdefault(successor, {successor})
+                    to_visit = [node]
+                    while to_visit:
+                        current = to_visit.pop()
+                        if current in body:
+                            continue
+                        body.add(current)
+                        to_visit += [
+                            predecessor for predecessor in nodes if current in self.blocks[predecessor]['successors']
+                        ]
+
+        for body in loops.values():
+            for node in body:
+                self.blocks[node]['loop_depth'] += 1
+
+    def block_frequency(self, block: Dict) -> int:
+        return self.loop_iterations ** block['loop_depth']
+
+    def _get_call_target(self, statement: str) -> Optional[str]:
+        address = get_statement_address(statement)
+        for owner, entry in self.entries.items():
+            if entry == address and owner != TEXT_SECTION:
+                return owner
+        return None
+
+    def _get_function_frequencies(self) -> Dict[str, float]:
+        """How many times each function is estimated to run. Recursive calls are not followed."""
+        frequencies = {owner: 0 for owner in self.entries}
+
+        def visit(owner: str, frequency: float, call_stack: Set[str]):
+            frequencies[owner] += frequency
+            for block in self.blocks.values():
+                if block['owner'] != owner:
+                    continue
+                for call in block['calls']:
+                    callee = self._get_call_target(call)
+                    if callee is not None and callee not in call_stack:
+                        visit(callee, frequency * self.block_frequency(block), call_stack | {callee})
+
+        visit(TEXT_SECTION, 1, {TEXT_SECTION})
+        return frequencies
+
+    def block_cost(self, block: Dict) -> float:
+        """Estimated cycles spent in a block during the whole program, not counting the called subroutines."""
+        return block['cycles'] * self.block_frequency(block) * self.function_frequencies[block['owner']]
+
+    def line_costs(self) -> Dict[Optional[int], float]:
+        """Estimated cycles per source line."""
+        costs: Dict[Optional[int], float] = {}
+        for block in self.blocks.values():
+            frequency = self.block_frequency(block) * self.function_frequencies[block['owner']]
+            for address in block['addresses']:
+                instruction = self.program[address]
+                line = instruction.get('line')
+                costs[line] = costs.get(line, 0) + self.cycle_cost(instruction) * frequency
+        return costs
+
+    def _get_cost_per_call(self, owner: str, call_stack: Set[str]) -> float:
+        cost = 0
+        for block in self.blocks.values():
+            if block['owner'] != owner:
+                continue
+            block_cost = block['cycles']
+            for call in block['calls']:
+                callee = self._get_call_target(call)
+                if callee is not None and callee not in call_stack:
+                    block_cost += self._get_cost_per_call(callee, call_stack | {callee})
+            cost += block_cost * self.block_frequency(block)
+        return cost
+
+    def subroutine_costs(self) -> Dict[str, Dict[str, float]]:
+        """Per subroutine: estimated cycles per call (called subroutines included), estimated number of calls and
+        estimated cycles spent in its own code during the whole program."""
+        result = {}
+        for owner in self.entries:
+            if owner == TEXT_SECTION:
+                continue
+            result[owner] = {
+                'cycles_per_call': self._get_cost_per_call(owner, {owner}),
+                'calls': self.function_frequencies[owner],
+                'total_cycles': sum(
+                    self.block_cost(block) for block in self.blocks.values() if block['owner'] == owner
+                ),
+            }
+        return result
+
+    def total_cost(self) -> float:
+        return sum(self.block_cost(block) for block in self.blocks.values())
+
+    def hot_blocks(self, count: int = 5) -> List[Dict]:
+        return sorted(self.blocks.values(), key=lambda block: -self.block_cost(block))[:count]
+
+    def _load_source_lines(self) -> List[str]:
+        try:
+            with open(self.assembler.path_to_assembly_file, 'r') as file:
+                return [line.rstrip('\n') for line in file.readlines()]
+        except OSError:
+            return []
+
+    def report(self) -> str:
+        source_lines = self._load_source_lines()
+
+        def source(line: Optional[int]) -> str:
+            if line is None or not 0 < line <= len(source_lines):
+                return '(generated)'
+            return source_lines[line - 1].strip()
+
+        depths: Dict[Optional[int], int] = {}
+        for block in self.blocks.values():
+            for address in block['addresses']:
+                line = self.program[address].get('line')
+                depths[line] = max(depths.get(line, 0), block['loop_depth'])
+
+        total = self.total_cost()
+        lines = [
+            f'Estimated cost of {self.assembler.assembly_file_name} '
+            f'(each loop assumed to run {self.loop_iterations} times): {total:g} cycles',
+            '',
+            f'{"line":>6} {"cycles":>10} {"%":>6} {"loops":>5}  source',
+        ]
+        line_costs = self.line_costs()
+        for line in sorted(line_costs, key=lambda number: (number is None, number or 0)):
+            share = 100 * line_costs[line] / total if total else 0
+            lines.append(
+                f'{line if line is not None else "-":>6} {line_costs[line]:>10g} {share:>6.1f} {depths[line]:>5}  '
+                f'{source(line)}'
+            )
+
+        variable_cost_lines = sorted({
+            self.program[address].get('line') for address in self.variable_cost_addresses()
+        }, key=lambda number: (number is None, number or 0))
+        if variable_cost_lines:
+            lines += [
+                '',
+                'variable cost, `cx` not known (only the DMA setup counted): lines '
+                + ', '.join(str(line) if line is not None else '-' for line in variable_cost_lines),
+            ]
+
+        subroutine_costs = self.subroutine_costs()
+        if subroutine_costs:
+            lines += ['', f'{"subroutine":<20} {"per call":>10} {"calls":>10} {"cycles":>10}']
+            for name, cost in subroutine_costs.items():
+                lines.append(
+                    f'{name:<20} {cost["cycles_per_call"]:>10g} {cost["calls"]:>10g} {cost["total_cycles"]:>10g}'
+                )
+
+        lines += ['', 'hot blocks:']
+        for block in self.hot_blocks():
+            block_lines = sorted({
+                self.program[address].get('line') for address in block['addresses']
+            } - {None})
+            line_range = f'{block_lines[0]}-{block_lines[-1]}' if block_lines else '-'
+            lines.append(
+                f'  ${block["start"]:<4} {block["owner"]:<12} lines {line_range:<8} '
+                f'loop depth {block["loop_depth"]}  {self.block_cost(block):g} cycles'
+            )
+        return '\n'.join(lines)
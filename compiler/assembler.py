@@ -1,6 +1,8 @@
 import os
 from typing import List, Dict, Optional
 
+from computer.source_map import SourceMap, SourceLocation, STACK_SECTION
+from . import optimizer
 from .operation_compiler import OperationCompiler
 from .parser import get_parsed_code_from_file
 from .utils import get_byte_array_from_integer
@@ -12,52 +14,90 @@ class Assembler:
             path_to_assembly_file: str,
             output_path: str = None,
             ram_size_in_bytes: int = 256,
-            operation_compiler=None
+            operation_compiler=None,
+            optimize: bool = False,
+            compact_encoding: bool = False,
+            stack_size_in_bytes: Optional[int] = None
     ):
         self.path_to_assembly_file = path_to_assembly_file
         self.assembly_file_name = os.path.basename(path_to_assembly_file)
         self.assembly_file_path = os.path.dirname(path_to_assembly_file)
         self.output_path = output_path
-        self.operation_compiler = OperationCompiler() if operation_compiler is None else operation_compiler
+        if operation_compiler is None:
+            operation_compiler = OperationCompiler(
+                compact_encoding=compact_encoding, ram_size_in_bytes=ram_size_in_bytes
+            )
+        self.operation_compiler = operation_compiler
         self.parsed_assembly_code = get_parsed_code_from_file(path_to_assembly_file)
         self.ram_size_in_bytes = ram_size_in_bytes
+        if optimize:
+            # the optimizer only knows about the RAM below the stack (optimizing may drop the stack, never add it)
+            self.parsed_assembly_code = optimizer.optimize(
+                self.parsed_assembly_code,
+                ram_size_in_bytes=ram_size_in_bytes - optimizer.get_stack_size_in_bytes(
+                    self.parsed_assembly_code, stack_size_in_bytes
+                ),
+                compact_encoding=self.operation_compiler.compact_encoding,
+                address_size_in_bytes=self.operation_compiler.address_size_in_bytes
+            )
+        # the stack descends from the top of the RAM, everything else is laid out below it
+        self.stack_size_in_bytes = optimizer.get_stack_size_in_bytes(self.parsed_assembly_code, stack_size_in_bytes)
+        self.stack_address = ram_size_in_bytes - self.stack_size_in_bytes
+
+        compact_encoding = self.operation_compiler.compact_encoding
+        address_size_in_bytes = self.operation_compiler.address_size_in_bytes
+        data_size_in_bytes = len(self.parsed_assembly_code['data'])
+        self.data_end_address = optimizer.get_data_end_address(
+            self.stack_address,
+            optimizer.text_size_in_bytes(self.parsed_assembly_code, compact_encoding, address_size_in_bytes),
+            data_size_in_bytes,
+            optimizer.top_of_ram_size_in_bytes(self.parsed_assembly_code, compact_encoding, address_size_in_bytes)
+            - data_size_in_bytes
+        )
 
         self.raw_labels = self._extract_labels()
         self.variables_and_labels = self._get_variables_and_labels()
         self.subroutines = self._get_subroutines()
         self.instructions = self._get_instructions()
 
-    @classmethod
-    def int_to_binary_address(cls, integer: int) -> str:
-        return get_byte_array_from_integer(integer, 8)
+    def int_to_binary_address(self, integer: int) -> str:
+        return get_byte_array_from_integer(integer, 8 * self.operation_compiler.address_size_in_bytes)
 
     def _add_instructions_to_compiled_code(self):
         pass
 
     def _get_variables_and_labels(self) -> List[Dict[str, str]]:
+        """Variables are laid out from `data_end_address` downwards. Labels point to code, so they take no RAM."""
         result = []
         for reference, parsed_variable in zip(
-                reversed(range(self.ram_size_in_bytes)), self.parsed_assembly_code['data'] + self.raw_labels
+                reversed(range(self.data_end_address)), self.parsed_assembly_code['data']
         ):
             variable = parsed_variable.copy()
             variable.update({'ram_address': self.int_to_binary_address(reference)})
             result.append(variable)
-        return result
+        return result + self.raw_labels
+
+    def _get_code_size(self, instructions: List[Dict[str, Optional[str]]]) -> int:
+        return sum(self.operation_compiler.get_instruction_size(instruction) for instruction in instructions)
 
     def _extract_labels(self) -> List[Dict[str, str | int]]:
         labels = []
         index_shifting = 0
+        address = 0
         for index, instruction in enumerate(self.parsed_assembly_code['text']):
             if instruction['operation'] == 'label':
-                labels.append({'label': instruction['first_statement'].replace(':', ''), 'index': index - index_shifting})
+                labels.append({
+                    'label': instruction['first_statement'].replace(':', ''),
+                    'index': index - index_shifting,
+                    'value': self.int_to_binary_address(address),
+                })
                 index_shifting += 1
+            else:
+                address += self.operation_compiler.get_instruction_size(instruction)
 
         self.parsed_assembly_code['text'] = list(filter(
             lambda instruction: instruction['operation'] != 'label', self.parsed_assembly_code['text']))
 
-        for label in labels:
-            label.update({'value': self.int_to_binary_address(label['index'] * 2)})
-
         return labels
 
     def _get_variable_or_label_ram_address(self, variable_name: str) -> Optional[str]:
@@ -76,16 +116,22 @@ class Assembler:
 
     def _get_subroutines(self) -> List[Dict[str, str | list]]:
         result = []
-        previous_subroutine_address: int = self.ram_size_in_bytes - len(self.variables_and_labels)
+        # right below the variables, or right below the stack when the variables went below address 256
+        previous_subroutine_address: int = self.stack_address
+        if self.data_end_address == self.stack_address:
+            previous_subroutine_address -= len(self.parsed_assembly_code['data'])
         for subroutine in reversed(self.parsed_assembly_code['subroutines']):
             parsed_subroutine = subroutine.copy()
-            label_address_in_int = previous_subroutine_address - len(subroutine['lines']) * 2
+            label_address_in_int = previous_subroutine_address - self._get_code_size(subroutine['lines'])
             parsed_subroutine.update({'ram_address': self.int_to_binary_address(label_address_in_int)})
-            parsed_subroutine['lines'] = [self._parse_subroutine_instruction_ram_address(instruction) for instruction in parsed_subroutine['lines']]
             result.append(parsed_subroutine)
             previous_subroutine_address = label_address_in_int
 
-        return list(reversed(result))
+        # every address is known only after the layout, so subroutines may call each other
+        self.subroutines = list(reversed(result))
+        for subroutine in self.subroutines:
+            subroutine['lines'] = [self._parse_instruction_ram_address(instruction) for instruction in subroutine['lines']]
+        return self.subroutines
 
     def _parse_instruction_ram_address(self, instruction: Dict[str, Optional[str]]) -> Dict[str, Optional[str]]:
         ram_address = self._get_variable_or_label_ram_address(instruction['first_statement'])
@@ -97,16 +143,9 @@ class Assembler:
                 instruction['first_statement'] = ram_address
 
         ram_address = self._get_variable_or_label_ram_address(instruction['second_statement'])
-        if ram_address is not None:
-            instruction['second_statement'] = ram_address
-        return instruction
-
-    def _parse_subroutine_instruction_ram_address(self, instruction: Dict[str, Optional[str]]) -> Dict[str, Optional[str]]:
-        ram_address = self._get_variable_or_label_ram_address(instruction['first_statement'])
-        if ram_address is not None:
-            instruction['first_statement'] = ram_address
-
-        ram_address = self._get_variable_or_label_ram_address(instruction['second_statement'])
+        if ram_address is None:
+            # e.g. `ldi ax, handler`, to put the address of an interrupt handler in its vector
+            ram_address = self._get_subroutine_ram_address(instruction['second_statement'])
         if ram_address is not None:
             instruction['second_statement'] = ram_address
         return instruction
@@ -128,7 +167,8 @@ class Assembler:
     def _compile_variables(self) -> List[str]:
         compiled_code: List[str] = []
         for line in self.variables_and_labels:
-            compiled_code.append(get_byte_array_from_integer(int(line['value']), 8))
+            if 'variable_name' in line:
+                compiled_code.append(get_byte_array_from_integer(int(line['value']), 8))
         return list(reversed(compiled_code))
 
     def _compile_subroutines(self) -> List[str]:
@@ -139,25 +179,22 @@ class Assembler:
                 compiled_code += compiled_lines
         return compiled_code
 
-    def _generate_empty_space(self, compiled_instructions: List[str], compiled_variables: List[str]) -> List[str]:
-        instructions_size: int = len(compiled_instructions)
-        variables_size: int = len(compiled_variables)
-
-        spaces_to_create: int = self.ram_size_in_bytes - (instructions_size + variables_size)
-
-        return ['00000000' for n in range(spaces_to_create)]
+    @staticmethod
+    def _generate_empty_space(start_address: int, end_address: int) -> List[str]:
+        return ['00000000' for n in range(end_address - start_address)]
 
-    def _write_compiled_code_to_file(self, compiled_code: List[str]) -> str:
+    def write_compiled_code_to_file(self, compiled_code: List[str], output_path: Optional[str] = None) -> str:
         parsed_compiled_code = [f'{line}\n' for line in compiled_code]
         parsed_compiled_code[-1] = parsed_compiled_code[-1].replace('\n', '')  # removing blank line from the end
 
         file_name = self.assembly_file_name.replace('.asm', '.bin')
-        if self.output_path is None:
+        output_path = self.output_path if output_path is None else output_path
+        if output_path is None:
             file_path = self.assembly_file_path
         else:
-            file_path = self.output_path
+            file_path = output_path
 
-        parsed_file_path_with_file_name = f'{file_path}\\{file_name}'
+        parsed_file_path_with_file_name = os.path.join(file_path, file_name)
         with open(parsed_file_path_with_file_name, 'w') as file:
             file.writelines(parsed_compiled_code)
 
@@ -167,11 +204,69 @@ class Assembler:
     def get_compiled_code_length(compiled_code: str) -> int:
         return len(compiled_code.split('\n'))
 
-    def compile(self) -> str:
+    def assemble(self) -> List[str]:
+        """Returns the RAM image as a list of bytes, without writing it to a file."""
         compiled_variables: List[str] = self._compile_variables()
         compiled_subroutines: List[str] = self._compile_subroutines()
-        compiled_subroutines_and_variables = compiled_subroutines + compiled_variables
         compiled_instructions: List[str] = self._compile_instructions()
-        empty_space: List[str] = self._generate_empty_space(compiled_instructions, compiled_subroutines_and_variables)
+        data_address = self.data_end_address - len(compiled_variables)
+        subroutines_address = self.stack_address - len(compiled_subroutines)
+        if self.data_end_address == self.stack_address:
+            subroutines_address -= len(compiled_variables)
+
+        stack = ['00000000'] * self.stack_size_in_bytes
+
+        if self.data_end_address == self.stack_address:
+            return (
+                    compiled_instructions + self._generate_empty_space(len(compiled_instructions), subroutines_address)
+                    + compiled_subroutines + compiled_variables + stack
+            )
+        return (
+                compiled_instructions + self._generate_empty_space(len(compiled_instructions), data_address)
+                + compiled_variables + self._generate_empty_space(self.data_end_address, subroutines_address)
+                + compiled_subroutines + stack
+        )
+
+    def get_source_map(self) -> SourceMap:
+        """Maps each RAM address of the image to the assembly line, section and label it came from."""
+        source_map = SourceMap(self.ram_size_in_bytes)
+        file = os.path.abspath(self.path_to_assembly_file)
+
+        labels = sorted(self.raw_labels, key=lambda label: label['index'])
+        label_position = 0
+        current_label = None
+        address = 0
+        for index, instruction in enumerate(self.instructions):
+            while label_position < len(labels) and labels[label_position]['index'] <= index:
+                current_label = labels[label_position]['label']
+                label_position += 1
+            location = SourceLocation(file, instruction.get('line'), '.text', current_label)
+            size = self.operation_compiler.get_instruction_size(instruction)
+            for byte_address in range(address, address + size):
+                source_map.add(byte_address, location)
+            address += size
+
+        for subroutine in self.subroutines:
+            address = int(subroutine['ram_address'], 2)
+            for line in subroutine['lines']:
+                location = SourceLocation(file, line.get('line'), '.subroutines', subroutine['label'])
+                size = self.operation_compiler.get_instruction_size(line)
+                for byte_address in range(address, address + size):
+                    source_map.add(byte_address, location)
+                address += size
+
+        for variable in self.variables_and_labels:
+            if 'variable_name' in variable:
+                location = SourceLocation(file, variable.get('line'), '.data', variable['variable_name'])
+                source_map.add(int(variable['ram_address'], 2), location)
 
-        return self._write_compiled_code_to_file(compiled_instructions + empty_space + compiled_subroutines_and_variables)
+        for address in range(self.stack_address, self.ram_size_in_bytes):
+            source_map.add(address, SourceLocation(file, None, STACK_SECTION, None))
+
+        return source_map
+
+    def compile(self) -> str:
+        """Writes the .bin image, and its source map as a .map file next to it. Returns the .bin path."""
+        path_to_bin_file = self.write_compiled_code_to_file(self.assemble())
+        self.get_source_map().save(SourceMap.path_for_image(path_to_bin_file))
+        return path_to_bin_file
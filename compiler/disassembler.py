@@ -0,0 +1,182 @@
+from typing import List, Dict, Optional, Union, Sequence
+
+from computer import isa
+from computer.isa import ADDRESS, REGISTERS, REGISTER, IMMEDIATE, INDEXED, INSTRUCTION_SIZE_IN_BYTES
+from computer.source_map import SourceMap, STACK_SECTION
+
+# 256-entry decode tables, indexed by the opcode byte (16 entries for registers), generated from computer/isa.py
+OPCODE_NAMES = [spec.name if spec else None for spec in isa.INSTRUCTIONS_BY_OPCODE]
+MNEMONICS = [spec.mnemonic if spec else None for spec in isa.INSTRUCTIONS_BY_OPCODE]
+FIXED_REGISTERS = [spec.register if spec else None for spec in isa.INSTRUCTIONS_BY_OPCODE]
+OPERAND_KINDS = [spec.operand if spec else isa.NONE for spec in isa.INSTRUCTIONS_BY_OPCODE]
+REGISTER_NAMES = [register.name if register else None for register in isa.REGISTERS_BY_CODE]
+
+Byte = Union[int, str, object]
+
+
+def _byte_to_int(byte: Byte) -> int:
+    if isinstance(byte, int):
+        return byte
+    if isinstance(byte, str):
+        return int(byte, 2)
+    return byte.to_int()
+
+
+def get_opcode_name(opcode: int) -> Optional[str]:
+    """Name of the opcode in the ISA table (e.g. "lda"), or None for unused opcodes."""
+    return OPCODE_NAMES[opcode]
+
+
+class Disassembler:
+    """Decodes RAM images back into assembly, with the symbols of a source map when one is given.
+
+    Without a source map, the image is decoded as instructions from the start address on. With one, only the
+    addresses that hold code are decoded as instructions; variables are shown as data, and everything else is skipped.
+    """
+
+    def __init__(
+            self,
+            source_map: Optional[SourceMap] = None,
+            compact_encoding: bool = False,
+            ram_size_in_bytes: int = isa.DEFAULT_RAM_SIZE_IN_BYTES
+    ):
+        self.source_map = source_map
+        self.compact_encoding = compact_encoding
+        self.address_size_in_bytes = isa.get_address_size_in_bytes(ram_size_in_bytes)
+        self._sizes = isa.get_instruction_sizes(compact_encoding, self.address_size_in_bytes)
+        self._symbols = self._get_symbols() if source_map is not None else {}
+
+    def _get_symbols(self) -> Dict[int, str]:
+        """Address of the first byte of every label, subroutine and variable."""
+        symbols = {}
+        seen = set()
+        for address in range(self.source_map.size_in_bytes):
+            location = self.source_map.lookup(address)
+            if location is None or location.label is None:
+                continue
+            key = (location.section, location.label)
+            if key not in seen:
+                seen.add(key)
+                symbols[address] = location.label
+        return symbols
+
+    def _get_instruction_addresses(self, image: Sequence[Byte], start: int, end: int) -> List[int]:
+        if self.source_map is None and not self.compact_encoding and self.address_size_in_bytes == 1:
+            return list(range(start, end - INSTRUCTION_SIZE_IN_BYTES + 1, INSTRUCTION_SIZE_IN_BYTES))
+
+        # instructions have different sizes, so each opcode tells where the next instruction starts
+        addresses = []
+        address = start
+        while address < end:
+            location = self.source_map.lookup(address) if self.source_map is not None else None
+            if self.source_map is None or location is not None and location.section not in ('.data', STACK_SECTION):
+                addresses.append(address)
+                address += self._sizes[_byte_to_int(image[address])]
+            else:
+                address += 1
+        return addresses
+
+    def _get_data_addresses(self, start: int, end: int) -> List[int]:
+        if self.source_map is None:
+            return []
+        result = []
+        for address in range(start, end):
+            location = self.source_map.lookup(address)
+            if location is not None and location.section == '.data':
+                result.append(address)
+        return result
+
+    def format_address(self, address: int) -> str:
+        symbol = self._symbols.get(address)
+        return symbol if symbol is not None else f'${address}'
+
+    def disassemble(self, image: Sequence[Byte], start: int = 0, end: Optional[int] = None) -> List[Dict]:
+        """Decodes `image[start:end]`. Each result has the address, the raw bytes, the mnemonic, the operands and the
+        assembly text."""
+        end = len(image) if end is None else min(end, len(image))
+        instruction_addresses = [
+            address for address in self._get_instruction_addresses(image, start, end)
+            if address + self._sizes[_byte_to_int(image[address])] <= end
+        ]
+        data_addresses = self._get_data_addresses(start, end)
+
+        opcodes = [_byte_to_int(image[address]) for address in instruction_addresses]
+        sizes = [self._sizes[opcode] for opcode in opcodes]
+        operands = [
+            self._read_operand(image, address, size) for address, size in zip(instruction_addresses, sizes)
+        ]
+        kinds = [OPERAND_KINDS[opcode] for opcode in opcodes]
+        mnemonics = [MNEMONICS[opcode] or f'db {opcode}' for opcode in opcodes]
+        formatted_operands = [
+            self._format_operands(opcode, kind, operand) for opcode, kind, operand in zip(opcodes, kinds, operands)
+        ]
+
+        result = [
+            {
+                'address': address,
+                'bytes': [_byte_to_int(byte) for byte in image[address:address + size]],
+                'mnemonic': mnemonic,
+                'operands': operand_list,
+                'text': f'{mnemonic} {", ".join(operand_list)}' if operand_list else mnemonic,
+            }
+            for address, opcode, size, operand, mnemonic, operand_list in zip(
+                instruction_addresses, opcodes, sizes, operands, mnemonics, formatted_operands
+            )
+        ]
+        result += [
+            {
+                'address': address,
+                'bytes': [_byte_to_int(image[address])],
+                'mnemonic': 'db',
+                'operands': [str(_byte_to_int(image[address]))],
+                'text': f'db {_byte_to_int(image[address])}',
+            }
+            for address in data_addresses
+        ]
+        return sorted(result, key=lambda instruction: instruction['address'])
+
+    @staticmethod
+    def _read_operand(image: Sequence[Byte], address: int, size: int) -> int:
+        """The operand after the opcode, little-endian when it takes more than one byte."""
+        operand = 0
+        for byte_index in range(size - 1):
+            operand |= _byte_to_int(image[address + 1 + byte_index]) << 8 * byte_index
+        return operand
+
+    @staticmethod
+    def _format_register(code: int) -> str:
+        return REGISTER_NAMES[code] or f'?{code}'
+
+    def _format_operands(self, opcode: int, kind: str, operand: int) -> List[str]:
+        if MNEMONICS[opcode] is None:
+            return []
+        fixed_register = FIXED_REGISTERS[opcode]
+        operands = [fixed_register] if fixed_register is not None else []
+        if kind == ADDRESS:
+            operands.append(self.format_address(operand))
+        elif kind == REGISTERS:
+            operands += [self._format_register(operand >> 4), self._format_register(operand & 15)]
+        elif kind == REGISTER:
+            operands.append(self._format_register(operand & 15))
+        elif kind == IMMEDIATE:
+            operands.append(str(operand))
+        elif kind == INDEXED:
+            offset = f'+{operand & 15}' if operand & 15 else ''
+            operands.append(f'[{self._format_register(operand >> 4)}{offset}]')
+        return operands
+
+    def disassemble_ram(self, ram, start: int = 0, end: Optional[int] = None) -> List[Dict]:
+        return self.disassemble(ram.memory, start, end)
+
+    def listing(self, image: Sequence[Byte], start: int = 0, end: Optional[int] = None) -> str:
+        lines = []
+        raw_bytes_width = 9 * max(self._sizes) - 1
+        for instruction in self.disassemble(image, start, end):
+            address = instruction['address']
+            location = self.source_map.lookup(address) if self.source_map is not None else None
+            symbol = self._symbols.get(address)
+            label = f'{symbol}:' if symbol is not None else ''
+            raw_bytes = ' '.join(f'{byte:08b}' for byte in instruction['bytes'])
+            source = f'  ; line {location.line}' if location is not None and location.line is not None else ''
+            lines.append(f'{address:>5}  {raw_bytes:<{raw_bytes_width}}  {label:<16}{instruction["text"]}{source}')
+        return '\n'.join(lines)
@@ -1,3 +1,6 @@
 class CompilerError(Exception):
     pass
 
+
+class LinkerError(CompilerError):
+    pass
@@ -0,0 +1,169 @@
+import os
+from typing import List, Dict, Optional
+
+from computer import isa
+from computer.source_map import SourceMap, SourceLocation, STACK_SECTION
+from . import optimizer
+from .errors import LinkerError
+from .object_file import ObjectFile, assemble_object, TEXT_SECTION, SUBROUTINES_SECTION, DATA_SECTION
+from .utils import get_byte_array_from_integer
+
+
+class Linker:
+    """Lays out the sections of several object files into one RAM image, and patches their relocations.
+
+    The layout is the same as the assembler's: `.text` of every object from address 0 upwards, in order (the first
+    object's `.text` is where the program starts), the stack at the top of the RAM (as large as the largest stack
+    any object asks for), `.data` from the stack downwards, the first object's variables at the top, and every
+    `.subroutines` section right below the data. With more than 256 bytes of RAM, `.data` goes below address 256
+    instead when there is room, and the subroutines right below the stack (see `optimizer.get_data_end_address`).
+    Linking a single object gives the same image as assembling its source file directly.
+    """
+
+    def __init__(
+            self,
+            objects: List[ObjectFile],
+            ram_size_in_bytes: int = 256,
+            stack_size_in_bytes: Optional[int] = None
+    ):
+        if not objects:
+            raise LinkerError('Nothing to link')
+        for object_file in objects[1:]:
+            if object_file.compact_encoding != objects[0].compact_encoding:
+                raise LinkerError(
+                    f'{object_file.file} and {objects[0].file} were not assembled with the same instruction encoding'
+                )
+        address_size_in_bytes = isa.get_address_size_in_bytes(ram_size_in_bytes)
+        for object_file in objects:
+            if object_file.address_size_in_bytes != address_size_in_bytes:
+                raise LinkerError(
+                    f'{object_file.file} was assembled with {object_file.address_size_in_bytes} byte addresses, but '
+                    f'{ram_size_in_bytes} bytes of RAM need {address_size_in_bytes} byte addresses'
+                )
+        self.objects = objects
+        self.ram_size_in_bytes = ram_size_in_bytes
+        if stack_size_in_bytes is None:
+            stack_size_in_bytes = max(object_file.stack_size_in_bytes for object_file in objects)
+        self.stack_size_in_bytes = stack_size_in_bytes
+        self.stack_address = ram_size_in_bytes - stack_size_in_bytes
+        self.bases = self._get_section_bases()
+        self.global_symbols = self._get_global_symbols()
+
+    def _get_section_bases(self) -> List[Dict[str, int]]:
+        """Start address of each section of each object."""
+        bases = [{} for _ in self.objects]
+
+        text_address = 0
+        for object_bases, object_file in zip(bases, self.objects):
+            object_bases[TEXT_SECTION] = text_address
+            text_address += object_file.section_size(TEXT_SECTION)
+
+        data_size = sum(object_file.section_size(DATA_SECTION) for object_file in self.objects)
+        subroutines_size = sum(object_file.section_size(SUBROUTINES_SECTION) for object_file in self.objects)
+        data_end_address = optimizer.get_data_end_address(
+            self.stack_address, text_address, data_size, subroutines_size
+        )
+        data_address = data_end_address
+        for object_bases, object_file in zip(bases, self.objects):
+            data_address -= object_file.section_size(DATA_SECTION)
+            object_bases[DATA_SECTION] = data_address
+
+        # right below the data, or right below the stack when the data went below address 256
+        subroutines_end_address = data_address if data_end_address == self.stack_address else self.stack_address
+        subroutines_address = subroutines_end_address - subroutines_size
+        if subroutines_address < text_address:
+            raise LinkerError(
+                f'The program needs {text_address + self.ram_size_in_bytes - subroutines_address} bytes but the RAM '
+                f'only has {self.ram_size_in_bytes}'
+            )
+        for object_bases, object_file in zip(bases, self.objects):
+            object_bases[SUBROUTINES_SECTION] = subroutines_address
+            subroutines_address += object_file.section_size(SUBROUTINES_SECTION)
+
+        return bases
+
+    def _get_global_symbols(self) -> Dict[str, int]:
+        result: Dict[str, int] = {}
+        defined_in: Dict[str, str] = {}
+        for object_bases, object_file in zip(self.bases, self.objects):
+            for name, symbol in object_file.global_symbols.items():
+                if name in result:
+                    raise LinkerError(f'"{name}" is defined in both {defined_in[name]} and {object_file.file}')
+                result[name] = object_bases[symbol['section']] + symbol['offset']
+                defined_in[name] = object_file.file
+        return result
+
+    def get_symbol_address(self, name: str, object_index: int) -> int:
+        """Address of a symbol as seen from an object: its own symbols first, then the global ones."""
+        symbol = self.objects[object_index].symbols.get(name)
+        if symbol is not None:
+            return self.bases[object_index][symbol['section']] + symbol['offset']
+        try:
+            return self.global_symbols[name]
+        except KeyError:
+            raise LinkerError(f'Undefined symbol "{name}" in {self.objects[object_index].file}')
+
+    def link(self) -> List[str]:
+        """Returns the RAM image as a list of bytes, like `Assembler.assemble()`."""
+        image = [0] * self.ram_size_in_bytes
+        for object_index, (object_bases, object_file) in enumerate(zip(self.bases, self.objects)):
+            for section, base in object_bases.items():
+                section_bytes = object_file.sections[section]
+                image[base:base + len(section_bytes)] = section_bytes
+            for relocation in object_file.relocations:
+                address = object_bases[relocation['section']] + relocation['offset']
+                symbol_address = self.get_symbol_address(relocation['symbol'], object_index)
+                size = relocation.get('size', 1)
+                if symbol_address >> 8 * size:
+                    raise LinkerError(
+                        f'"{relocation["symbol"]}" is at address {symbol_address}, which does not fit in the '
+                        f'immediate operand of {object_file.file}'
+                    )
+                # little-endian, like the operation compiler encodes addresses
+                for byte_index in range(size):
+                    image[address + byte_index] = symbol_address >> 8 * byte_index & 0xFF
+        return [get_byte_array_from_integer(byte, 8) for byte in image]
+
+    def get_source_map(self) -> SourceMap:
+        """Each byte is mapped to its line, section, and the closest symbol at or before it in its section."""
+        source_map = SourceMap(self.ram_size_in_bytes)
+        for object_bases, object_file in zip(self.bases, self.objects):
+            symbols_by_section: Dict[str, Dict[int, str]] = {}
+            for name, symbol in object_file.symbols.items():
+                if optimizer.is_synthetic_label(name):
+                    continue
+                symbols_by_section.setdefault(symbol['section'], {})[symbol['offset']] = name
+
+            for section, base in object_bases.items():
+                symbols = symbols_by_section.get(section, {})
+                label: Optional[str] = None
+                for offset, line in enumerate(object_file.lines[section]):
+                    if offset in symbols or section == DATA_SECTION:
+                        label = symbols.get(offset)
+                    source_map.add(base + offset, SourceLocation(object_file.file, line, section, label))
+
+        for address in range(self.stack_address, self.ram_size_in_bytes):
+            source_map.add(address, SourceLocation(self.objects[0].file, None, STACK_SECTION, None))
+        return source_map
+
+    def write(self, path_to_bin_file: str) -> str:
+        """Writes the .bin image, and its source map as a .map file next to it. Returns the .bin path."""
+        image = self.link()
+        with open(path_to_bin_file, 'w') as file:
+            file.write('\n'.join(image))
+        self.get_source_map().save(SourceMap.path_for_image(path_to_bin_file))
+        return path_to_bin_file
+
+
+def load_object(
+        path: str,
+        optimize: bool = False,
+        compact_encoding: bool = False,
+        ram_size_in_bytes: int = isa.DEFAULT_RAM_SIZE_IN_BYTES
+) -> ObjectFile:
+    """Loads an .obj file, or assembles an .asm file into an object on the fly."""
+    if os.path.splitext(path)[1] == ObjectFile.EXTENSION:
+        return ObjectFile.load(path)
+    return assemble_object(
+        path, optimize=optimize, compact_encoding=compact_encoding, ram_size_in_bytes=ram_size_in_bytes
+    )
@@ -0,0 +1,214 @@
+import json
+import os
+from typing import List, Dict, Optional
+
+from computer import isa
+from . import optimizer
+from .errors import CompilerError
+from .operation_compiler import OperationCompiler, split_indexed_address
+from .parser import get_parsed_code_from_file
+
+TEXT_SECTION = '.text'
+SUBROUTINES_SECTION = '.subroutines'
+DATA_SECTION = '.data'
+SECTIONS = (TEXT_SECTION, SUBROUTINES_SECTION, DATA_SECTION)
+
+
+class ObjectFile:
+    """Relocatable output of assembling a single file, to be placed in RAM by the `Linker`.
+
+    Each section holds its bytes as if it started at address 0. Symbols are offsets inside a section: labels are only
+    visible to the object itself, subroutines and variables are global. Every address operand that refers to a symbol
+    is left as 0 and gets a relocation, which the linker patches once the sections have their final address.
+
+    On disk it is a JSON file (.obj):
+        {"version": 1, "file": "...", "sections": {".text": [bytes], ...}, "lines": {".text": [line per byte], ...},
+         "symbols": {"name": {"section": ".text", "offset": 0, "global": false}, ...},
+         "relocations": [{"section": ".text", "offset": 1, "size": 1, "symbol": "name"}, ...],
+         "compact_encoding": false, "stack_size": 16, "address_size": 1}
+    The stack size is how much RAM the object needs reserved for the stack, 0 if it never pushes nor calls. The address
+    size is how many bytes its address operands take, so it only links into RAM of a matching size. A relocation's
+    size is the bytes to patch: the address size for address operands, 1 for immediate ones.
+    """
+    VERSION = 1
+    EXTENSION = '.obj'
+
+    def __init__(
+            self,
+            file: str,
+            sections: Dict[str, List[int]],
+            lines: Dict[str, List[Optional[int]]],
+            symbols: Dict[str, Dict],
+            relocations: List[Dict],
+            compact_encoding: bool = False,
+            stack_size_in_bytes: int = 0,
+            address_size_in_bytes: int = 1
+    ):
+        self.file = file
+        self.compact_encoding = compact_encoding
+        self.stack_size_in_bytes = stack_size_in_bytes
+        self.address_size_in_bytes = address_size_in_bytes
+        self.sections = sections
+        self.lines = lines
+        self.symbols = symbols
+        self.relocations = relocations
+
+    def section_size(self, section: str) -> int:
+        return len(self.sections[section])
+
+    @property
+    def global_symbols(self) -> Dict[str, Dict]:
+        return {name: symbol for name, symbol in self.symbols.items() if symbol['global']}
+
+    @property
+    def undefined_symbols(self) -> List[str]:
+        """Symbols used by the relocations that some other object must define."""
+        return sorted({
+            relocation['symbol'] for relocation in self.relocations if relocation['symbol'] not in self.symbols
+        })
+
+    def to_dict(self) -> Dict:
+        return {
+            'version': self.VERSION,
+            'file': self.file,
+            'sections': self.sections,
+            'lines': self.lines,
+            'symbols': self.symbols,
+            'relocations': self.relocations,
+            'compact_encoding': self.compact_encoding,
+            'stack_size': self.stack_size_in_bytes,
+            'address_size': self.address_size_in_bytes,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'ObjectFile':
+        return cls(
+            data['file'], data['sections'], data['lines'], data['symbols'], data['relocations'],
+            data.get('compact_encoding', False), data.get('stack_size', 0), data.get('address_size', 1)
+        )
+
+    def save(self, path: str):
+        with open(path, 'w') as file:
+            json.dump(self.to_dict(), file, separators=(',', ':'))
+
+    @classmethod
+    def load(cls, path: str) -> 'ObjectFile':
+        with open(path, 'r') as file:
+            return cls.from_dict(json.load(file))
+
+    @classmethod
+    def path_for_source(cls, path_to_assembly_file: str, output_path: Optional[str] = None) -> str:
+        file_name = f'{os.path.splitext(os.path.basename(path_to_assembly_file))[0]}{cls.EXTENSION}'
+        folder = os.path.dirname(path_to_assembly_file) if output_path is None else output_path
+        return os.path.join(folder, file_name)
+
+
+def _is_absolute_address(statement: str) -> bool:
+    return statement.startswith('$') or OperationCompiler.is_binary_string(statement)
+
+
+def _is_symbol(statement: Optional[str], operand_kind: str) -> bool:
+    """Whether an operand names a symbol, whose address is only known once the object is linked."""
+    if statement is None or _is_absolute_address(statement) or split_indexed_address(statement) is not None:
+        return False
+    return operand_kind == isa.ADDRESS or operand_kind == isa.IMMEDIATE and not statement.isdigit()
+
+
+class _ObjectFileBuilder:
+    def __init__(self, file: str, operation_compiler: OperationCompiler):
+        self.file = file
+        self.operation_compiler = operation_compiler
+        self.sections: Dict[str, List[int]] = {section: [] for section in SECTIONS}
+        self.lines: Dict[str, List[Optional[int]]] = {section: [] for section in SECTIONS}
+        self.symbols: Dict[str, Dict] = {}
+        self.relocations: List[Dict] = []
+
+    def add_symbol(self, name: str, section: str, offset: int, is_global: bool):
+        if name in self.symbols:
+            raise CompilerError(f'"{name}" is defined more than once in {self.file}')
+        self.symbols[name] = {'section': section, 'offset': offset, 'global': is_global}
+
+    def add_instruction(self, section: str, instruction: Dict):
+        """Encodes an instruction, leaving a relocation in place of its symbolic address operand if it has one."""
+        instruction = instruction.copy()
+        specs = isa.MNEMONICS.get(instruction['operation'])
+        relocation_symbol = None
+        relocation_size = 1
+        if specs is not None and specs[0].operand in (isa.ADDRESS, isa.IMMEDIATE):
+            key = 'first_statement' if instruction['second_statement'] is None else 'second_statement'
+            if _is_symbol(instruction[key], specs[0].operand):
+                relocation_symbol = instruction[key]
+                instruction[key] = '00000000'
+                if specs[0].operand == isa.ADDRESS:
+                    relocation_size = self.operation_compiler.address_size_in_bytes
+
+        encoded = self.operation_compiler.parse_line(instruction)
+        offset = len(self.sections[section])
+        if relocation_symbol is not None:
+            self.relocations.append({
+                'section': section, 'offset': offset + 1, 'size': relocation_size, 'symbol': relocation_symbol
+            })
+        self.sections[section] += [int(byte, 2) for byte in encoded]
+        self.lines[section] += [instruction.get('line')] * len(encoded)
+
+    def build(self, stack_size_in_bytes: int = 0) -> ObjectFile:
+        return ObjectFile(
+            self.file, self.sections, self.lines, self.symbols, self.relocations,
+            self.operation_compiler.compact_encoding, stack_size_in_bytes,
+            self.operation_compiler.address_size_in_bytes
+        )
+
+
+def assemble_object(
+        path_to_assembly_file: str,
+        operation_compiler: Optional[OperationCompiler] = None,
+        optimize: bool = False,
+        compact_encoding: bool = False,
+        ram_size_in_bytes: int = isa.DEFAULT_RAM_SIZE_IN_BYTES
+) -> ObjectFile:
+    """Assembles a file without laying it out in RAM. Only the optimizations that don't depend on the layout (or on
+    the other objects) are run. The RAM size only decides how wide address operands are."""
+    if operation_compiler is None:
+        operation_compiler = OperationCompiler(compact_encoding=compact_encoding, ram_size_in_bytes=ram_size_in_bytes)
+    parsed_code = get_parsed_code_from_file(path_to_assembly_file)
+    # `$n` jumps and calls into `.text` are relative to this object's code, which the linker may put anywhere
+    relocatable_code = optimizer.symbolize_literal_code_addresses(
+        parsed_code, operation_compiler.compact_encoding, operation_compiler.address_size_in_bytes
+    )
+    if relocatable_code is None:
+        raise CompilerError(
+            f'{path_to_assembly_file} can not be linked: it reads or writes its own code through a `$n` address, or '
+            f'jumps into the middle of an instruction'
+        )
+    parsed_code = relocatable_code
+    if optimize:
+        parsed_code = optimizer.optimize(
+            parsed_code,
+            passes=optimizer.relocatable_passes(),
+            compact_encoding=operation_compiler.compact_encoding,
+            address_size_in_bytes=operation_compiler.address_size_in_bytes
+        )
+
+    builder = _ObjectFileBuilder(os.path.abspath(path_to_assembly_file), operation_compiler)
+
+    for instruction in parsed_code['text']:
+        if instruction['operation'] == 'label':
+            name = optimizer.label_name(instruction)
+            builder.add_symbol(name, TEXT_SECTION, len(builder.sections[TEXT_SECTION]), is_global=False)
+        else:
+            builder.add_instruction(TEXT_SECTION, instruction)
+
+    for subroutine in parsed_code['subroutines']:
+        offset = len(builder.sections[SUBROUTINES_SECTION])
+        builder.add_symbol(subroutine['label'], SUBROUTINES_SECTION, offset, is_global=True)
+        for instruction in subroutine['lines']:
+            builder.add_instruction(SUBROUTINES_SECTION, instruction)
+
+    # variables are laid out from the top of the section downwards, like the assembler does from the top of the RAM
+    data = parsed_code['data']
+    for index, variable in enumerate(data):
+        builder.add_symbol(variable['variable_name'], DATA_SECTION, len(data) - 1 - index, is_global=True)
+    builder.sections[DATA_SECTION] = [int(variable['value']) for variable in reversed(data)]
+    builder.lines[DATA_SECTION] = [variable.get('line') for variable in reversed(data)]
+
+    return builder.build(optimizer.get_stack_size_in_bytes(parsed_code))
@@ -1,65 +1,73 @@
 import re
-from typing import Dict, Callable, List
+from typing import Dict, Callable, List, Optional, Tuple
 
+from computer import isa
 from .errors import CompilerError
 from .utils import get_byte_array_from_integer
 
+MAX_INDEX_OFFSET = 15
+_indexed_address_pattern = re.compile(r'^\[(\w+)(?:\+(\d+))?\]$')
+
+
+def split_indexed_address(statement: Optional[str]) -> Optional[Tuple[str, int]]:
+    """Returns the base register and the offset of a `[register]` or `[register+offset]` operand, or None for any
+    other operand."""
+    if statement is None or not statement.startswith('['):
+        return None
+    match = _indexed_address_pattern.match(statement)
+    if match is None:
+        raise CompilerError(f'"{statement}" -> Wrong indexed address syntax, expected "[register]" or "[register+n]"')
+    return match.group(1), int(match.group(2) or 0)
+
+
+def get_line_spec(line: Dict[str, str]) -> Optional[isa.InstructionSpec]:
+    """The ISA entry a line is encoded with, as far as its size is concerned: `ld` and `st` through a register take
+    an indexed operand instead of an address."""
+    specs = isa.MNEMONICS.get(line['operation'])
+    if specs is None:
+        return None
+    if specs[0].operand == isa.ADDRESS and specs[0].register is not None:
+        if split_indexed_address(line['second_statement']) is not None:
+            return isa.INSTRUCTIONS_BY_NAME[f'{line["operation"]}xa']
+    return specs[0]
+
+
+def get_line_size(line: Dict[str, str], compact_encoding: bool = False, address_size_in_bytes: int = 1) -> int:
+    """Size in bytes of a parsed line once encoded."""
+    return isa.get_instruction_size(get_line_spec(line), compact_encoding, address_size_in_bytes)
+
 
 class OperationCompiler:
-    def __init__(self):
+    def __init__(self, compact_encoding: bool = False, ram_size_in_bytes: int = isa.DEFAULT_RAM_SIZE_IN_BYTES):
+        # operand-less instructions take a single byte in the compact encoding
+        self.compact_encoding = compact_encoding
+        # address operands take as many bytes as the RAM needs, little-endian
+        self.ram_size_in_bytes = ram_size_in_bytes
+        self.address_size_in_bytes = isa.get_address_size_in_bytes(ram_size_in_bytes)
+        # generated from the ISA table in computer/isa.py
         self.opcodes = {
-            'lda': '00000001',
-            'ldb': '00000010',
-            'ldc': '00000011',
-            'ldd': '00000100',
-            'sta': '00000101',
-            'stb': '00000110',
-            'stc': '00000111',
-            'std': '00001000',
-            'add': '00001001',
-            'sub': '00001010',
-            'inc': '00001011',
-            'dec': '00001100',
-            'cmp': '00001101',
-            'jmp': '00001110',
-            'jil': '00001111',
-            'jig': '00010000',
-            'jie': '00010001',
-            'jne': '00010010',
-            'push': '00010011',
-            'pop': '00010100',
-            'call': '00010101',
-            'ret': '00010110',
-            'dly': '00010111',
+            spec.name: get_byte_array_from_integer(spec.opcode, 8) for spec in isa.INSTRUCTION_SPECS
         }
         self.methods = {
-            'ld': self.load,
-            'st': self.store,
-            'add': self.add_and_sub,
-            'sub': self.add_and_sub,
-            'inc': self.single_register_operation,
-            'dec': self.single_register_operation,
-            'cmp': self.cmp,
-            'jmp': self.jmp,
-            'jil': self.jmp,
-            'jig': self.jmp,
-            'jie': self.jmp,
-            'jne': self.jmp,
-            'push': self.single_register_operation,
-            'pop': self.single_register_operation,
-            'call': self.call,
-            'ret': self.ret,
-            'dly': self.dly,
+            mnemonic: self._get_encoder(specs[0]) for mnemonic, specs in isa.MNEMONICS.items()
         }
         self.register_codes = {
-            'ax': '0000',
-            'bx': '0001',
-            'cx': '0010',
-            'dx': '0011',
-            'acc': '0100',
-            'sr': '0101',
+            register.name: get_byte_array_from_integer(register.code, 4) for register in isa.REGISTER_SPECS
         }
 
+    def _get_encoder(self, spec: isa.InstructionSpec) -> Callable[[Dict[str, str]], List[str]]:
+        if spec.register is not None:
+            if spec.operand == isa.IMMEDIATE:
+                return self.register_and_immediate_operation
+            return self.register_and_address_operation
+        encoders = {
+            isa.ADDRESS: self.address_operation,
+            isa.REGISTERS: self.two_registers_operation,
+            isa.REGISTER: self.single_register_operation,
+            isa.NONE: self.no_operand_operation,
+        }
+        return encoders[spec.operand]
+
     def parse_line(self, line: Dict[str, str]) -> List[str]:
         method_to_execute: Callable[[line], List[str]] = self.methods[line['operation']]
         compiled_lines: List[str] = method_to_execute(line)
@@ -70,22 +78,29 @@ class OperationCompiler:
         pattern = r'^[01]+$'
         return bool(re.search(pattern, string))
 
-    def _get_ram_address(self, line: Dict[str, str]) -> str:
+    def _get_ram_address(self, line: Dict[str, str]) -> List[str]:
+        """The bytes of the address operand, least significant first."""
         address = line['second_statement']
 
         if address is None:
             address = line['first_statement']
 
         if address.startswith('$'):
-            address_integer = address.replace('$', '')
             try:
-                return get_byte_array_from_integer(int(address_integer), 8)
+                address_integer = int(address.replace('$', ''))
             except ValueError:
                 raise CompilerError(f'"{line}" -> Wrong RAM syntax')
-
-        if len(address) != 8 or not self.is_binary_string(address):
+        elif len(address) in (8, 8 * self.address_size_in_bytes) and self.is_binary_string(address):
+            address_integer = int(address, 2)
+        else:
             raise CompilerError(f'"{line}" -> Wrong RAM address')
-        return address
+
+        if not 0 <= address_integer < self.ram_size_in_bytes:
+            raise CompilerError(f'"{line}" -> RAM address must be between 0 and {self.ram_size_in_bytes - 1}')
+        return [
+            get_byte_array_from_integer(address_integer >> 8 * byte_index & 0xFF, 8)
+            for byte_index in range(self.address_size_in_bytes)
+        ]
 
     def get_opcode(self, line: Dict[str, str]) -> str:
         try:
@@ -99,44 +114,80 @@ class OperationCompiler:
         except KeyError:
             raise CompilerError(f'Register "{assembly_register_code}" is not a valid register')
 
-    def load(self, line: Dict[str, str]) -> List[str]:
+    def register_and_address_operation(self, line: Dict[str, str]) -> List[str]:
+        """Operations like `ld` and `st`, that have one opcode per register."""
+        if split_indexed_address(line['second_statement']) is not None:
+            return self.register_and_indexed_operation(line)
         register = line['first_statement']
 
         try:
-            opcode = self.opcodes[f'ld{register[0]}']
+            opcode = self.opcodes[f'{line["operation"]}{register[0]}']
         except KeyError:
             raise CompilerError(f'"{line}" -> Register "{register}" is invalid for this operation or does not exist')
 
-        memory_address = self._get_ram_address(line)
-        return [opcode, memory_address]
+        return [opcode, *self._get_ram_address(line)]
+
+    def _get_indexed_address(self, line: Dict[str, str]) -> str:
+        """The base register code in the high nibble and the offset in the low one."""
+        base_register, offset = split_indexed_address(line['second_statement'])
+        try:
+            base_register_address = self.get_register_address(base_register)
+        except CompilerError as err:
+            raise CompilerError(f'"{line}" -> {err}')
+        if offset > MAX_INDEX_OFFSET:
+            raise CompilerError(f'"{line}" -> Index offset must be between 0 and {MAX_INDEX_OFFSET}')
+        return f'{base_register_address}{get_byte_array_from_integer(offset, 4)}'
 
-    def store(self, line: Dict[str, str]) -> List[str]:
+    def register_and_indexed_operation(self, line: Dict[str, str]) -> List[str]:
+        """`ld` and `st` through a register, like `ld ax, [bx]` or `st ax, [cx+2]`."""
         register = line['first_statement']
 
         try:
-            opcode = self.opcodes[f'st{register[0]}']
+            opcode = self.opcodes[f'{line["operation"]}x{register[0]}']
         except KeyError:
             raise CompilerError(f'"{line}" -> Register "{register}" is invalid for this operation or does not exist')
 
-        memory_address = self._get_ram_address(line)
-        return [opcode, memory_address]
+        return [opcode, self._get_indexed_address(line)]
+
+    def _get_immediate_value(self, line: Dict[str, str]) -> str:
+        """A decimal constant between 0 and 255, or the address of a variable or label (already resolved by the
+        assembler to a binary string), which must then be in the first 256 bytes of RAM."""
+        value = line['second_statement']
+        if value is None:
+            raise CompilerError(f'"{line}" -> Missing immediate value')
+        if len(value) in (8, 8 * self.address_size_in_bytes) and self.is_binary_string(value):
+            integer = int(value, 2)
+            if integer > 255:
+                raise CompilerError(
+                    f'"{line}" -> Address {integer} does not fit in an immediate value, only the first 256 bytes of '
+                    f'RAM can be loaded into a register'
+                )
+            return get_byte_array_from_integer(integer, 8)
 
-    def add_and_sub(self, line: Dict[str, str]) -> List[str]:
-        opcode = self.get_opcode(line)
         try:
-            reg0 = self.get_register_address(line['first_statement'])
-            reg1 = self.get_register_address(line['second_statement'])
-        except CompilerError as err:
-            raise CompilerError(f'"{line}" -> {err}')
+            integer = int(value)
+        except ValueError:
+            raise CompilerError(f'"{line}" -> "{value}" is not a number or a known variable or label')
+        if not 0 <= integer <= 255:
+            raise CompilerError(f'"{line}" -> Immediate value must be between 0 and 255')
+        return get_byte_array_from_integer(integer, 8)
+
+    def register_and_immediate_operation(self, line: Dict[str, str]) -> List[str]:
+        """Operations like `ldi ax, 5`, that have one opcode per register and a constant as operand."""
+        register = line['first_statement']
 
-        return [opcode, f'{reg0}{reg1}']
+        try:
+            opcode = self.opcodes[f'{line["operation"]}{register[0]}']
+        except KeyError:
+            raise CompilerError(f'"{line}" -> Register "{register}" is invalid for this operation or does not exist')
 
-    def jmp(self, line: Dict[str, str]) -> List[str]:
+        return [opcode, self._get_immediate_value(line)]
+
+    def address_operation(self, line: Dict[str, str]) -> List[str]:
         opcode = self.get_opcode(line)
-        memory_address = self._get_ram_address(line)
-        return [opcode, memory_address]
+        return [opcode, *self._get_ram_address(line)]
 
-    def cmp(self, line: Dict[str, str]) -> List[str]:
+    def two_registers_operation(self, line: Dict[str, str]) -> List[str]:
         opcode = self.get_opcode(line)
         try:
             reg0 = self.get_register_address(line['first_statement'])
@@ -151,13 +202,11 @@ class OperationCompiler:
         register_address = self.get_register_address(line['first_statement'])
         return [opcode, f'0000{register_address}']
 
-    def call(self, line: Dict[str, str]) -> List[str]:
-        opcode = self.get_opcode(line)
-        memory_address = self._get_ram_address(line)
-        return [opcode, memory_address]
-
-    def ret(self, line: Dict[str, str]) -> List[str]:
+    def no_operand_operation(self, line: Dict[str, str]) -> List[str]:
+        if self.compact_encoding:
+            return [self.get_opcode(line)]
         return [self.get_opcode(line), '00000000']
 
-    def dly(self, line: Dict[str, str]) -> List[str]:
-        return self.single_register_operation(line)
\ No newline at end of file
+    def get_instruction_size(self, line: Dict[str, str]) -> int:
+        """Size in bytes of the encoded line, without encoding it."""
+        return get_line_size(line, self.compact_encoding, self.address_size_in_bytes)
@@ -0,0 +1,776 @@
+import re
+from functools import partial
+from typing import Dict, List, Optional, Set, Callable, Tuple
+
+from .operation_compiler import split_indexed_address, get_line_size
+
+ParsedCode = Dict[str, List[Dict]]
+
+JUMP_OPERATIONS = ('jmp', 'jil', 'jig', 'jie', 'jne')
+CONTROL_FLOW_OPERATIONS = JUMP_OPERATIONS + ('call',)
+MEMORY_OPERATIONS = ('ld', 'st', 'tas')
+RETURN_OPERATIONS = ('ret', 'iret')
+INTERRUPT_OPERATIONS = ('ei', 'iret', 'wfi')
+# an interrupt pushes the return address and the status register, so enabling interrupts needs a stack too
+STACK_OPERATIONS = ('push', 'pop', 'call', 'ei')
+DEFAULT_STACK_SIZE_IN_BYTES = 16
+# the RAM an 8 bit register can point to
+LOW_RAM_SIZE_IN_BYTES = 256
+BLOCK_OPERATIONS = ('memcpy', 'memset')
+MAX_ITERATIONS = 32
+MAX_INLINE_SIZE_IN_INSTRUCTIONS = 4
+
+_literal_address_pattern = re.compile(r'^\$(\d+)$')
+SYNTHETIC_LABEL_PREFIX = '__address_'
+
+
+def _is_label(instruction: Dict) -> bool:
+    return instruction['operation'] == 'label'
+
+
+def label_name(instruction: Dict) -> str:
+    return instruction['first_statement'].replace(':', '')
+
+
+def make_label(name: str) -> Dict[str, Optional[str]]:
+    return {'operation': 'label', 'first_statement': f'{name}:', 'second_statement': None, 'line': None}
+
+
+def _synthetic_label(address: int) -> str:
+    return f'{SYNTHETIC_LABEL_PREFIX}{address}'
+
+
+def is_synthetic_label(name: str) -> bool:
+    """Whether a label was made up by `symbolize_literal_code_addresses`, rather than written in the source."""
+    return name.startswith(SYNTHETIC_LABEL_PREFIX)
+
+
+def literal_address(statement: Optional[str]) -> Optional[int]:
+    """Returns the integer of a `$n` RAM reference, or None for anything else."""
+    if statement is None:
+        return None
+    match = _literal_address_pattern.match(statement)
+    return int(match.group(1)) if match else None
+
+
+def index_register(statement: Optional[str]) -> Set[str]:
+    """The base register of a `[register+n]` address, as a set so it can be added to an instruction's reads."""
+    indexed_address = split_indexed_address(statement)
+    return set() if indexed_address is None else {indexed_address[0]}
+
+
+def uses_indexed_addresses(lines: List[Dict]) -> bool:
+    """Whether any of the lines reads or writes memory through a register, at an address only known at run time."""
+    return any(
+        instruction['operation'] in BLOCK_OPERATIONS
+        or instruction['operation'] in MEMORY_OPERATIONS and split_indexed_address(instruction['second_statement'])
+        for instruction in lines
+    )
+
+
+def uses_interrupts(lines: List[Dict]) -> bool:
+    """Whether an interrupt handler may run in between any two of the lines, and change any variable."""
+    return any(instruction['operation'] in INTERRUPT_OPERATIONS for instruction in lines)
+
+
+def uses_multiple_cores(lines: List[Dict]) -> bool:
+    """Whether the lines are written to run on several cores at once, so another core may change any variable in
+    between them: they read the core ID or take a lock with `tas`."""
+    return any(
+        instruction['operation'] == 'tas' or 'id' in (instruction['first_statement'], instruction['second_statement'])
+        for instruction in lines
+    )
+
+
+def all_lines(parsed_code: ParsedCode) -> List[Dict]:
+    """Every instruction of `.text` (labels included) followed by every subroutine line."""
+    result = list(parsed_code['text'])
+    for subroutine in parsed_code['subroutines']:
+        result += subroutine['lines']
+    return result
+
+
+def referenced_names(parsed_code: ParsedCode) -> Set[str]:
+    names = set()
+    for instruction in all_lines(parsed_code):
+        if not _is_label(instruction):
+            names.add(instruction['first_statement'])
+            names.add(instruction['second_statement'])
+    names.discard(None)
+    return names
+
+
+def literal_addresses(parsed_code: ParsedCode) -> List[int]:
+    addresses = []
+    for instruction in all_lines(parsed_code):
+        for statement in (instruction['first_statement'], instruction['second_statement']):
+            address = literal_address(statement)
+            if address is not None:
+                addresses.append(address)
+    return addresses
+
+
+def code_size_in_bytes(lines: List[Dict], compact_encoding: bool = False, address_size_in_bytes: int = 1) -> int:
+    return sum(
+        get_line_size(instruction, compact_encoding, address_size_in_bytes)
+        for instruction in lines if not _is_label(instruction)
+    )
+
+
+def text_size_in_bytes(parsed_code: ParsedCode, compact_encoding: bool = False, address_size_in_bytes: int = 1) -> int:
+    return code_size_in_bytes(parsed_code['text'], compact_encoding, address_size_in_bytes)
+
+
+def top_of_ram_size_in_bytes(
+        parsed_code: ParsedCode,
+        compact_encoding: bool = False,
+        address_size_in_bytes: int = 1
+) -> int:
+    """Size of what the Assembler lays out from the top of the RAM downwards: subroutines and variables."""
+    subroutines_size = sum(
+        code_size_in_bytes(subroutine['lines'], compact_encoding, address_size_in_bytes)
+        for subroutine in parsed_code['subroutines']
+    )
+    return subroutines_size + len(parsed_code['data'])
+
+
+def get_data_end_address(
+        stack_address: int,
+        text_size_in_bytes: int,
+        data_size_in_bytes: int,
+        subroutines_size_in_bytes: int = 0
+) -> int:
+    """Variables are laid out from this address downwards. Registers are 8 bit, so with more than 256 bytes of RAM
+    they go right below address 256 when `.text` leaves room for them there (and the subroutines fit between 256 and
+    the stack), for `ldi` to load their addresses and indexed `ld`/`st` and `memcpy`/`memset` to reach them.
+    Otherwise they go right below the stack."""
+    if (
+            text_size_in_bytes + data_size_in_bytes <= LOW_RAM_SIZE_IN_BYTES
+            <= stack_address - subroutines_size_in_bytes
+            and stack_address > LOW_RAM_SIZE_IN_BYTES
+    ):
+        return LOW_RAM_SIZE_IN_BYTES
+    return stack_address
+
+
+def has_low_data(
+        parsed_code: ParsedCode,
+        ram_size_in_bytes: int = 256,
+        compact_encoding: bool = False,
+        address_size_in_bytes: int = 1
+) -> bool:
+    """Whether the variables go below address 256 instead of below the stack (see `get_data_end_address`)."""
+    text_size = text_size_in_bytes(parsed_code, compact_encoding, address_size_in_bytes)
+    data_size = len(parsed_code['data'])
+    subroutines_size = top_of_ram_size_in_bytes(parsed_code, compact_encoding, address_size_in_bytes) - data_size
+    return get_data_end_address(ram_size_in_bytes, text_size, data_size, subroutines_size) != ram_size_in_bytes
+
+
+def get_stack_size_in_bytes(parsed_code: ParsedCode, stack_size_in_bytes: Optional[int] = None) -> int:
+    """RAM to reserve for the stack, at the very top of the RAM: none when the code never pushes nor calls, otherwise
+    `stack_size_in_bytes` (16 when not given)."""
+    if not any(instruction['operation'] in STACK_OPERATIONS for instruction in all_lines(parsed_code)):
+        return 0
+    return DEFAULT_STACK_SIZE_IN_BYTES if stack_size_in_bytes is None else stack_size_in_bytes
+
+
+def copy_parsed_code(parsed_code: ParsedCode) -> ParsedCode:
+    return {
+        'data': [variable.copy() for variable in parsed_code['data']],
+        'subroutines': [
+            {**subroutine, 'lines': [line.copy() for line in subroutine['lines']]}
+            for subroutine in parsed_code['subroutines']
+        ],
+        'text': [instruction.copy() for instruction in parsed_code['text']],
+    }
+
+
+def symbolize_literal_code_addresses(
+        parsed_code: ParsedCode,
+        compact_encoding: bool = False,
+        address_size_in_bytes: int = 1
+) -> Optional[ParsedCode]:
+    """Replaces `$n` jump and call targets that point inside `.text` with labels, so they keep pointing to the same
+    instruction when code moves. Returns None when the code can't be moved safely: when it reads or writes its own
+    instructions, or jumps into the middle of one."""
+    text_size = text_size_in_bytes(parsed_code, compact_encoding, address_size_in_bytes)
+    instruction_addresses = {text_size}
+    address = 0
+    for instruction in parsed_code['text']:
+        if not _is_label(instruction):
+            instruction_addresses.add(address)
+            address += get_line_size(instruction, compact_encoding, address_size_in_bytes)
+    targets: Set[int] = set()
+
+    for instruction in all_lines(parsed_code):
+        if instruction['operation'] in MEMORY_OPERATIONS:
+            address = literal_address(instruction['second_statement'])
+            if address is not None and address < text_size:
+                return None
+        elif instruction['operation'] in CONTROL_FLOW_OPERATIONS:
+            address = literal_address(instruction['first_statement'])
+            if address is None or address > text_size:
+                continue
+            if address not in instruction_addresses:
+                return None
+            targets.add(address)
+
+    if not targets:
+        return parsed_code
+
+    text = []
+    address = 0
+    for instruction in parsed_code['text']:
+        if not _is_label(instruction):
+            if address in targets:
+                text.append(make_label(_synthetic_label(address)))
+            address += get_line_size(instruction, compact_encoding, address_size_in_bytes)
+        text.append(instruction)
+    if address in targets:
+        text.append(make_label(_synthetic_label(address)))
+    parsed_code['text'] = text
+
+    for instruction in all_lines(parsed_code):
+        if instruction['operation'] in CONTROL_FLOW_OPERATIONS:
+            address = literal_address(instruction['first_statement'])
+            if address in targets:
+                instruction['first_statement'] = _synthetic_label(address)
+    return parsed_code
+
+
+def _remove_redundant_loads(lines: List[Dict]) -> bool:
+    """`st ax, var` followed by `ld ax, var`: the register already holds that value. `$n` addresses are left alone,
+    since a device mapped there may read back something else than what was stored."""
+    changed = False
+    result = []
+    for instruction in lines:
+        previous = result[-1] if result else None
+        if (
+                previous is not None
+                and instruction['operation'] == 'ld'
+                and previous['operation'] == 'st'
+                and instruction['first_statement'] == previous['first_statement']
+                and instruction['second_statement'] == previous['second_statement']
+                and literal_address(instruction['second_statement']) is None
+        ):
+            changed = True
+            continue
+        result.append(instruction)
+    lines[:] = result
+    return changed
+
+
+def _get_label_targets(text: List[Dict]) -> Dict[str, Optional[Dict]]:
+    """Maps every `.text` label to the first instruction after it (None when the label ends the code)."""
+    targets = {}
+    pending_labels = []
+    for instruction in text:
+        if _is_label(instruction):
+            pending_labels.append(label_name(instruction))
+            continue
+        for name in pending_labels:
+            targets[name] = instruction
+        pending_labels = []
+    for name in pending_labels:
+        targets[name] = None
+    return targets
+
+
+def _thread_jumps(parsed_code: ParsedCode) -> bool:
+    """A jump to a `jmp` goes straight to that jump's destination."""
+    label_targets = _get_label_targets(parsed_code['text'])
+
+    def final_destination(name: str) -> str:
+        visited = {name}
+        while True:
+            target = label_targets.get(name)
+            if target is None or target['operation'] != 'jmp':
+                return name
+            name = target['first_statement']
+            if name in visited:
+                return name
+            visited.add(name)
+
+    changed = False
+    for instruction in all_lines(parsed_code):
+        if instruction['operation'] in JUMP_OPERATIONS and instruction['first_statement'] in label_targets:
+            destination = final_destination(instruction['first_statement'])
+            if destination != instruction['first_statement']:
+                instruction['first_statement'] = destination
+                changed = True
+    return changed
+
+
+def _remove_jumps_to_next_instruction(text: List[Dict]) -> bool:
+    """Both outcomes of a jump to the labels right after it lead to the same instruction."""
+    changed = False
+    result = []
+    for index, instruction in enumerate(text):
+        if instruction['operation'] in JUMP_OPERATIONS:
+            following_labels = set()
+            for next_instruction in text[index + 1:]:
+                if not _is_label(next_instruction):
+                    break
+                following_labels.add(label_name(next_instruction))
+            if instruction['first_statement'] in following_labels:
+                changed = True
+                continue
+        result.append(instruction)
+    text[:] = result
+    return changed
+
+
+def _convert_tail_calls(lines: List[Dict]) -> bool:
+    """`call x` followed by `ret` becomes `jmp x`, since x's `ret` already returns to our caller."""
+    changed = False
+    result = []
+    for instruction in lines:
+        previous = result[-1] if result else None
+        if previous is not None and instruction['operation'] == 'ret' and previous['operation'] == 'call':
+            previous['operation'] = 'jmp'
+            changed = True
+            continue
+        result.append(instruction)
+    lines[:] = result
+    return changed
+
+
+def _remove_unreachable_code(lines: List[Dict], entry_points: Set[str]) -> bool:
+    """Drops whatever follows an unconditional `jmp` until the next label that something jumps to."""
+    changed = False
+    result = []
+    reachable = True
+    for instruction in lines:
+        if _is_label(instruction):
+            reachable = reachable or label_name(instruction) in entry_points
+            result.append(instruction)
+            continue
+        if not reachable:
+            changed = True
+            continue
+        result.append(instruction)
+        if instruction['operation'] == 'jmp':
+            reachable = False
+    lines[:] = result
+    return changed
+
+
+def peephole(parsed_code: ParsedCode) -> bool:
+    changed = _thread_jumps(parsed_code)
+    changed |= _remove_jumps_to_next_instruction(parsed_code['text'])
+    changed |= _remove_redundant_loads(parsed_code['text'])
+    changed |= _remove_unreachable_code(parsed_code['text'], referenced_names(parsed_code))
+    for subroutine in parsed_code['subroutines']:
+        changed |= _remove_redundant_loads(subroutine['lines'])
+        changed |= _convert_tail_calls(subroutine['lines'])
+        changed |= _remove_unreachable_code(subroutine['lines'], set())
+    return changed
+
+
+def _get_inlinable_subroutines(parsed_code: ParsedCode, max_inline_size: int) -> Dict[str, List[Dict]]:
+    """Small leaf subroutines: straight code ending in its only `ret`, so they can't recurse or jump anywhere."""
+    result = {}
+    for subroutine in parsed_code['subroutines']:
+        lines = subroutine['lines']
+        if not lines or lines[-1]['operation'] != 'ret' or len(lines) - 1 > max_inline_size:
+            continue
+        body = lines[:-1]
+        if any(line['operation'] in CONTROL_FLOW_OPERATIONS + ('ret',) for line in body):
+            continue
+        result[subroutine['label']] = body
+    return result
+
+
+def inline_subroutines(
+        parsed_code: ParsedCode,
+        max_inline_size: int = MAX_INLINE_SIZE_IN_INSTRUCTIONS,
+        ram_size_in_bytes: int = 256,
+        compact_encoding: bool = False,
+        address_size_in_bytes: int = 1
+) -> bool:
+    """Replaces `call x` in `.text` by the body of x (without its `ret`) when x is small enough, saving the CALL and
+    RET cycles. `.text` only grows into RAM that is free: below the subroutines and variables (and below variables
+    laid out under address 256, see `get_data_end_address`), and below any `$n`
+    address the program refers to past its own code. Nothing is inlined when the program accesses memory through
+    registers, since that free RAM may be a buffer it uses."""
+    if uses_indexed_addresses(all_lines(parsed_code)):
+        return False
+    inlinable_subroutines = _get_inlinable_subroutines(parsed_code, max_inline_size)
+    if not inlinable_subroutines:
+        return False
+
+    text_size = text_size_in_bytes(parsed_code, compact_encoding, address_size_in_bytes)
+    free_space_end = ram_size_in_bytes - top_of_ram_size_in_bytes(parsed_code, compact_encoding, address_size_in_bytes)
+    if has_low_data(parsed_code, ram_size_in_bytes, compact_encoding, address_size_in_bytes):
+        # growing past the variables would move them out of the registers' reach
+        free_space_end = LOW_RAM_SIZE_IN_BYTES - len(parsed_code['data'])
+    for address in literal_addresses(parsed_code):
+        if address >= text_size:
+            free_space_end = min(free_space_end, address)
+    free_space = free_space_end - text_size
+
+    changed = False
+    result = []
+    for instruction in parsed_code['text']:
+        body = inlinable_subroutines.get(instruction['first_statement']) if instruction['operation'] == 'call' else None
+        if body is not None:
+            growth = (
+                    code_size_in_bytes(body, compact_encoding, address_size_in_bytes)
+                    - code_size_in_bytes([instruction], compact_encoding, address_size_in_bytes)
+            )
+            if growth <= free_space:
+                free_space -= growth
+                result += [line.copy() for line in body]
+                changed = True
+                continue
+        result.append(instruction)
+    parsed_code['text'] = result
+    return changed
+
+
+def _get_reachable_subroutines(parsed_code: ParsedCode) -> Set[str]:
+    subroutines = {subroutine['label']: subroutine for subroutine in parsed_code['subroutines']}
+    # interrupt handlers are only referenced by the `ldi` that puts their address in a vector
+    to_visit = [
+        statement for instruction in parsed_code['text'] if not _is_label(instruction)
+        for statement in (instruction['first_statement'], instruction['second_statement'])
+    ]
+    reachable = set()
+    while to_visit:
+        name = to_visit.pop()
+        if name in reachable or name not in subroutines:
+            continue
+        reachable.add(name)
+        to_visit += [
+            statement for line in subroutines[name]['lines']
+            for statement in (line['first_statement'], line['second_statement'])
+        ]
+    return reachable
+
+
+def eliminate_dead_code(
+        parsed_code: ParsedCode,
+        ram_size_in_bytes: int = 256,
+        compact_encoding: bool = False,
+        address_size_in_bytes: int = 1
+) -> bool:
+    """Drops subroutines that can't be reached from `.text` and variables that no reachable code refers to, which
+    frees their RAM. Nothing is dropped when a `$n` address points into the variables or subroutines, or when the
+    program accesses memory through registers, since removing any of them moves the others. With more than 256 bytes
+    of RAM, that includes `$n` addresses right below 256, where fewer variables may then be laid out."""
+    top_of_ram_start = ram_size_in_bytes - top_of_ram_size_in_bytes(
+        parsed_code, compact_encoding, address_size_in_bytes
+    )
+    if ram_size_in_bytes > LOW_RAM_SIZE_IN_BYTES:
+        top_of_ram_start = min(top_of_ram_start, LOW_RAM_SIZE_IN_BYTES - len(parsed_code['data']))
+    if any(address >= top_of_ram_start for address in literal_addresses(parsed_code)):
+        return False
+    if uses_indexed_addresses(all_lines(parsed_code)):
+        return False
+
+    reachable_subroutines = _get_reachable_subroutines(parsed_code)
+    subroutines = [
+        subroutine for subroutine in parsed_code['subroutines'] if subroutine['label'] in reachable_subroutines
+    ]
+    used_names = referenced_names({'data': [], 'subroutines': subroutines, 'text': parsed_code['text']})
+    data = [variable for variable in parsed_code['data'] if variable['variable_name'] in used_names]
+
+    changed = len(subroutines) != len(parsed_code['subroutines']) or len(data) != len(parsed_code['data'])
+    parsed_code['subroutines'] = subroutines
+    parsed_code['data'] = data
+    return changed
+
+
+GENERAL_REGISTERS = ('ax', 'bx', 'cx', 'dx')
+SPARE_REGISTER_PREFERENCE = ('cx', 'dx', 'bx', 'ax')
+_register_usage: Dict[str, Callable[[Dict], Tuple[Set[str], Set[str]]]] = {
+    'ld': lambda instruction: (index_register(instruction['second_statement']), {instruction['first_statement']}),
+    'st': lambda instruction: (
+        {instruction['first_statement']} | index_register(instruction['second_statement']), set()
+    ),
+    'add': lambda instruction: ({instruction['first_statement'], instruction['second_statement']}, set()),
+    'sub': lambda instruction: ({instruction['first_statement'], instruction['second_statement']}, set()),
+    'cmp': lambda instruction: ({instruction['first_statement'], instruction['second_statement']}, set()),
+    'inc': lambda instruction: ({instruction['first_statement']}, {instruction['first_statement']}),
+    'dec': lambda instruction: ({instruction['first_statement']}, {instruction['first_statement']}),
+    'push': lambda instruction: ({instruction['first_statement']}, set()),
+    'pop': lambda instruction: (set(), {instruction['first_statement']}),
+    'dly': lambda instruction: ({instruction['first_statement']}, set()),
+    'not': lambda instruction: ({instruction['first_statement']}, {instruction['first_statement']}),
+    'ldi': lambda instruction: (set(), {instruction['first_statement']}),
+    'tas': lambda instruction: (set(), {instruction['first_statement']}),
+    'addi': lambda instruction: ({instruction['first_statement']}, {instruction['first_statement']}),
+    'subi': lambda instruction: ({instruction['first_statement']}, {instruction['first_statement']}),
+    'cmpi': lambda instruction: ({instruction['first_statement']}, set()),
+    'call': lambda instruction: (set(GENERAL_REGISTERS), set()),
+    'label': lambda instruction: (set(), set()),
+}
+for _operation in JUMP_OPERATIONS:
+    _register_usage[_operation] = _register_usage['label']
+for _operation in BLOCK_OPERATIONS:
+    _register_usage[_operation] = lambda instruction: (
+        {instruction['first_statement'], instruction['second_statement'], 'cx'}, set()
+    )
+for _operation in ('and', 'or', 'xor', 'shl', 'shr', 'rol', 'ror', 'mul', 'mulh', 'div', 'mod'):
+    _register_usage[_operation] = _register_usage['add']
+
+
+def register_usage(instruction: Dict) -> Tuple[Set[str], Set[str]]:
+    """Returns the general registers an instruction reads and the ones it writes. Unknown operations are assumed to
+    read every register."""
+    try:
+        reads, writes = _register_usage[instruction['operation']](instruction)
+    except KeyError:
+        return set(GENERAL_REGISTERS), set()
+    return reads & set(GENERAL_REGISTERS), writes & set(GENERAL_REGISTERS)
+
+
+def get_live_registers(text: List[Dict]) -> List[Set[str]]:
+    """Backward liveness analysis over `.text`. Returns, for each position (plus one past the end), the general
+    registers whose current value may still be read. Jumps out of `.text` keep every register alive, and a call is
+    assumed to read all of them."""
+    label_positions = {label_name(instruction): index for index, instruction in enumerate(text) if _is_label(instruction)}
+    live_in: List[Set[str]] = [set() for _ in range(len(text) + 1)]
+    usages = [register_usage(instruction) for instruction in text]
+
+    changed = True
+    while changed:
+        changed = False
+        for index in reversed(range(len(text))):
+            instruction = text[index]
+            successors = []
+            if instruction['operation'] != 'jmp':
+                successors.append(live_in[index + 1])
+            if instruction['operation'] in JUMP_OPERATIONS:
+                target = label_positions.get(instruction['first_statement'])
+                successors.append(set(GENERAL_REGISTERS) if target is None else live_in[target])
+
+            live_out = set().union(*successors)
+            reads, writes = usages[index]
+            registers = reads | (live_out - writes)
+            if registers != live_in[index]:
+                live_in[index] = registers
+                changed = True
+    return live_in
+
+
+def _count_label_references(parsed_code: ParsedCode) -> Dict[str, int]:
+    references: Dict[str, int] = {}
+    for instruction in all_lines(parsed_code):
+        if instruction['operation'] in CONTROL_FLOW_OPERATIONS:
+            references[instruction['first_statement']] = references.get(instruction['first_statement'], 0) + 1
+    return references
+
+
+def _find_simple_loops(parsed_code: ParsedCode) -> List[Tuple[int, int, int]]:
+    """Loops whose body is straight code: a run of labels only jumped to by a single jump that closes the body.
+    Returns (first header label position, first body position, closing jump position) tuples."""
+    text = parsed_code['text']
+    references = _count_label_references(parsed_code)
+    loops = []
+    for jump_position, instruction in enumerate(text):
+        if instruction['operation'] not in JUMP_OPERATIONS:
+            continue
+
+        body_start = jump_position
+        while body_start > 0 and not _is_label(text[body_start - 1]):
+            body_start -= 1
+        header_start = body_start
+        while header_start > 0 and _is_label(text[header_start - 1]):
+            header_start -= 1
+        header_labels = {label_name(label) for label in text[header_start:body_start]}
+
+        if instruction['first_statement'] not in header_labels:
+            continue
+        if any(references.get(name, 0) != (name == instruction['first_statement']) for name in header_labels):
+            continue
+        body = text[body_start:jump_position]
+        if any(line['operation'] not in _register_usage or line['operation'] in CONTROL_FLOW_OPERATIONS for line in body):
+            continue
+        loops.append((header_start, body_start, jump_position))
+    return loops
+
+
+def _rename_register(instruction: Dict, old_register: str, new_register: str) -> Dict:
+    renamed = instruction.copy()
+    for key in ('first_statement', 'second_statement'):
+        if renamed[key] == old_register:
+            renamed[key] = new_register
+    return renamed
+
+
+def _promote_variable(
+        body: List[Dict], variable: str, register: str, live_out: Set[str]
+) -> Optional[Tuple[List[Dict], bool]]:
+    """Rewrites a loop body so `register` holds `variable` for the whole loop. Every `ld x, variable` starts a range
+    where x is renamed to `register`, up to x's last read before x is overwritten, and the `ld` and any
+    `st x, variable` inside the range are dropped. Returns the new body and whether the variable was written, or
+    None if the rewrite would change what the program computes."""
+    renamed_positions: Dict[int, Dict] = {}
+    removed_positions: Set[int] = set()
+    written = False
+    range_end = -1
+
+    for position, instruction in enumerate(body):
+        if instruction['first_statement'] == variable:
+            return None
+        if instruction['second_statement'] != variable:
+            continue
+        if instruction['operation'] == 'st' and position in removed_positions:
+            continue
+        if instruction['operation'] != 'ld' or position <= range_end:
+            return None
+        loaded_register = instruction['first_statement']
+        if loaded_register not in GENERAL_REGISTERS:
+            return None
+
+        range_end = position
+        dirty = False
+        for next_position in range(position + 1, len(body)):
+            reads, writes = register_usage(body[next_position])
+            if loaded_register in writes and loaded_register not in reads:
+                break
+            if loaded_register in reads:
+                range_end = next_position
+                if body[next_position]['operation'] == 'st' and body[next_position]['second_statement'] == variable:
+                    dirty = False
+                    written = True
+                    removed_positions.add(next_position)
+                elif loaded_register in writes:
+                    dirty = True
+        else:
+            if loaded_register in live_out:
+                return None
+        if dirty:
+            return None
+
+        removed_positions.add(position)
+        for renamed_position in range(position + 1, range_end + 1):
+            renamed_positions[renamed_position] = _rename_register(body[renamed_position], loaded_register, register)
+
+    new_body = [
+        renamed_positions.get(position, instruction)
+        for position, instruction in enumerate(body) if position not in removed_positions
+    ]
+    return new_body, written
+
+
+def _get_hot_variables(body: List[Dict], variables: Set[str]) -> List[str]:
+    counts: Dict[str, int] = {}
+    for instruction in body:
+        if instruction['operation'] in MEMORY_OPERATIONS and instruction['second_statement'] in variables:
+            counts[instruction['second_statement']] = counts.get(instruction['second_statement'], 0) + 1
+    return sorted(counts, key=lambda variable: -counts[variable])
+
+
+def allocate_registers(parsed_code: ParsedCode) -> bool:
+    """Keeps the most used variables of each straight loop in registers the loop doesn't use: one `ld` before the
+    loop, one `st` after it (only if the loop writes the variable), and no memory access in between. Loops that access
+    memory through registers are left alone, since they may reach any variable, and so are programs that use
+    interrupts or several cores, since a handler or another core may change a variable in the middle of any loop."""
+    lines = all_lines(parsed_code)
+    if uses_interrupts(lines) or uses_multiple_cores(lines):
+        return False
+    text = parsed_code['text']
+    variables = {variable['variable_name'] for variable in parsed_code['data']}
+
+    for header_start, body_start, jump_position in _find_simple_loops(parsed_code):
+        body = text[body_start:jump_position + 1]
+        if any(literal_address(line['second_statement']) is not None for line in body) or uses_indexed_addresses(body):
+            continue
+
+        live_registers = get_live_registers(text)
+        exit_live_registers = live_registers[jump_position + 1] if text[jump_position]['operation'] != 'jmp' else set()
+        loop_live_out = live_registers[header_start] | exit_live_registers
+        used_registers = set().union(*(
+            {line['first_statement'], line['second_statement']} for line in body
+        ))
+        spare_registers = [
+            register for register in SPARE_REGISTER_PREFERENCE
+            if register not in used_registers and register not in exit_live_registers
+        ]
+
+        for variable, register in zip(_get_hot_variables(body, variables), spare_registers):
+            promoted = _promote_variable(body[:-1], variable, register, loop_live_out)
+            if promoted is None:
+                continue
+            new_body, written = promoted
+            load = {
+                'operation': 'ld', 'first_statement': register, 'second_statement': variable,
+                'line': text[header_start].get('line'),
+            }
+            store = {
+                'operation': 'st', 'first_statement': register, 'second_statement': variable,
+                'line': body[-1].get('line'),
+            }
+            exit_code = [store] if written else []
+            parsed_code['text'] = (
+                    text[:header_start]
+                    + [load]
+                    + text[header_start:body_start]
+                    + new_body
+                    + [body[-1]]
+                    + exit_code
+                    + text[jump_position + 1:]
+            )
+            return True
+    return False
+
+
+def default_passes(
+        ram_size_in_bytes: int = 256,
+        compact_encoding: bool = False,
+        address_size_in_bytes: int = 1
+) -> List[Callable[[ParsedCode], bool]]:
+    layout = {
+        'ram_size_in_bytes': ram_size_in_bytes,
+        'compact_encoding': compact_encoding,
+        'address_size_in_bytes': address_size_in_bytes,
+    }
+    return [
+        peephole,
+        partial(inline_subroutines, **layout),
+        partial(eliminate_dead_code, **layout),
+        allocate_registers,
+    ]
+
+
+def relocatable_passes() -> List[Callable[[ParsedCode], bool]]:
+    """The passes that are safe before linking: they neither need the RAM layout nor remove code that another object
+    might call."""
+    return [peephole, allocate_registers]
+
+
+def optimize(
+        parsed_code: ParsedCode,
+        passes: List[Callable[[ParsedCode], bool]] = None,
+        ram_size_in_bytes: int = 256,
+        compact_encoding: bool = False,
+        address_size_in_bytes: int = 1
+) -> ParsedCode:
+    """Returns an optimized copy of the parsed code (as returned by `get_parsed_code_from_file`). Each pass edits the
+    code in place and tells whether it changed anything; they run until nothing changes anymore. `ram_size_in_bytes`
+    is the RAM the optimizer may lay code out in, `address_size_in_bytes` how wide addresses are encoded."""
+    passes = default_passes(ram_size_in_bytes, compact_encoding, address_size_in_bytes) if passes is None else passes
+    optimized_code = symbolize_literal_code_addresses(
+        copy_parsed_code(parsed_code), compact_encoding, address_size_in_bytes
+    )
+    if optimized_code is None:
+        return parsed_code
+
+    for _ in range(MAX_ITERATIONS):
+        changed = False
+        for optimization_pass in passes:
+            changed |= optimization_pass(optimized_code)
+        if not changed:
+            break
+
+    # a smaller `.text` may let the variables move below address 256, onto RAM a `$n` address refers to
+    text_size = text_size_in_bytes(parsed_code, compact_encoding, address_size_in_bytes)
+    if (
+            has_low_data(optimized_code, ram_size_in_bytes, compact_encoding, address_size_in_bytes)
+            != has_low_data(parsed_code, ram_size_in_bytes, compact_encoding, address_size_in_bytes)
+            and any(address >= text_size for address in literal_addresses(parsed_code))
+    ):
+        return parsed_code
+    return optimized_code
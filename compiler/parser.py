@@ -1,3 +1,4 @@
+import re
 from typing import List, Dict, Optional
 
 try:
@@ -5,6 +6,20 @@ try:
 except ImportError:
     from errors import CompilerError
 
+# instructions written without operands, like `hlt`
+OPERANDLESS_OPERATIONS = ('hlt', 'ret', 'ei', 'di', 'iret', 'wfi')
+# the instructions a subroutine (or an interrupt handler) ends with
+SUBROUTINE_END_OPERATIONS = ('ret', 'iret')
+
+
+class SourceLine(str):
+    """A line of assembly code that remembers its (1-based) line number in the source file."""
+
+    def __new__(cls, value: str, number: int):
+        line = super().__new__(cls, value)
+        line.number = number
+        return line
+
 
 def _load_assembly_file(path_to_file: str) -> List[str]:
     """Returns a list where each item is a line of the code."""
@@ -25,6 +40,14 @@ def _parse_whitespaces(assembly_code: List[str]) -> List[str]:
     ))
 
 
+def _number_lines(assembly_code: List[str]) -> List[SourceLine]:
+    return [SourceLine(line, number) for number, line in enumerate(assembly_code, start=1)]
+
+
+def _line_number(line: str) -> Optional[int]:
+    return getattr(line, 'number', None)
+
+
 def _parse_empty_lines(assembly_code: List[str]) -> List[str]:
     return list(filter(
         lambda line: line != '', assembly_code
@@ -58,15 +81,26 @@ def _parse_data_section(assembly_code: List[str]) -> List[Dict[str, str]]:
 
         parsed_line = {
             'variable_name': split_line[0],
-            'value': split_line[2]
+            'value': split_line[2],
+            'line': _line_number(line),
         }
 
         parsed_lines.append(parsed_line)
     return parsed_lines
 
 
+def _remove_spaces_inside_brackets(line: str) -> str:
+    """`[bx + 2]` -> `[bx+2]`, so an indexed address is a single statement."""
+    return re.sub(r'\[[^\]]*\]', lambda match: match.group(0).replace(' ', ''), line)
+
+
 def _parse_line(line: str) -> Dict[str, str]:
-    split_line = line.replace(', ', ',').split(' ')
+    split_line = _remove_spaces_inside_brackets(line).replace(', ', ',').split(' ')
+
+    if len(split_line) == 1 and split_line[0] in OPERANDLESS_OPERATIONS:
+        return {
+            'operation': split_line[0], 'first_statement': None, 'second_statement': None, 'line': _line_number(line)
+        }
 
     if len(split_line) != 2:
         raise CompilerError(f'"{line}" should contain only 2 statements: "operation ref1, ref2"')
@@ -76,7 +110,8 @@ def _parse_line(line: str) -> Dict[str, str]:
     parsed_line = {
         'operation': split_line[0],
         'first_statement': statements[0],
-        'second_statement': statements[1] if len(statements) > 1 else None
+        'second_statement': statements[1] if len(statements) > 1 else None,
+        'line': _line_number(line),
     }
     return parsed_line
 
@@ -97,9 +132,10 @@ def _parse_subroutines_section(assembly_code: List[str]) -> List[Dict[str, str]]
             if current_subroutine != {}:
                 raise CompilerError(f'Missing ret statement on subroutine "{current_subroutine["label"]}"')
 
-            current_subroutine = {'label': f'{line.replace(":", "")}', 'lines': []}
-        elif line == 'ret':
-            current_subroutine['lines'].append({'operation': 'ret', "first_statement": None, 'second_statement': None})
+            current_subroutine = {'label': f'{line.replace(":", "")}', 'lines': [], 'line': _line_number(line)}
+        elif line in SUBROUTINE_END_OPERATIONS:
+            current_subroutine['lines'].append(
+                {'operation': line, "first_statement": None, 'second_statement': None, 'line': _line_number(line)})
             subroutines.append(current_subroutine)
             current_subroutine = {}
         else:
@@ -143,7 +179,8 @@ def _do_all_parsing(assembly_code: List[str]) -> Dict[str, List[Dict[str, Option
     parsed_comments = _parse_comments(assembly_code)
     parsed_newlines = _parse_newline(parsed_comments)
     parsed_whitespaces = _parse_whitespaces(parsed_newlines)
-    parsed_empty_lines = _parse_empty_lines(parsed_whitespaces)
+    numbered_lines = _number_lines(parsed_whitespaces)
+    parsed_empty_lines = _parse_empty_lines(numbered_lines)
     parsed_sections = _parse_sections(parsed_empty_lines)
     return parsed_sections
 
@@ -62,7 +62,9 @@ class ArithmeticLogicUnit:
     @opcode.setter
     def opcode(self, value: BitArray):
         units = [self.ADD, self.SUB, self.NOT,
-                 self.INC, self.DEC, self.OR, self.AND, self.XOR]
+                 self.INC, self.DEC, self.OR, self.AND, self.XOR,
+                 self.SHL, self.SHR, self.ROL, self.ROR,
+                 self.MUL, self.MULH, self.DIV, self.MOD]
         demux = Demultiplexer(units)
         demux.selection = value
         selected_action = demux.output
@@ -93,6 +95,52 @@ class ArithmeticLogicUnit:
     def XOR(self):
         self._set_output(self.A ^ self.B)
 
+    def _shift_amount(self) -> int:
+        return self.B.to_int() % self.A.size
+
+    def _mask(self) -> int:
+        return (1 << self.A.size) - 1
+
+    def SHL(self):
+        self._set_output(BitArray((self.A.to_int() << self._shift_amount()) & self._mask(), size=self.A.size))
+
+    def SHR(self):
+        self._set_output(BitArray(self.A.to_int() >> self._shift_amount(), size=self.A.size))
+
+    def ROL(self):
+        amount = self._shift_amount()
+        value = self.A.to_int()
+        rotated = (value << amount | value >> (self.A.size - amount)) & self._mask()
+        self._set_output(BitArray(rotated, size=self.A.size))
+
+    def ROR(self):
+        amount = self._shift_amount()
+        value = self.A.to_int()
+        rotated = (value >> amount | value << (self.A.size - amount)) & self._mask()
+        self._set_output(BitArray(rotated, size=self.A.size))
+
+    def MUL(self):
+        """Lower byte of the 16 bit product."""
+        self._set_output(BitArray((self.A.to_int() * self.B.to_int()) & self._mask(), size=self.A.size))
+
+    def MULH(self):
+        """Upper byte of the 16 bit product."""
+        self._set_output(BitArray((self.A.to_int() * self.B.to_int()) >> self.A.size, size=self.A.size))
+
+    def DIV(self):
+        """Unsigned quotient. Dividing by zero gives all ones."""
+        if self.B.to_int() == 0:
+            self._set_output(BitArray(self._mask(), size=self.A.size))
+            return
+        self._set_output(BitArray(self.A.to_int() // self.B.to_int(), size=self.A.size))
+
+    def MOD(self):
+        """Unsigned remainder. Dividing by zero leaves A as the remainder."""
+        if self.B.to_int() == 0:
+            self._set_output(BitArray(self.A.to_int(), size=self.A.size))
+            return
+        self._set_output(BitArray(self.A.to_int() % self.B.to_int(), size=self.A.size))
+
 
 if __name__ == '__main__':
     alu = ArithmeticLogicUnit()
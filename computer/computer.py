@@ -1,18 +1,45 @@
 import time
+from typing import Dict, List, Optional
 
+from . import isa
 from .alu import ArithmeticLogicUnit
 from .cpu import CentralProcessingUnit
+from .devices import Device
+from .dma import DirectMemoryAccessController
+from .events import CoreProcess, EventScheduler
+from .interrupts import InterruptController, TimerDevice
 from .memory import RandomAccessMemory
+from .source_map import SourceMap, SourceLocation, STACK_SECTION
 
 
 class Computer:
-    def __init__(self, clock_speed_limiter_in_hertz: int = 0):
+    def __init__(
+            self,
+            clock_speed_limiter_in_hertz: int = 0,
+            source_map: Optional[SourceMap] = None,
+            compact_encoding: bool = False,
+            dma_setup_cycles: int = 1,
+            dma_bytes_per_cycle: int = 4,
+            ram_size_in_bytes: int = isa.DEFAULT_RAM_SIZE_IN_BYTES,
+            ram_page_size_in_bytes: Optional[int] = None
+    ):
+        """With `ram_page_size_in_bytes`, the RAM is sparse: its pages are only allocated once they are written to
+        (see `PagedMemory`)."""
         self._alu = ArithmeticLogicUnit()
-        self._ram = RandomAccessMemory(size_in_bytes=256)
+        self._ram = RandomAccessMemory(size_in_bytes=ram_size_in_bytes, page_size_in_bytes=ram_page_size_in_bytes)
+        self._dma = DirectMemoryAccessController(
+            self._ram, setup_cycles=dma_setup_cycles, bytes_per_cycle=dma_bytes_per_cycle
+        )
         self.cpu = CentralProcessingUnit(
-            alu=self._alu, ram=self._ram, clock_speed_limiter_in_hertz=clock_speed_limiter_in_hertz
+            alu=self._alu,
+            ram=self._ram,
+            clock_speed_limiter_in_hertz=clock_speed_limiter_in_hertz,
+            compact_encoding=compact_encoding,
+            dma=self._dma
         )
         self._total_run_time = 0
+        self._source_map = None
+        self.source_map = source_map
 
     @property
     def ram(self):
@@ -22,16 +49,99 @@ class Computer:
     def alu(self):
         return self._alu
 
-    def run(self):
+    @property
+    def dma(self):
+        return self._dma
+
+    def map_device(self, address: int, device: Device):
+        """Maps a device (see computer/devices.py) into the RAM, from `address` on."""
+        self.ram.map_device(address, device)
+
+    @property
+    def interrupt_controller(self) -> Optional[InterruptController]:
+        return self.cpu.interrupt_controller
+
+    def map_interrupt_controller(self, address: int) -> InterruptController:
+        """Maps an interrupt controller (and so its vector table) from `address` on, and connects it to the CPU."""
+        if self.cpu.interrupt_controller is not None:
+            raise ValueError('The computer already has an interrupt controller')
+        interrupt_controller = InterruptController(self.cpu.address_size_in_bytes)
+        self.map_device(address, interrupt_controller)
+        self.cpu.interrupt_controller = interrupt_controller
+        return interrupt_controller
+
+    def map_timer(self, address: int, line: int = 0) -> TimerDevice:
+        """Maps a timer that requests interrupts on `line`. The interrupt controller must be mapped first."""
+        if self.cpu.interrupt_controller is None:
+            raise ValueError('A timer needs an interrupt controller to request interrupts from')
+        timer = TimerDevice(self.cpu.interrupt_controller, line)
+        self.map_device(address, timer)
+        return timer
+
+    @property
+    def source_map(self) -> Optional[SourceMap]:
+        return self._source_map
+
+    @source_map.setter
+    def source_map(self, source_map: Optional[SourceMap]):
+        """The stack region of the source map, if it has one, is where the CPU checks for stack overflows."""
+        self._source_map = source_map
+        stack_addresses = source_map.addresses_of_section(STACK_SECTION) if source_map is not None else []
+        self.cpu.stack_limit = min(stack_addresses) if stack_addresses else None
+
+    def run(self, max_cycles: int = 0):
+        """Runs until the CPU halts, or until `max_cycles` cycles were executed when it is greater than 0. While the CPU
+        waits for an interrupt, the cycles until the next one are skipped at once."""
         start_time = time.perf_counter()
-        while not self.cpu.halt:
-            self.cpu.cycle()
+        try:
+            while not self.cpu.halt:
+                if 0 < max_cycles <= self.cpu.cycle_counter:
+                    break
+                if self.cpu.waiting and (self.cpu.skip_idle_cycles(max_cycles) or self.cpu.halt):
+                    continue
+                self.cpu.cycle()
+        finally:
+            self.ram.flush_devices()
         self._total_run_time = time.perf_counter() - start_time
 
+    def attach(self, scheduler: EventScheduler, quantum_in_cycles: int = 1) -> List[CoreProcess]:
+        """Runs the computer under an event scheduler, along with whatever else is attached to it, instead of with
+        `run`. The devices are flushed when the CPU halts."""
+        return [CoreProcess(scheduler, self.cpu, quantum_in_cycles, on_halt=self.ram.flush_devices)]
+
+    @property
+    def cycle_counter(self) -> int:
+        return self.cpu.cycle_counter
+
+    @property
+    def total_run_time(self) -> float:
+        return self._total_run_time
+
+    def source_location(self, address: Optional[int] = None) -> Optional[SourceLocation]:
+        """Where an address (by default the program counter) comes from in the assembly code, if a source map is
+        loaded."""
+        if self.source_map is None:
+            return None
+        if address is None:
+            address = self.cpu.program_counter_register.value
+        return self.source_map.lookup(address)
+
+    def registers(self) -> Dict[str, int]:
+        return {
+            'ax': self.cpu.register_A.value,
+            'bx': self.cpu.register_B.value,
+            'cx': self.cpu.register_C.value,
+            'dx': self.cpu.register_D.value,
+            'acc': self.cpu.accumulator_register.value,
+            'sr': self.cpu.status_register.value,
+            'pc': self.cpu.program_counter_register.value,
+            'sp': self.cpu.stack_pointer.value,
+        }
+
     def status(self):
         print(f'-----------------------\n'
               f'execution took: {self._total_run_time} seconds\n'
-              f'cycles: {self.cpu.cycle_counter}\n'
+              f'cycles: {self.cycle_counter}\n'
               # f'average clock speed: {self.cpu.cycle_counter / self._total_run_time} Hz\n'
               f'-----------------------\n'
               f'ax: {self.cpu.register_A}\n'
@@ -44,6 +154,34 @@ class Computer:
               f'pc: {self.cpu.program_counter_register}\n'
               f'sp: {self.cpu.stack_pointer}\n'
               f'-----------------------\n'
+              f'{self._source_location_status()}'
+              f'{self._page_status()}'
+              f'{self._interrupt_status()}'
               f'ram:\n'
               f'{self.ram}')
 
+    def _interrupt_status(self) -> str:
+        if self.interrupt_controller is None:
+            return ''
+        return (f'interrupts: {self.interrupt_controller.serviced_interrupts} serviced, '
+                f'{self.cpu.skipped_idle_cycles} idle cycles skipped\n'
+                f'-----------------------\n')
+
+    def _page_status(self) -> str:
+        stats = self.ram.get_page_stats()
+        if stats is None:
+            return ''
+        return (f'ram pages: {stats["mapped_pages"]} of {stats["pages"]} mapped ({stats["mapped_bytes"]} bytes, '
+                f'{stats["page_size"]} bytes per page)\n'
+                f'-----------------------\n')
+
+    def _source_location_status(self) -> str:
+        if self.source_map is None:
+            return ''
+        # the program counter is left on the instruction after the one that halted
+        halt_size = isa.get_instruction_size(
+            isa.INSTRUCTIONS_BY_NAME['hlt'], self.cpu.compact_encoding, self.cpu.address_size_in_bytes
+        )
+        address = max(self.cpu.program_counter_register.value - halt_size, 0)
+        location = self.source_location(address)
+        return f'halted at: ${address} {location or "(outside the program)"}\n-----------------------\n'
@@ -1,15 +1,42 @@
 import time
+from typing import Optional, Tuple
 
+from . import isa
 from .alu import ArithmeticLogicUnit
 from .base import Bit, BitArray, Demultiplexer
-from .memory import Register, RandomAccessMemory
+from .dma import DirectMemoryAccessController
+from .errors import StackOverflowError
+from .interrupts import InterruptController
+from .memory import Register, ReadOnlyRegister, RandomAccessMemory
+
+# extra cycles it takes to push the return address and the status register and jump to a handler
+INTERRUPT_ENTRY_CYCLES = 1
 
 
 class CentralProcessingUnit:
-    def __init__(self, alu: ArithmeticLogicUnit, ram: RandomAccessMemory, clock_speed_limiter_in_hertz: int = 0):
+    def __init__(
+            self,
+            alu: ArithmeticLogicUnit,
+            ram: RandomAccessMemory,
+            clock_speed_limiter_in_hertz: int = 0,
+            compact_encoding: bool = False,
+            dma: Optional[DirectMemoryAccessController] = None,
+            core_id: int = 0
+    ):
+        """`core_id` is the number of the core on a multi-core computer (see computer/multicore.py); programs read it
+        from the `id` register."""
         self.clock_speed_limiter_in_hertz = clock_speed_limiter_in_hertz
+        # in the compact encoding, operand-less instructions are a single byte and their operand is never fetched
+        self.compact_encoding = compact_encoding
         self.alu = alu
         self.ram = ram
+        # the program counter, the address register and the stack pointer are as wide as the RAM needs
+        self.address_size_in_bytes = isa.get_address_size_in_bytes(ram.memory_size)
+        address_size_in_bits = 8 * self.address_size_in_bytes
+        self._operand_sizes = [
+            size - 1 for size in isa.get_instruction_sizes(compact_encoding, self.address_size_in_bytes)
+        ]
+        self.dma = DirectMemoryAccessController(ram) if dma is None else dma
 
         self.register_A = Register(size_in_bits=8)
         self.register_B = Register(size_in_bits=8)
@@ -17,55 +44,23 @@ class CentralProcessingUnit:
         self.register_D = Register(size_in_bits=8)
 
         self.instruction_register = Register(size_in_bits=8)
-        self.address_register = Register(size_in_bits=8)
-        self.program_counter_register = Register(size_in_bits=8)
+        self.address_register = Register(size_in_bits=address_size_in_bits)
+        self.program_counter_register = Register(size_in_bits=address_size_in_bits)
         self.accumulator_register = Register(size_in_bits=8)
         self.status_register = Register(size_in_bits=8)
-        self.stack_pointer = Register(size_in_bits=8)
-
-        self.selectable_registers = [
-            self.register_A,
-            self.register_B,
-            self.register_C,
-            self.register_D,
-            self.accumulator_register,
-            self.status_register
-        ]
-        self.instructions = [
-            self.HLT,  # 00000000 -> int 0
-            self.LDA,  # 00000001 -> int 1
-            self.LDB,  # 00000010 -> int 2
-            self.LDC,  # 00000011 -> int 3
-            self.LDD,  # 00000100 -> int 4
-            self.STA,  # 00000101 -> int 5
-            self.STB,  # 00000110 -> int 6
-            self.STC,  # 00000111 -> int 7
-            self.STD,  # 00001000 -> int 8
-            self.ADD,  # 00001001 -> int 9
-            self.SUB,  # 00001010 -> int 10
-            self.INC,  # 00001011 -> int 11
-            self.DEC,  # 00001100 -> int 12
-            self.CMP,  # 00001101 -> int 13
-            self.JMP,  # 00001110 -> int 14
-            self.JIL,  # 00001111 -> int 15
-            self.JIG,  # 00010000 -> int 16
-            self.JIE,  # 00010001 -> int 17
-            self.JNE,  # 00010010 -> int 18
-            self.PUSH,  # 00010011 -> int 19
-            self.POP,  # 00010100 -> int 20
-            self.CALL,  # 00010101 -> int 21
-            self.RET,  # 00010110 -> int 22
-            self.DLY,  # 00010111 -> int 23
-        ]
+        self.core_id = core_id
+        self.core_id_register = ReadOnlyRegister(size_in_bits=8, value=core_id)
+        # the stack descends from the top of the RAM: it starts at 0, so the first push wraps around to the last byte
+        self.stack_pointer = Register(size_in_bits=address_size_in_bits)
+        self.stack_top = 0
+        # lowest address the stack may grow into, checked only when pushing. None means it is not checked
+        self.stack_limit: Optional[int] = None
+
+        self.selectable_registers = isa.get_selectable_registers(self)
+        # generated from the ISA table, so the list index is the opcode
+        self.instructions = isa.get_dispatch_table(self)
         self.instruction_selector = Demultiplexer(self.instructions)
-        self.register_selector = Demultiplexer([
-            self.register_A,
-            self.register_B,
-            self.register_C,
-            self.register_D,
-            self.accumulator_register,
-            self.status_register
-        ])
+        self.register_selector = Demultiplexer(self.selectable_registers)
 
         self.is_equal_mask = BitArray('00000010')
         self.is_greater_mask = BitArray('00000100')
@@ -75,7 +70,21 @@ class CentralProcessingUnit:
         self._current_address = BitArray(0, size=4)
         self._halt = Bit(0)
         self._not_skip_increment = Bit(1)
+        self._operand_size = 1
         self._cycle_counter = 0
+        # extra cycles the current instruction takes, e.g. for a DMA transfer
+        self._stall_cycles = 0
+
+        # None until an interrupt controller is connected, so a CPU without one never checks for interrupts
+        self.interrupt_controller: Optional[InterruptController] = None
+        self._interrupts_enabled = False
+        # set by wfi, until an interrupt is requested
+        self._waiting = False
+        self.skipped_idle_cycles = 0
+
+        self.test_and_sets = 0
+        # test-and-sets that found the byte already set, e.g. a lock another core holds
+        self.contended_test_and_sets = 0
 
     @property
     def halt(self):
@@ -85,15 +94,50 @@ class CentralProcessingUnit:
     def cycle_counter(self):
         return self._cycle_counter
 
-    def increment_program_counter(self):
-        false = Bit(0)
-        true = Bit(1)
-        self.program_counter_register.read_enable = true
-        self.alu.A = self.program_counter_register.memory
-        self.program_counter_register.read_enable = false
-        self.alu.opcode = BitArray('0011', size=4)
+    @property
+    def waiting(self) -> bool:
+        return self._waiting
+
+    @property
+    def interrupts_enabled(self) -> bool:
+        return self._interrupts_enabled
+
+    def place_stack(self, stack_top: int, stack_limit: Optional[int] = None):
+        """Moves the stack: the first push goes right below `stack_top`, and pushing below `stack_limit` (when given)
+        is a stack overflow. Each core of a multi-core computer has its own stack."""
+        self.stack_top = stack_top
+        self.stack_limit = stack_limit
+        self.stack_pointer.write_enable = Bit(1)
+        self.stack_pointer.memory = self._to_address(stack_top)
+        self.stack_pointer.write_enable = Bit(0)
+
+    def reset(self):
+        """Clears every register and the halt flag, so the program starts over from address 0. RAM is left as is."""
+        registers = self.selectable_registers + [
+            self.instruction_register, self.address_register, self.program_counter_register, self.stack_pointer
+        ]
+        for register in registers:
+            register.write_enable = Bit(1)
+            register.memory = BitArray(0)
+            register.write_enable = Bit(0)
+        self.place_stack(self.stack_top, self.stack_limit)
+        self._halt = Bit(0)
+        self._not_skip_increment = Bit(1)
+        self._operand_size = 1
+        self._interrupts_enabled = False
+        self._waiting = False
+
+    def _to_address(self, value: int) -> BitArray:
+        """An address as wide as the address registers, wrapping around the end of the RAM."""
+        return BitArray(value % self.ram.memory_size, size=8 * self.address_size_in_bytes)
+
+    def increment_program_counter(self, amount: int = 1):
+        # the program counter has its own incrementer, since it can be wider than the ALU
+        self.program_counter_register.read_enable = Bit(1)
+        program_counter = self.program_counter_register.memory.to_int()
+        self.program_counter_register.read_enable = Bit(0)
         self.program_counter_register.write_enable = self._not_skip_increment
-        self.program_counter_register.memory = self.alu.output
+        self.program_counter_register.memory = self._to_address(program_counter + amount)
         self.flush()
 
     def fetch_phase_one(self):
@@ -111,11 +155,26 @@ class CentralProcessingUnit:
     def fetch_phase_two(self):
         true = Bit(1)
         self.address_register.write_enable = true
+        self._operand_size = self._operand_sizes[self.instruction_register.value]
+        if not self._operand_size:
+            self.address_register.memory = BitArray(0)
+            self.flush()
+            return
+
         self.program_counter_register.read_enable = true
         self.ram.read_enable = true
 
-        self.ram.address = self.program_counter_register.memory
-        self.address_register.memory = self.ram.bus
+        if self._operand_size == 1:
+            self.ram.address = self.program_counter_register.memory
+            self.address_register.memory = self.ram.bus
+        else:
+            # wider operands (addresses) are little-endian
+            program_counter = self.program_counter_register.memory.to_int()
+            operand = 0
+            for offset in range(self._operand_size):
+                self.ram.address = self._to_address(program_counter + offset)
+                operand |= self.ram.bus.to_int() << 8 * offset
+            self.address_register.memory = BitArray(operand, size=8 * self._operand_size)
 
         self.flush()
 
@@ -131,7 +190,9 @@ class CentralProcessingUnit:
         self.flush()
 
     def end_phase(self):
-        self.increment_program_counter()
+        # steps over the operand, unless there was none or the instruction set the program counter
+        if self._operand_size:
+            self.increment_program_counter(self._operand_size)
         self._not_skip_increment = Bit(1)
 
     def flush(self):
@@ -154,8 +215,61 @@ class CentralProcessingUnit:
                 phase()
                 yield phase.__name__
 
+    def _check_interrupts(self):
+        """A requested interrupt wakes up a waiting CPU, and is serviced if interrupts are enabled."""
+        line = self.interrupt_controller.pending_line()
+        if line is None:
+            return
+        self._waiting = False
+        if not self._interrupts_enabled:
+            return
+        handler_address = self.interrupt_controller.acknowledge(line)
+        self.program_counter_register.read_enable = Bit(1)
+        self._push_return_address(self.program_counter_register.memory.to_int())
+        self.program_counter_register.read_enable = Bit(0)
+        self.status_register.read_enable = Bit(1)
+        self._push(self.status_register.memory)
+        self.status_register.read_enable = Bit(0)
+        self._interrupts_enabled = False
+
+        self.program_counter_register.write_enable = Bit(1)
+        self.program_counter_register.memory = self._to_address(handler_address)
+        self.program_counter_register.write_enable = Bit(0)
+        self._stall_cycles += INTERRUPT_ENTRY_CYCLES
+
+    def skip_idle_cycles(self, max_cycles: int = 0) -> int:
+        """Jumps a waiting CPU straight to the cycle its next interrupt is requested at, instead of idling one cycle
+        at a time, without going past `max_cycles` when it is greater than 0. A CPU that waits for an interrupt nothing
+        will ever request halts. Returns the cycles skipped."""
+        if self.interrupt_controller is None:
+            self._halt = Bit(1)
+            return 0
+        cycles = self.interrupt_controller.cycles_until_next_event()
+        if cycles is None:
+            self._halt = Bit(1)
+            return 0
+        if max_cycles > 0:
+            cycles = min(cycles, max_cycles - self._cycle_counter)
+        if cycles <= 0:
+            return 0
+        self.idle(cycles)
+        return cycles
+
+    def idle(self, cycles: int):
+        """Lets `cycles` cycles go by while the CPU waits for an interrupt, all at once."""
+        if self.clock_speed_limiter_in_hertz > 0:
+            time.sleep(cycles / self.clock_speed_limiter_in_hertz)
+        self._cycle_counter += cycles
+        if self.interrupt_controller is not None:
+            self.interrupt_controller.advance(cycles)
+        self.skipped_idle_cycles += cycles
+
     def cycle(self):
         def execute_cycle():
+            if self.interrupt_controller is not None:
+                self._check_interrupts()
+                if self._waiting:
+                    return
             self.fetch_phase_one()
             self.fetch_phase_two()
             self.decode_phase()
@@ -168,11 +282,14 @@ class CentralProcessingUnit:
             execute_cycle()
             end_time = time.perf_counter()
             elapsed_time = end_time - start_time
-            time.sleep(1 / self.clock_speed_limiter_in_hertz - elapsed_time)
+            time.sleep((1 + self._stall_cycles) / self.clock_speed_limiter_in_hertz - elapsed_time)
         else:
             execute_cycle()
 
-        self._cycle_counter += 1
+        self._cycle_counter += 1 + self._stall_cycles
+        if self.interrupt_controller is not None:
+            self.interrupt_controller.advance(1 + self._stall_cycles)
+        self._stall_cycles = 0
 
     def update_status_register(self):
         self.status_register.write_enable = Bit(1)
@@ -239,7 +356,8 @@ class CentralProcessingUnit:
     def HLT(self, *args, **kwargs):
         self._halt = Bit(1)
 
-    def _add_sub(self, opcode: str, registers: BitArray):
+    def _alu_operation(self, opcode: str, registers: BitArray):
+        """Runs the ALU on two registers, the result goes to the accumulator."""
         true = Bit(1)
         false = Bit(0)
         reg2_address, reg1_address = registers.divide(4)
@@ -257,10 +375,47 @@ class CentralProcessingUnit:
         self.update_accumulator_register()
 
     def ADD(self, register_addresses: BitArray):
-        self._add_sub('0000', register_addresses)
+        self._alu_operation('0000', register_addresses)
 
     def SUB(self, register_addresses: BitArray):
-        self._add_sub('0001', register_addresses)
+        self._alu_operation('0001', register_addresses)
+
+    def AND(self, register_addresses: BitArray):
+        self._alu_operation('0110', register_addresses)
+
+    def OR(self, register_addresses: BitArray):
+        self._alu_operation('0101', register_addresses)
+
+    def XOR(self, register_addresses: BitArray):
+        self._alu_operation('0111', register_addresses)
+
+    def SHL(self, register_addresses: BitArray):
+        """Shifts the first register left by the second one's value (modulo 8)"""
+        self._alu_operation('1000', register_addresses)
+
+    def SHR(self, register_addresses: BitArray):
+        """Shifts the first register right by the second one's value (modulo 8)"""
+        self._alu_operation('1001', register_addresses)
+
+    def ROL(self, register_addresses: BitArray):
+        self._alu_operation('1010', register_addresses)
+
+    def ROR(self, register_addresses: BitArray):
+        self._alu_operation('1011', register_addresses)
+
+    def MUL(self, register_addresses: BitArray):
+        """Lower byte of the product"""
+        self._alu_operation('1100', register_addresses)
+
+    def MULH(self, register_addresses: BitArray):
+        """Upper byte of the product"""
+        self._alu_operation('1101', register_addresses)
+
+    def DIV(self, register_addresses: BitArray):
+        self._alu_operation('1110', register_addresses)
+
+    def MOD(self, register_addresses: BitArray):
+        self._alu_operation('1111', register_addresses)
 
     def INC(self, register_address: BitArray):
         self.register_selector.selection = BitArray(register_address.to_int(), size=2)
@@ -290,6 +445,20 @@ class CentralProcessingUnit:
         selected_register.memory = self.alu.output
         self.update_status_register()
 
+    def NOT(self, register_address: BitArray):
+        self.register_selector.selection = BitArray(register_address.to_int(), size=2)
+        selected_register: Register = self.register_selector.output
+        selected_register.read_enable = Bit(1)
+
+        self.alu.A = selected_register.memory
+        self.alu.opcode = BitArray('0010')
+
+        selected_register.read_enable = Bit(0)
+        selected_register.write_enable = Bit(1)
+
+        selected_register.memory = self.alu.output
+        self.update_status_register()
+
     def CMP(self, register_addresses: BitArray):
         true = Bit(1)
 
@@ -340,36 +509,83 @@ class CentralProcessingUnit:
         self.program_counter_register.write_enable = ~zero_bit_flag
         self.program_counter_register.memory = ram_address
 
-    def PUSH(self, register_address: BitArray):
-        true = Bit(1)
+    def _push(self, value: BitArray):
+        """Decrements the stack pointer, then writes the value where it points."""
+        self.stack_pointer.read_enable = Bit(1)
+        stack_pointer = self._to_address(self.stack_pointer.memory.to_int() - 1).to_int()
+        self.stack_pointer.read_enable = Bit(0)
+        if self.stack_limit is not None and stack_pointer < self.stack_limit:
+            raise StackOverflowError(
+                f'Stack overflow at cycle {self._cycle_counter}: pushing to ${stack_pointer}, below the stack\'s lowest '
+                f'address ${self.stack_limit}'
+            )
+
+        self.stack_pointer.write_enable = Bit(1)
+        self.stack_pointer.memory = self._to_address(stack_pointer)
+        self.stack_pointer.write_enable = Bit(0)
+
+        self.ram.address = self._to_address(stack_pointer)
+        self.ram.write_enable = Bit(1)
+        self.ram.bus = value
+        self.ram.write_enable = Bit(0)
+
+    def _pop(self) -> BitArray:
+        """Reads the value the stack pointer points to, then increments it."""
+        self.stack_pointer.read_enable = Bit(1)
+        stack_pointer = self.stack_pointer.memory
+        self.stack_pointer.read_enable = Bit(0)
+
+        self.ram.address = stack_pointer
+        self.ram.read_enable = Bit(1)
+        value = self.ram.bus
+        self.ram.read_enable = Bit(0)
+
+        self.stack_pointer.write_enable = Bit(1)
+        self.stack_pointer.memory = self._to_address(stack_pointer.to_int() + 1)
+        self.stack_pointer.write_enable = Bit(0)
+        return value
 
+    def PUSH(self, register_address: BitArray):
         self.register_selector.selection = register_address
         register = self.register_selector.output
 
-        register.read_enable = true
-        self.stack_pointer.write_enable = true
-
-        self.stack_pointer.memory = register.memory
+        register.read_enable = Bit(1)
+        self._push(register.memory)
 
     def POP(self, register_address: BitArray):
-        true = Bit(1)
+        value = self._pop()
 
         self.register_selector.selection = register_address
         register = self.register_selector.output
 
-        register.write_enable = true
-        self.stack_pointer.read_enable = true
-
-        register.memory = self.stack_pointer.memory
+        register.write_enable = Bit(1)
+        register.memory = value
+
+    def _push_return_address(self, next_instruction_address: int):
+        """ret and iret step over their own operand (if they have one) after returning, so what is pushed is that much
+        before the instruction to return to."""
+        return_address = next_instruction_address - self._operand_sizes[isa.INSTRUCTIONS_BY_NAME['ret'].opcode]
+        # most significant byte first, so the address is little-endian in RAM, like the operands
+        for byte_index in reversed(range(self.address_size_in_bytes)):
+            self._push(BitArray(return_address >> 8 * byte_index & 0xFF))
+
+    def _pop_return_address(self):
+        return_address = 0
+        for byte_index in range(self.address_size_in_bytes):
+            return_address |= self._pop().to_int() << 8 * byte_index
+        self.program_counter_register.write_enable = Bit(1)
+        self.program_counter_register.memory = self._to_address(return_address)
+        self.program_counter_register.write_enable = Bit(0)
 
     def CALL(self, ram_address: BitArray):
         true = Bit(1)
         false = Bit(0)
 
         self.program_counter_register.read_enable = true
-        self.stack_pointer.write_enable = true
-        self.stack_pointer.memory = self.program_counter_register.memory
-        self.stack_pointer.write_enable = false
+        # the program counter is on the call's operand
+        self._push_return_address(
+            self.program_counter_register.memory.to_int() + self._operand_sizes[isa.INSTRUCTIONS_BY_NAME['call'].opcode]
+        )
         self.program_counter_register.read_enable = false
 
         self.program_counter_register.write_enable = true
@@ -377,17 +593,221 @@ class CentralProcessingUnit:
         self._not_skip_increment = false
 
     def RET(self, *args, **kwargs):
-        true = Bit(1)
-        false = Bit(0)
+        self._pop_return_address()
 
-        self.program_counter_register.write_enable = true
-        self.stack_pointer.read_enable = true
-        self.program_counter_register.memory = self.stack_pointer.memory
-        self.stack_pointer.read_enable = false
-        self.program_counter_register.write_enable = false
+    def EI(self, *args, **kwargs):
+        """Enable interrupts"""
+        self._interrupts_enabled = True
+
+    def DI(self, *args, **kwargs):
+        """Disable interrupts"""
+        self._interrupts_enabled = False
+
+    def IRET(self, *args, **kwargs):
+        """Return from an interrupt handler: restores the status register and the program counter, and enables
+        interrupts again"""
+        status = self._pop()
+        self.status_register.write_enable = Bit(1)
+        self.status_register.memory = status
+        self.status_register.write_enable = Bit(0)
+        self._pop_return_address()
+        self._interrupts_enabled = True
+
+    def WFI(self, *args, **kwargs):
+        """Wait for an interrupt. Without an interrupt controller nothing can ever be requested, so it halts"""
+        if self.interrupt_controller is None:
+            self._halt = Bit(1)
+            return
+        self._waiting = True
+
+    def _test_and_set(self, register_address: BitArray, ram_address: BitArray):
+        """Loads a byte and sets it to 1 in the same instruction, so no other core can get in between"""
+        self.ram.address = ram_address
+        self.ram.read_enable = Bit(1)
+        value = self.ram.bus
+        self.ram.read_enable = Bit(0)
+        self.ram.write_enable = Bit(1)
+        self.ram.bus = BitArray(1)
+        self.ram.write_enable = Bit(0)
+
+        self.register_selector.selection = register_address
+        selected_register = self.register_selector.output
+        selected_register.write_enable = Bit(1)
+        selected_register.memory = value
+        self.test_and_sets += 1
+        if value.to_int():
+            self.contended_test_and_sets += 1
+
+    def TASA(self, ram_address: BitArray):
+        """Load contents of RAM {address} into the Register A, and set them to 1"""
+        self._test_and_set(register_address=BitArray('0000'), ram_address=ram_address)
+
+    def TASB(self, ram_address: BitArray):
+        """Load contents of RAM {address} into the Register B, and set them to 1"""
+        self._test_and_set(register_address=BitArray('0001'), ram_address=ram_address)
+
+    def TASC(self, ram_address: BitArray):
+        """Load contents of RAM {address} into the Register C, and set them to 1"""
+        self._test_and_set(register_address=BitArray('0010'), ram_address=ram_address)
+
+    def TASD(self, ram_address: BitArray):
+        """Load contents of RAM {address} into the Register D, and set them to 1"""
+        self._test_and_set(register_address=BitArray('0011'), ram_address=ram_address)
 
     def DLY(self, register_address: BitArray):
         self.register_selector.selection = register_address
         register: Register = self.register_selector.output
         register.read_enable = Bit(1)
         time.sleep(register.memory.to_int())
+
+    def _load_immediate(self, register_address: BitArray, value: BitArray):
+        self.register_selector.selection = register_address
+        selected_register = self.register_selector.output
+        selected_register.write_enable = Bit(1)
+        selected_register.memory = value
+
+    def _immediate_operation(self, alu_opcode: str, register_address: BitArray, value: BitArray, write_back: bool):
+        """Runs the ALU on a register and a constant. The result goes back into the register when `write_back` is
+        set; the status register is updated either way."""
+        self.register_selector.selection = register_address
+        selected_register: Register = self.register_selector.output
+        selected_register.read_enable = Bit(1)
+
+        self.alu.A = selected_register.memory
+        self.alu.B = value
+        self.alu.opcode = BitArray(alu_opcode, size=4)
+
+        selected_register.read_enable = Bit(0)
+        if write_back:
+            selected_register.write_enable = Bit(1)
+            selected_register.memory = self.alu.output
+        self.update_status_register()
+
+    def LDIA(self, value: BitArray):
+        """Load the constant {value} into the Register A"""
+        self._load_immediate(register_address=BitArray('0000'), value=value)
+
+    def LDIB(self, value: BitArray):
+        """Load the constant {value} into the Register B"""
+        self._load_immediate(register_address=BitArray('0001'), value=value)
+
+    def LDIC(self, value: BitArray):
+        """Load the constant {value} into the Register C"""
+        self._load_immediate(register_address=BitArray('0010'), value=value)
+
+    def LDID(self, value: BitArray):
+        """Load the constant {value} into the Register D"""
+        self._load_immediate(register_address=BitArray('0011'), value=value)
+
+    def ADDIA(self, value: BitArray):
+        """Add the constant {value} to the Register A"""
+        self._immediate_operation('0000', BitArray('0000'), value, write_back=True)
+
+    def ADDIB(self, value: BitArray):
+        """Add the constant {value} to the Register B"""
+        self._immediate_operation('0000', BitArray('0001'), value, write_back=True)
+
+    def ADDIC(self, value: BitArray):
+        """Add the constant {value} to the Register C"""
+        self._immediate_operation('0000', BitArray('0010'), value, write_back=True)
+
+    def ADDID(self, value: BitArray):
+        """Add the constant {value} to the Register D"""
+        self._immediate_operation('0000', BitArray('0011'), value, write_back=True)
+
+    def SUBIA(self, value: BitArray):
+        """Subtract the constant {value} from the Register A"""
+        self._immediate_operation('0001', BitArray('0000'), value, write_back=True)
+
+    def SUBIB(self, value: BitArray):
+        """Subtract the constant {value} from the Register B"""
+        self._immediate_operation('0001', BitArray('0001'), value, write_back=True)
+
+    def SUBIC(self, value: BitArray):
+        """Subtract the constant {value} from the Register C"""
+        self._immediate_operation('0001', BitArray('0010'), value, write_back=True)
+
+    def SUBID(self, value: BitArray):
+        """Subtract the constant {value} from the Register D"""
+        self._immediate_operation('0001', BitArray('0011'), value, write_back=True)
+
+    def CMPIA(self, value: BitArray):
+        """Compare the Register A with the constant {value}"""
+        self._immediate_operation('0001', BitArray('0000'), value, write_back=False)
+
+    def CMPIB(self, value: BitArray):
+        """Compare the Register B with the constant {value}"""
+        self._immediate_operation('0001', BitArray('0001'), value, write_back=False)
+
+    def CMPIC(self, value: BitArray):
+        """Compare the Register C with the constant {value}"""
+        self._immediate_operation('0001', BitArray('0010'), value, write_back=False)
+
+    def CMPID(self, value: BitArray):
+        """Compare the Register D with the constant {value}"""
+        self._immediate_operation('0001', BitArray('0011'), value, write_back=False)
+
+    def _get_indexed_address(self, indexed_address: BitArray) -> BitArray:
+        """The RAM address held by the base register (high nibble) plus the offset (low nibble), wrapping around the
+        end of the RAM."""
+        offset, base_register_address = indexed_address.divide(4)
+        self.register_selector.selection = base_register_address
+        base_register: Register = self.register_selector.output
+        base_register.read_enable = Bit(1)
+        address = self._to_address(base_register.memory.to_int() + offset.to_int())
+        base_register.read_enable = Bit(0)
+        return address
+
+    def LDXA(self, indexed_address: BitArray):
+        """Load contents of RAM {base register + offset} into the Register A"""
+        self._load(register_address=BitArray('0000'), ram_address=self._get_indexed_address(indexed_address))
+
+    def LDXB(self, indexed_address: BitArray):
+        """Load contents of RAM {base register + offset} into the Register B"""
+        self._load(register_address=BitArray('0001'), ram_address=self._get_indexed_address(indexed_address))
+
+    def LDXC(self, indexed_address: BitArray):
+        """Load contents of RAM {base register + offset} into the Register C"""
+        self._load(register_address=BitArray('0010'), ram_address=self._get_indexed_address(indexed_address))
+
+    def LDXD(self, indexed_address: BitArray):
+        """Load contents of RAM {base register + offset} into the Register D"""
+        self._load(register_address=BitArray('0011'), ram_address=self._get_indexed_address(indexed_address))
+
+    def STXA(self, indexed_address: BitArray):
+        """Stores contents on RAM {base register + offset} from Register A"""
+        self._store(register_address=BitArray('0000'), ram_address=self._get_indexed_address(indexed_address))
+
+    def STXB(self, indexed_address: BitArray):
+        """Stores contents on RAM {base register + offset} from Register B"""
+        self._store(register_address=BitArray('0001'), ram_address=self._get_indexed_address(indexed_address))
+
+    def STXC(self, indexed_address: BitArray):
+        """Stores contents on RAM {base register + offset} from Register C"""
+        self._store(register_address=BitArray('0010'), ram_address=self._get_indexed_address(indexed_address))
+
+    def STXD(self, indexed_address: BitArray):
+        """Stores contents on RAM {base register + offset} from Register D"""
+        self._store(register_address=BitArray('0011'), ram_address=self._get_indexed_address(indexed_address))
+
+    def _get_block_operands(self, register_addresses: BitArray) -> Tuple[int, int, int]:
+        """The values of the first register, the second register and cx, which holds the length of a block."""
+        second_register_address, first_register_address = register_addresses.divide(4)
+        values = []
+        for register_address in (first_register_address, second_register_address, BitArray('0010', size=4)):
+            self.register_selector.selection = register_address
+            register: Register = self.register_selector.output
+            register.read_enable = Bit(1)
+            values.append(register.memory.to_int())
+            register.read_enable = Bit(0)
+        return values[0], values[1], values[2]
+
+    def MEMCPY(self, register_addresses: BitArray):
+        """Copies cx bytes from the RAM address in the second register to the one in the first register"""
+        destination, source, length = self._get_block_operands(register_addresses)
+        self._stall_cycles += self.dma.copy(destination, source, length) - 1
+
+    def MEMSET(self, register_addresses: BitArray):
+        """Sets cx bytes from the RAM address in the first register to the second register's value"""
+        destination, value, length = self._get_block_operands(register_addresses)
+        self._stall_cycles += self.dma.fill(destination, BitArray(value), length) - 1
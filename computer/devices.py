@@ -0,0 +1,123 @@
+import sys
+from typing import List, Optional, Tuple, BinaryIO, Union
+
+
+class Device:
+    """Something mapped into the RAM's address space: the CPU reads and writes it with `ld` and `st` like any other
+    address, and the device decides what that means. Offsets are relative to the address the device is mapped at."""
+    size_in_bytes = 1
+
+    def read(self, offset: int) -> int:
+        return 0
+
+    def write(self, offset: int, value: int):
+        pass
+
+    def flush(self):
+        """Called when the computer stops running, for devices that hold on to their output."""
+        pass
+
+
+class ConsoleDevice(Device):
+    """An output port. Bytes stored at offset 0 are collected in a buffer, which is written to the stream in bulk: when
+    it is full, when the program stores anything at offset 1, and when the computer stops running. Loading from offset
+    0 gives 0, from offset 1 how many bytes are waiting in the buffer.
+    """
+    size_in_bytes = 2
+    DATA = 0
+    CONTROL = 1
+
+    def __init__(self, stream: Optional[BinaryIO] = None, buffer_size_in_bytes: int = 256):
+        if buffer_size_in_bytes < 1:
+            raise ValueError('The console buffer must hold at least one byte')
+        self.stream = stream
+        self.buffer_size_in_bytes = buffer_size_in_bytes
+        self.buffer = bytearray()
+        self.bytes_written = 0
+        self.flushes = 0
+
+    def read(self, offset: int) -> int:
+        if offset == self.CONTROL:
+            return min(len(self.buffer), 255)
+        return 0
+
+    def write(self, offset: int, value: int):
+        if offset == self.CONTROL:
+            self.flush()
+            return
+        self.buffer.append(value)
+        if len(self.buffer) >= self.buffer_size_in_bytes:
+            self.flush()
+
+    def flush(self):
+        if not self.buffer:
+            return
+        stream = self.stream if self.stream is not None else sys.stdout.buffer
+        stream.write(bytes(self.buffer))
+        stream.flush()
+        self.bytes_written += len(self.buffer)
+        self.flushes += 1
+        self.buffer.clear()
+
+
+class DeviceBus:
+    """Stands between the RAM's demultiplexer and its bytes once a device is mapped, sending the addresses of each
+    device to it and every other address to the bytes. A RAM without devices indexes its bytes directly, so it doesn't
+    pay for any of this.
+
+    Only the bus goes through the devices: DMA transfers and direct access to `RandomAccessMemory.memory` see the
+    bytes underneath them.
+    """
+
+    def __init__(self, memory: Union[bytearray, object]):
+        self.memory = memory
+        self._mappings: List[Tuple[int, int, Device]] = []
+        # every mapped address is in [_start, _end), so most RAM accesses are a single range check away from the bytes
+        self._start = 0
+        self._end = 0
+
+    def __len__(self) -> int:
+        return len(self.memory)
+
+    @property
+    def mappings(self) -> List[Tuple[int, Device]]:
+        return [(start, device) for start, _, device in self._mappings]
+
+    def map(self, address: int, device: Device):
+        end = address + device.size_in_bytes
+        if address < 0 or end > len(self.memory):
+            raise ValueError(f'A device of {device.size_in_bytes} bytes does not fit in the RAM at address {address}')
+        for start, mapped_end, mapped_device in self._mappings:
+            if address < mapped_end and start < end:
+                raise ValueError(f'Address {address} is already used by {type(mapped_device).__name__} at {start}')
+        self._mappings.append((address, end, device))
+        self._mappings.sort(key=lambda mapping: mapping[0])
+        self._start = self._mappings[0][0]
+        self._end = max(mapped_end for _, mapped_end, _ in self._mappings)
+
+    def _find(self, address: int) -> Optional[Tuple[int, Device]]:
+        for start, end, device in self._mappings:
+            if start <= address < end:
+                return start, device
+        return None
+
+    def __getitem__(self, address: int) -> int:
+        if self._start <= address < self._end:
+            mapping = self._find(address)
+            if mapping is not None:
+                start, device = mapping
+                return device.read(address - start) & 0xFF
+        return self.memory[address]
+
+    def __setitem__(self, address: int, value: int):
+        if self._start <= address < self._end:
+            mapping = self._find(address)
+            if mapping is not None:
+                start, device = mapping
+                device.write(address - start, value)
+                return
+        self.memory[address] = value
+
+    def flush(self):
+        for _, _, device in self._mappings:
+            device.flush()
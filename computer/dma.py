@@ -0,0 +1,51 @@
+from math import ceil
+
+from .base import BitArray
+from .memory import RandomAccessMemory
+
+
+class DirectMemoryAccessController:
+    """Copies and fills blocks of RAM with slice operations, instead of one byte at a time through the bus.
+
+    A transfer costs `setup_cycles`, plus one cycle for every `bytes_per_cycle` bytes moved. Blocks that run past the
+    end of the RAM wrap around to address 0, like indexed addresses do.
+    """
+
+    def __init__(self, ram: RandomAccessMemory, setup_cycles: int = 1, bytes_per_cycle: int = 4):
+        if setup_cycles < 1 or bytes_per_cycle < 1:
+            raise ValueError('A DMA transfer takes at least one cycle and moves at least one byte per cycle')
+        self.ram = ram
+        self.setup_cycles = setup_cycles
+        self.bytes_per_cycle = bytes_per_cycle
+        self._transferred_bytes = 0
+
+    @property
+    def transferred_bytes(self) -> int:
+        return self._transferred_bytes
+
+    def get_cycle_cost(self, length: int) -> int:
+        return self.setup_cycles + ceil(length / self.bytes_per_cycle)
+
+    def _read(self, start: int, length: int) -> bytearray:
+        memory = self.ram.memory
+        end = start + length
+        return memory[start:end] + memory[:max(end - len(memory), 0)]
+
+    def _write(self, start: int, block: bytearray):
+        memory = self.ram.memory
+        first_part = min(len(block), len(memory) - start)
+        memory[start:start + first_part] = block[:first_part]
+        memory[:len(block) - first_part] = block[first_part:]
+
+    def copy(self, destination: int, source: int, length: int) -> int:
+        """Copies `length` bytes; overlapping blocks are copied as if through a temporary buffer. Returns the cycles
+        the transfer took."""
+        self._write(destination, self._read(source, length))
+        self._transferred_bytes += length
+        return self.get_cycle_cost(length)
+
+    def fill(self, destination: int, value: BitArray, length: int) -> int:
+        """Sets `length` bytes to `value`. Returns the cycles the transfer took."""
+        self._write(destination, bytearray([value.to_int() & 0xFF]) * length)
+        self._transferred_bytes += length
+        return self.get_cycle_cost(length)
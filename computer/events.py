@@ -0,0 +1,167 @@
+import heapq
+from typing import Callable, List, Optional, Tuple
+
+from .cpu import CentralProcessingUnit
+
+
+class Event:
+    """Something that happens at a point of simulated time, in cycles. Cancelled events stay in the queue and are
+    dropped when they come up."""
+    __slots__ = ('time', 'priority', 'action', 'cancelled')
+
+    def __init__(self, time: int, priority: int, action: Callable[[], None]):
+        self.time = time
+        self.priority = priority
+        self.action = action
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class EventScheduler:
+    """A discrete-event simulation: a priority queue of events, run in order of time, then priority (lower first),
+    then the order they were scheduled in, so runs are deterministic.
+
+    Time jumps straight from one event to the next, so the cost of a simulation is the number of events, not the
+    number of cycles that go by: a CPU waiting for an interrupt, or a device waiting to deliver something, has no
+    events until then. CPUs take part through a `CoreProcess` (see `Computer.attach`), devices by scheduling their own
+    events.
+    """
+
+    def __init__(self):
+        self._queue: List[Tuple[int, int, int, Event]] = []
+        self._sequence = 0
+        self._now = 0
+        self.processed_events = 0
+
+    @property
+    def now(self) -> int:
+        return self._now
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    def schedule_at(self, time: int, action: Callable[[], None], priority: int = 0) -> Event:
+        if time < self._now:
+            raise ValueError(f'Can not schedule an event at cycle {time}, in the past of cycle {self._now}')
+        event = Event(time, priority, action)
+        heapq.heappush(self._queue, (time, priority, self._sequence, event))
+        self._sequence += 1
+        return event
+
+    def schedule_in(self, delay: int, action: Callable[[], None], priority: int = 0) -> Event:
+        return self.schedule_at(self._now + delay, action, priority)
+
+    def next_event_time(self) -> Optional[int]:
+        while self._queue and self._queue[0][3].cancelled:
+            heapq.heappop(self._queue)
+        return self._queue[0][0] if self._queue else None
+
+    def run(self, until: Optional[int] = None, max_events: int = 0) -> int:
+        """Runs events until there are none left, or none at or before cycle `until` when it is given (time is then
+        moved to `until`), or until `max_events` events ran when it is greater than 0. Returns the events that ran."""
+        processed_events = 0
+        queue = self._queue
+        while queue:
+            if 0 < max_events <= processed_events:
+                break
+            time, _, _, event = queue[0]
+            if until is not None and time > until:
+                break
+            heapq.heappop(queue)
+            if event.cancelled:
+                continue
+            self._now = time
+            event.action()
+            processed_events += 1
+        if until is not None and until > self._now and not 0 < max_events <= processed_events:
+            self._now = until
+        self.processed_events += processed_events
+        return processed_events
+
+
+class CoreProcess:
+    """Runs a CPU under an `EventScheduler`, `quantum_in_cycles` cycles per event.
+
+    The scheduler's time is the CPU's cycle count (plus the time it was attached at). When the CPU waits for an
+    interrupt, the process sleeps until its interrupt controller's next timer runs out, or until a device requests an
+    interrupt, and the cycles in between are skipped at once. Timers count on the CPU's clock, so they don't need
+    events of their own.
+    """
+
+    def __init__(
+            self,
+            scheduler: EventScheduler,
+            cpu: CentralProcessingUnit,
+            quantum_in_cycles: int = 1,
+            priority: int = 0,
+            on_halt: Optional[Callable[[], None]] = None
+    ):
+        if quantum_in_cycles < 1:
+            raise ValueError('A core runs at least one cycle at a time')
+        self.scheduler = scheduler
+        self.cpu = cpu
+        self.quantum_in_cycles = quantum_in_cycles
+        self.priority = priority
+        self.on_halt = on_halt
+        self._start_time = scheduler.now - cpu.cycle_counter
+        self._event: Optional[Event] = None
+        self._stepping = False
+        if cpu.interrupt_controller is not None:
+            cpu.interrupt_controller.on_request(lambda line: self.wake())
+        if not cpu.halt:
+            self._schedule(scheduler.now)
+
+    @property
+    def time(self) -> int:
+        """Where the CPU is in the scheduler's time."""
+        return self._start_time + self.cpu.cycle_counter
+
+    @property
+    def stepping(self) -> bool:
+        """Whether the CPU is in the middle of its quantum, e.g. while one of its instructions writes to a device."""
+        return self._stepping
+
+    @property
+    def sleeping(self) -> bool:
+        return self._event is None and not self.cpu.halt
+
+    def _schedule(self, time: int):
+        if self._event is not None:
+            self._event.cancel()
+        self._event = self.scheduler.schedule_at(time, self._step, self.priority)
+
+    def wake(self):
+        """Makes a waiting CPU check for interrupts now, instead of when it planned to."""
+        if self._stepping or not self.cpu.waiting or self.cpu.halt:
+            return
+        if self._event is None or self._event.time > self.scheduler.now:
+            self._schedule(self.scheduler.now)
+
+    def _step(self):
+        self._event = None
+        self._stepping = True
+        cpu = self.cpu
+        try:
+            if cpu.waiting and self.scheduler.now > self.time:
+                cpu.idle(self.scheduler.now - self.time)
+            end = self.time + self.quantum_in_cycles
+            while not cpu.halt and self.time < end:
+                cpu.cycle()
+                if cpu.waiting:
+                    break
+        finally:
+            self._stepping = False
+
+        if cpu.halt:
+            if self.on_halt is not None:
+                self.on_halt()
+            return
+        if not cpu.waiting:
+            self._schedule(self.time)
+            return
+        cycles = cpu.interrupt_controller.cycles_until_next_event()
+        if cycles is not None:
+            self._schedule(self.time + cycles)
+        # otherwise it sleeps until a device requests an interrupt
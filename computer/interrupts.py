@@ -0,0 +1,149 @@
+from typing import Callable, List, Optional
+
+from .devices import Device
+
+
+class InterruptController(Device):
+    """Interrupt lines 0 to 7, with a vector (the address of the handler) per line. Line 0 has the highest priority.
+
+    Mapped into the RAM, it holds the vector table: each vector takes as many bytes as an address, least significant
+    first, so with 256 bytes of RAM `st ax, $n` sets the vector of line `n - address`. Devices that count cycles (like
+    the `TimerDevice`) are connected to it, so the CPU only has one thing to advance every cycle.
+    """
+    LINE_COUNT = 8
+
+    def __init__(self, address_size_in_bytes: int = 1):
+        self.address_size_in_bytes = address_size_in_bytes
+        self.size_in_bytes = self.LINE_COUNT * address_size_in_bytes
+        self.vectors = [0] * self.LINE_COUNT
+        self._pending = 0
+        self._clocked_devices: List['TimerDevice'] = []
+        # called on every request, e.g. to wake up a CPU that sleeps under an EventScheduler
+        self._request_listeners: List[Callable[[int], None]] = []
+        self.requested_interrupts = 0
+        self.serviced_interrupts = 0
+
+    def read(self, offset: int) -> int:
+        line, byte_index = divmod(offset, self.address_size_in_bytes)
+        return self.vectors[line] >> 8 * byte_index & 0xFF
+
+    def write(self, offset: int, value: int):
+        line, byte_index = divmod(offset, self.address_size_in_bytes)
+        mask = 0xFF << 8 * byte_index
+        self.vectors[line] = self.vectors[line] & ~mask | value << 8 * byte_index
+
+    def set_vector(self, line: int, address: int):
+        self.vectors[line] = address
+
+    def connect(self, device: 'TimerDevice'):
+        self._clocked_devices.append(device)
+
+    def on_request(self, listener: Callable[[int], None]):
+        self._request_listeners.append(listener)
+
+    def request(self, line: int):
+        if not 0 <= line < self.LINE_COUNT:
+            raise ValueError(f'There is no interrupt line {line}')
+        self._pending |= 1 << line
+        self.requested_interrupts += 1
+        for listener in self._request_listeners:
+            listener(line)
+
+    @property
+    def pending(self) -> int:
+        """Bit mask of the lines waiting to be serviced."""
+        return self._pending
+
+    def pending_line(self) -> Optional[int]:
+        """The pending line with the highest priority, if any."""
+        if not self._pending:
+            return None
+        return (self._pending & -self._pending).bit_length() - 1
+
+    def acknowledge(self, line: int) -> int:
+        """Clears a pending line, returns the address of its handler."""
+        self._pending &= ~(1 << line)
+        self.serviced_interrupts += 1
+        return self.vectors[line]
+
+    def advance(self, cycles: int):
+        for device in self._clocked_devices:
+            device.advance(cycles)
+
+    def cycles_until_next_event(self) -> Optional[int]:
+        """Cycles until some line gets requested: 0 when one is already pending, None when nothing is counting."""
+        if self._pending:
+            return 0
+        cycles = [device.cycles_until_next_event() for device in self._clocked_devices]
+        cycles = [cycle for cycle in cycles if cycle is not None]
+        return min(cycles) if cycles else None
+
+
+class TimerDevice(Device):
+    """Counts CPU cycles and requests an interrupt every `period` cycles.
+
+    Registers: offset 0 and 1 are the period (low and high byte), offset 2 the control register: bit 0 enables the
+    timer, bit 1 makes it stop after the first interrupt. Writing the control register restarts the count. Loading
+    offset 3 gives the cycles counted so far (low byte).
+    """
+    size_in_bytes = 4
+    PERIOD_LOW = 0
+    PERIOD_HIGH = 1
+    CONTROL = 2
+    COUNTER = 3
+    ENABLED = 1
+    ONE_SHOT = 2
+
+    def __init__(self, interrupt_controller: InterruptController, line: int = 0):
+        self.interrupt_controller = interrupt_controller
+        self.line = line
+        self.period_in_cycles = 0
+        self.control = 0
+        self.counter = 0
+        interrupt_controller.connect(self)
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.control & self.ENABLED) and self.period_in_cycles > 0
+
+    def start(self, period_in_cycles: int, one_shot: bool = False):
+        self.period_in_cycles = period_in_cycles
+        self.write(self.CONTROL, self.ENABLED | (self.ONE_SHOT if one_shot else 0))
+
+    def stop(self):
+        self.write(self.CONTROL, 0)
+
+    def read(self, offset: int) -> int:
+        if offset == self.PERIOD_LOW:
+            return self.period_in_cycles & 0xFF
+        if offset == self.PERIOD_HIGH:
+            return self.period_in_cycles >> 8 & 0xFF
+        if offset == self.CONTROL:
+            return self.control
+        return self.counter & 0xFF
+
+    def write(self, offset: int, value: int):
+        if offset == self.PERIOD_LOW:
+            self.period_in_cycles = self.period_in_cycles & 0xFF00 | value
+        elif offset == self.PERIOD_HIGH:
+            self.period_in_cycles = self.period_in_cycles & 0xFF | value << 8
+        elif offset == self.CONTROL:
+            self.control = value
+            self.counter = 0
+
+    def advance(self, cycles: int):
+        if not self.enabled:
+            return
+        self.counter += cycles
+        while self.counter >= self.period_in_cycles:
+            self.counter -= self.period_in_cycles
+            self.interrupt_controller.request(self.line)
+            if self.control & self.ONE_SHOT:
+                self.control &= ~self.ENABLED
+                self.counter = 0
+                return
+
+    def cycles_until_next_event(self) -> Optional[int]:
+        if not self.enabled:
+            return None
+        return self.period_in_cycles - self.counter
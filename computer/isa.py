@@ -0,0 +1,175 @@
+from typing import NamedTuple, Optional, List, Dict, Callable
+
+# operand kinds: what the byte after the opcode holds
+ADDRESS = 'address'  # a RAM address, as wide as the RAM needs (more than one byte past 256 bytes of RAM)
+REGISTERS = 'registers'  # two register codes, the first one in the high nibble
+REGISTER = 'register'  # one register code in the low nibble
+IMMEDIATE = 'immediate'  # a constant
+INDEXED = 'indexed'  # a base register code in the high nibble, and an offset (0 to 15) to add to it in the low nibble
+NONE = 'none'  # nothing, the byte is padding
+
+INSTRUCTION_SIZE_IN_BYTES = 2
+DEFAULT_RAM_SIZE_IN_BYTES = 256
+
+
+class InstructionSpec(NamedTuple):
+    opcode: int
+    name: str  # unique name of the opcode, e.g. "lda"
+    mnemonic: str  # what is written in assembly, e.g. "ld"
+    operand: str  # one of the operand kinds
+    cycles: int
+    handler: str  # name of the CPU method that executes it
+    register: Optional[str] = None  # register implied by the opcode, e.g. "ax" for "lda"
+
+
+class RegisterSpec(NamedTuple):
+    code: int
+    name: str
+    attribute: str  # name of the CPU attribute
+
+
+REGISTER_SPECS = (
+    RegisterSpec(0, 'ax', 'register_A'),
+    RegisterSpec(1, 'bx', 'register_B'),
+    RegisterSpec(2, 'cx', 'register_C'),
+    RegisterSpec(3, 'dx', 'register_D'),
+    RegisterSpec(4, 'acc', 'accumulator_register'),
+    RegisterSpec(5, 'sr', 'status_register'),
+    RegisterSpec(6, 'id', 'core_id_register'),  # read-only: the number of the core, 0 on a single-core computer
+)
+
+INSTRUCTION_SPECS = (
+    InstructionSpec(0, 'hlt', 'hlt', NONE, 1, 'HLT'),
+    InstructionSpec(1, 'lda', 'ld', ADDRESS, 1, 'LDA', 'ax'),
+    InstructionSpec(2, 'ldb', 'ld', ADDRESS, 1, 'LDB', 'bx'),
+    InstructionSpec(3, 'ldc', 'ld', ADDRESS, 1, 'LDC', 'cx'),
+    InstructionSpec(4, 'ldd', 'ld', ADDRESS, 1, 'LDD', 'dx'),
+    InstructionSpec(5, 'sta', 'st', ADDRESS, 1, 'STA', 'ax'),
+    InstructionSpec(6, 'stb', 'st', ADDRESS, 1, 'STB', 'bx'),
+    InstructionSpec(7, 'stc', 'st', ADDRESS, 1, 'STC', 'cx'),
+    InstructionSpec(8, 'std', 'st', ADDRESS, 1, 'STD', 'dx'),
+    InstructionSpec(9, 'add', 'add', REGISTERS, 1, 'ADD'),
+    InstructionSpec(10, 'sub', 'sub', REGISTERS, 1, 'SUB'),
+    InstructionSpec(11, 'inc', 'inc', REGISTER, 1, 'INC'),
+    InstructionSpec(12, 'dec', 'dec', REGISTER, 1, 'DEC'),
+    InstructionSpec(13, 'cmp', 'cmp', REGISTERS, 1, 'CMP'),
+    InstructionSpec(14, 'jmp', 'jmp', ADDRESS, 1, 'JMP'),
+    InstructionSpec(15, 'jil', 'jil', ADDRESS, 1, 'JIL'),
+    InstructionSpec(16, 'jig', 'jig', ADDRESS, 1, 'JIG'),
+    InstructionSpec(17, 'jie', 'jie', ADDRESS, 1, 'JIE'),
+    InstructionSpec(18, 'jne', 'jne', ADDRESS, 1, 'JNE'),
+    InstructionSpec(19, 'push', 'push', REGISTER, 1, 'PUSH'),
+    InstructionSpec(20, 'pop', 'pop', REGISTER, 1, 'POP'),
+    InstructionSpec(21, 'call', 'call', ADDRESS, 1, 'CALL'),
+    InstructionSpec(22, 'ret', 'ret', NONE, 1, 'RET'),
+    InstructionSpec(23, 'dly', 'dly', REGISTER, 1, 'DLY'),
+    InstructionSpec(24, 'ldia', 'ldi', IMMEDIATE, 1, 'LDIA', 'ax'),
+    InstructionSpec(25, 'ldib', 'ldi', IMMEDIATE, 1, 'LDIB', 'bx'),
+    InstructionSpec(26, 'ldic', 'ldi', IMMEDIATE, 1, 'LDIC', 'cx'),
+    InstructionSpec(27, 'ldid', 'ldi', IMMEDIATE, 1, 'LDID', 'dx'),
+    InstructionSpec(28, 'addia', 'addi', IMMEDIATE, 1, 'ADDIA', 'ax'),
+    InstructionSpec(29, 'addib', 'addi', IMMEDIATE, 1, 'ADDIB', 'bx'),
+    InstructionSpec(30, 'addic', 'addi', IMMEDIATE, 1, 'ADDIC', 'cx'),
+    InstructionSpec(31, 'addid', 'addi', IMMEDIATE, 1, 'ADDID', 'dx'),
+    InstructionSpec(32, 'subia', 'subi', IMMEDIATE, 1, 'SUBIA', 'ax'),
+    InstructionSpec(33, 'subib', 'subi', IMMEDIATE, 1, 'SUBIB', 'bx'),
+    InstructionSpec(34, 'subic', 'subi', IMMEDIATE, 1, 'SUBIC', 'cx'),
+    InstructionSpec(35, 'subid', 'subi', IMMEDIATE, 1, 'SUBID', 'dx'),
+    InstructionSpec(36, 'cmpia', 'cmpi', IMMEDIATE, 1, 'CMPIA', 'ax'),
+    InstructionSpec(37, 'cmpib', 'cmpi', IMMEDIATE, 1, 'CMPIB', 'bx'),
+    InstructionSpec(38, 'cmpic', 'cmpi', IMMEDIATE, 1, 'CMPIC', 'cx'),
+    InstructionSpec(39, 'cmpid', 'cmpi', IMMEDIATE, 1, 'CMPID', 'dx'),
+    InstructionSpec(40, 'ldxa', 'ld', INDEXED, 1, 'LDXA', 'ax'),
+    InstructionSpec(41, 'ldxb', 'ld', INDEXED, 1, 'LDXB', 'bx'),
+    InstructionSpec(42, 'ldxc', 'ld', INDEXED, 1, 'LDXC', 'cx'),
+    InstructionSpec(43, 'ldxd', 'ld', INDEXED, 1, 'LDXD', 'dx'),
+    InstructionSpec(44, 'stxa', 'st', INDEXED, 1, 'STXA', 'ax'),
+    InstructionSpec(45, 'stxb', 'st', INDEXED, 1, 'STXB', 'bx'),
+    InstructionSpec(46, 'stxc', 'st', INDEXED, 1, 'STXC', 'cx'),
+    InstructionSpec(47, 'stxd', 'st', INDEXED, 1, 'STXD', 'dx'),
+    InstructionSpec(48, 'and', 'and', REGISTERS, 1, 'AND'),
+    InstructionSpec(49, 'or', 'or', REGISTERS, 1, 'OR'),
+    InstructionSpec(50, 'xor', 'xor', REGISTERS, 1, 'XOR'),
+    InstructionSpec(51, 'not', 'not', REGISTER, 1, 'NOT'),
+    InstructionSpec(52, 'shl', 'shl', REGISTERS, 1, 'SHL'),
+    InstructionSpec(53, 'shr', 'shr', REGISTERS, 1, 'SHR'),
+    InstructionSpec(54, 'rol', 'rol', REGISTERS, 1, 'ROL'),
+    InstructionSpec(55, 'ror', 'ror', REGISTERS, 1, 'ROR'),
+    InstructionSpec(56, 'mul', 'mul', REGISTERS, 1, 'MUL'),
+    InstructionSpec(57, 'mulh', 'mulh', REGISTERS, 1, 'MULH'),
+    InstructionSpec(58, 'div', 'div', REGISTERS, 1, 'DIV'),
+    InstructionSpec(59, 'mod', 'mod', REGISTERS, 1, 'MOD'),
+    InstructionSpec(60, 'memcpy', 'memcpy', REGISTERS, 1, 'MEMCPY'),  # takes more cycles, see computer/dma.py
+    InstructionSpec(61, 'memset', 'memset', REGISTERS, 1, 'MEMSET'),
+    InstructionSpec(62, 'ei', 'ei', NONE, 1, 'EI'),
+    InstructionSpec(63, 'di', 'di', NONE, 1, 'DI'),
+    InstructionSpec(64, 'iret', 'iret', NONE, 1, 'IRET'),
+    InstructionSpec(65, 'wfi', 'wfi', NONE, 1, 'WFI'),  # idle cycles are skipped, see Computer.run
+    InstructionSpec(66, 'tasa', 'tas', ADDRESS, 1, 'TASA', 'ax'),  # atomic test-and-set, see MultiCoreComputer
+    InstructionSpec(67, 'tasb', 'tas', ADDRESS, 1, 'TASB', 'bx'),
+    InstructionSpec(68, 'tasc', 'tas', ADDRESS, 1, 'TASC', 'cx'),
+    InstructionSpec(69, 'tasd', 'tas', ADDRESS, 1, 'TASD', 'dx'),
+)
+
+
+def _index_by_opcode(specs) -> List:
+    table = [None] * 256
+    for spec in specs:
+        if table[spec.opcode] is not None:
+            raise ValueError(f'Opcode {spec.opcode} is used by both "{table[spec.opcode].name}" and "{spec.name}"')
+        table[spec.opcode] = spec
+    return table
+
+
+# direct-indexed tables, generated once at import time
+INSTRUCTIONS_BY_OPCODE: List[Optional[InstructionSpec]] = _index_by_opcode(INSTRUCTION_SPECS)
+INSTRUCTIONS_BY_NAME: Dict[str, InstructionSpec] = {spec.name: spec for spec in INSTRUCTION_SPECS}
+MNEMONICS: Dict[str, List[InstructionSpec]] = {}
+for _spec in INSTRUCTION_SPECS:
+    MNEMONICS.setdefault(_spec.mnemonic, []).append(_spec)
+REGISTERS_BY_CODE: List[Optional[RegisterSpec]] = [None] * 16
+for _register in REGISTER_SPECS:
+    REGISTERS_BY_CODE[_register.code] = _register
+REGISTERS_BY_NAME: Dict[str, RegisterSpec] = {register.name: register for register in REGISTER_SPECS}
+CYCLE_COSTS: Dict[str, int] = {spec.mnemonic: spec.cycles for spec in INSTRUCTION_SPECS}
+
+
+def get_address_size_in_bytes(ram_size_in_bytes: int = DEFAULT_RAM_SIZE_IN_BYTES) -> int:
+    """Bytes needed by an address operand: one up to 256 bytes of RAM, two up to 64 KiB, and so on."""
+    return max(1, ((ram_size_in_bytes - 1).bit_length() + 7) // 8)
+
+
+def get_instruction_size(
+        spec: Optional[InstructionSpec],
+        compact_encoding: bool = False,
+        address_size_in_bytes: int = 1
+) -> int:
+    """Every instruction is an opcode and an operand byte, except for the operand-less ones in the compact encoding,
+    and for the ones with an address operand when addresses take more than one byte."""
+    if spec is not None and spec.operand == ADDRESS:
+        return 1 + address_size_in_bytes
+    if compact_encoding and spec is not None and spec.operand == NONE:
+        return 1
+    return INSTRUCTION_SIZE_IN_BYTES
+
+
+def get_instruction_sizes(compact_encoding: bool = False, address_size_in_bytes: int = 1) -> List[int]:
+    """Size of each opcode's instructions, indexed by opcode."""
+    return [get_instruction_size(spec, compact_encoding, address_size_in_bytes) for spec in INSTRUCTIONS_BY_OPCODE]
+
+
+def get_dispatch_table(cpu) -> List[Callable]:
+    """The handlers of a CPU, indexed by opcode."""
+    size = max(spec.opcode for spec in INSTRUCTION_SPECS) + 1
+    return [
+        getattr(cpu, INSTRUCTIONS_BY_OPCODE[opcode].handler) if INSTRUCTIONS_BY_OPCODE[opcode] else None
+        for opcode in range(size)
+    ]
+
+
+def get_selectable_registers(cpu) -> List:
+    """The registers of a CPU, indexed by register code."""
+    size = max(register.code for register in REGISTER_SPECS) + 1
+    return [
+        getattr(cpu, REGISTERS_BY_CODE[code].attribute) if REGISTERS_BY_CODE[code] else None for code in range(size)
+    ]
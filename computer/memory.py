@@ -1,6 +1,8 @@
 from math import log, ceil
+from typing import Dict, Iterator, Optional, Union, List, Tuple
 
 from .base import Bit, BitArray, Demultiplexer
+from .devices import Device, DeviceBus
 
 
 class Register:
@@ -23,6 +25,11 @@ class Register:
         if self._write_enable:
             self._memory = value
 
+    @property
+    def value(self) -> int:
+        """Integer contents of the register, bypassing the read enable line. Meant for inspection only."""
+        return self._memory.to_int()
+
     @property
     def read_enable(self):
         return self._read_enable
@@ -46,27 +53,211 @@ class Register:
         self._write_enable = value
 
 
+class ReadOnlyRegister(Register):
+    """A register wired to a constant, like the core ID: writing to it does nothing."""
+
+    def __init__(self, size_in_bits: int, value: int):
+        super().__init__(size_in_bits)
+        self._memory = BitArray(value, size=size_in_bits)
+
+    @property
+    def memory(self):
+        return Register.memory.fget(self)
+
+    @memory.setter
+    def memory(self, value: BitArray):
+        pass
+
+
+class PagedMemory:
+    """Bytes of a sparse RAM, indexed and sliced like a `bytearray` of `size_in_bytes` bytes.
+
+    The bytes live in pages of `page_size_in_bytes`, and a page is only allocated the first time a non-zero byte is
+    written to it. Reading from a page that was never allocated gives zeros, so a RAM costs as much host memory as the
+    part of it the program actually uses.
+    """
+
+    def __init__(self, size_in_bytes: int, page_size_in_bytes: int = 256):
+        if page_size_in_bytes < 1 or page_size_in_bytes & (page_size_in_bytes - 1):
+            raise ValueError(f'The page size must be a power of 2, not {page_size_in_bytes}')
+        if size_in_bytes % page_size_in_bytes:
+            raise ValueError(
+                f'A RAM of {size_in_bytes} bytes can not be split in pages of {page_size_in_bytes} bytes'
+            )
+        self.size_in_bytes = size_in_bytes
+        self.page_size_in_bytes = page_size_in_bytes
+        self._page_shift = page_size_in_bytes.bit_length() - 1
+        self._offset_mask = page_size_in_bytes - 1
+        self._pages: Dict[int, bytearray] = {}
+        self.unmapped_reads = 0
+
+    def __len__(self) -> int:
+        return self.size_in_bytes
+
+    def __iter__(self) -> Iterator[int]:
+        empty_page = bytes(self.page_size_in_bytes)
+        for page_number in range(self.size_in_bytes >> self._page_shift):
+            yield from self._pages.get(page_number, empty_page)
+
+    def _check_index(self, index: int) -> int:
+        if index < 0:
+            index += self.size_in_bytes
+        if not 0 <= index < self.size_in_bytes:
+            raise IndexError('RAM address out of range')
+        return index
+
+    def _get_slice_range(self, index: slice) -> range:
+        return range(*index.indices(self.size_in_bytes))
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[int, bytearray]:
+        if isinstance(index, slice):
+            addresses = self._get_slice_range(index)
+            if addresses.step != 1:
+                return bytearray(self[address] for address in addresses)
+            return self._read(addresses.start, len(addresses))
+
+        index = self._check_index(index)
+        page = self._pages.get(index >> self._page_shift)
+        if page is None:
+            self.unmapped_reads += 1
+            return 0
+        return page[index & self._offset_mask]
+
+    def __setitem__(self, index: Union[int, slice], value):
+        if isinstance(index, slice):
+            addresses = self._get_slice_range(index)
+            value = bytes(value)
+            if len(addresses) != len(value):
+                raise ValueError('A paged RAM can not change its size')
+            if addresses.step != 1:
+                for address, byte in zip(addresses, value):
+                    self[address] = byte
+                return
+            self._write(addresses.start, value)
+            return
+
+        index = self._check_index(index)
+        page = self._pages.get(index >> self._page_shift)
+        if page is None:
+            if not value:
+                return
+            page = self._map_page(index >> self._page_shift)
+        page[index & self._offset_mask] = value
+
+    def _map_page(self, page_number: int) -> bytearray:
+        page = self._pages[page_number] = bytearray(self.page_size_in_bytes)
+        return page
+
+    def _read(self, start: int, length: int) -> bytearray:
+        result = bytearray(length)
+        address = start
+        end = start + length
+        while address < end:
+            offset = address & self._offset_mask
+            chunk_size = min(self.page_size_in_bytes - offset, end - address)
+            page = self._pages.get(address >> self._page_shift)
+            if page is not None:
+                result[address - start:address - start + chunk_size] = page[offset:offset + chunk_size]
+            else:
+                self.unmapped_reads += chunk_size
+            address += chunk_size
+        return result
+
+    def _write(self, start: int, data: bytes):
+        address = start
+        end = start + len(data)
+        while address < end:
+            offset = address & self._offset_mask
+            chunk_size = min(self.page_size_in_bytes - offset, end - address)
+            chunk = data[address - start:address - start + chunk_size]
+            page = self._pages.get(address >> self._page_shift)
+            # zeros are what an unmapped page already reads as
+            if page is None and any(chunk):
+                page = self._map_page(address >> self._page_shift)
+            if page is not None:
+                page[offset:offset + chunk_size] = chunk
+            address += chunk_size
+
+    def mapped_pages(self) -> Dict[int, bytearray]:
+        """The allocated pages, by page number."""
+        return dict(sorted(self._pages.items()))
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            'page_size': self.page_size_in_bytes,
+            'pages': self.size_in_bytes >> self._page_shift,
+            'mapped_pages': len(self._pages),
+            'mapped_bytes': len(self._pages) * self.page_size_in_bytes,
+            'unmapped_reads': self.unmapped_reads,
+        }
+
+
 class RandomAccessMemory:
-    def __init__(self, size_in_bytes: int):
+    """The bytes are kept in a `bytearray`, and only become a `BitArray` when they go through the bus. With
+    `page_size_in_bytes`, they are kept in a sparse `PagedMemory` instead, for large RAMs of which programs only use a
+    small part.
+
+    Devices (see computer/devices.py) can be mapped to address ranges with `map_device`; the bus then reads and writes
+    them instead of the bytes at those addresses.
+    """
+
+    def __init__(self, size_in_bytes: int, page_size_in_bytes: Optional[int] = None):
         self.memory_size = size_in_bytes
-        self.address_size = ceil(log(self.memory_size, 2))
+        self.page_size_in_bytes = page_size_in_bytes
+        self.address_size = max(ceil(log(self.memory_size, 2)), 1)
         self._address = BitArray(0, size=self.address_size)
-        self._memory = [BitArray(0) for n in range(self.memory_size)]
+        self._memory = self._create_memory()
         self._read_enable = Bit(0)
         self._write_enable = Bit(0)
         self._bus = BitArray(0)
+        self._device_bus: Optional[DeviceBus] = None
         self.demux = Demultiplexer(self._memory)
 
+    def map_device(self, address: int, device: Device):
+        if self._device_bus is None:
+            self._device_bus = DeviceBus(self._memory)
+            self.demux = Demultiplexer(self._device_bus)
+        self._device_bus.map(address, device)
+
+    @property
+    def devices(self) -> List[Tuple[int, Device]]:
+        """The mapped devices and their addresses."""
+        return self._device_bus.mappings if self._device_bus is not None else []
+
+    def flush_devices(self):
+        if self._device_bus is not None:
+            self._device_bus.flush()
+
+    def _create_memory(self) -> Union[bytearray, PagedMemory]:
+        if self.page_size_in_bytes is None:
+            return bytearray(self.memory_size)
+        return PagedMemory(self.memory_size, self.page_size_in_bytes)
+
+    @property
+    def is_paged(self) -> bool:
+        return isinstance(self._memory, PagedMemory)
+
+    def get_page_stats(self) -> Optional[Dict[str, int]]:
+        """Page usage of a paged RAM, None for a flat one."""
+        return self._memory.get_stats() if self.is_paged else None
+
     def __repr__(self):
-        return '\n'.join(f'{index:03}: {str(byte)}' for index, byte in enumerate(self._memory))
+        width = max(len(str(self.memory_size - 1)), 3)
+        if self.is_paged:
+            # only the pages that were written to, the others are all zeros
+            return '\n'.join(
+                f'{page_number * self.page_size_in_bytes + offset:0{width}}: {byte:08b}'
+                for page_number, page in self._memory.mapped_pages().items()
+                for offset, byte in enumerate(page)
+            )
+        return '\n'.join(f'{index:0{width}}: {byte:08b}' for index, byte in enumerate(self._memory))
 
     def from_list(self, list_: list[str]):
         if len(list_) == self.memory_size:
             for index, byte in enumerate(list_):
                 if len(byte) != 8:
                     raise TypeError(f'Byte in position "{index}" is not 8 bit long')
-            self._memory = [BitArray(line) for line in list_]
-            self.demux = Demultiplexer(self._memory)
+            self.memory = bytearray(int(line, 2) for line in list_)
             return
         raise OverflowError(
             f'Provided list of length "{len(list_)}" does not fit. Current mem_size: "{self.memory_size}" bytes')
@@ -87,11 +278,11 @@ class RandomAccessMemory:
     def bus(self):
         if self.read_enable:
             self.demux.selection = self.address
-            return self.demux.output
+            return BitArray(self.demux.output)
         return BitArray(0)
 
     @property
-    def memory(self):
+    def memory(self) -> Union[bytearray, PagedMemory]:
         return self._memory
 
     @read_enable.setter
@@ -110,12 +301,20 @@ class RandomAccessMemory:
     def bus(self, value: BitArray):
         if self.write_enable:
             self.demux.selection = self.address
-            self.demux.output = value
+            self.demux.output = value.to_int() & 0xFF
 
     @memory.setter
-    def memory(self, value: list[BitArray]):
-        self._memory = value
-        self.demux._input = self._memory
+    def memory(self, value: bytearray):
+        if self.page_size_in_bytes is None:
+            self._memory = bytearray(value)
+        else:
+            self._memory = self._create_memory()
+            self._memory[:] = value
+        if self._device_bus is not None:
+            self._device_bus.memory = self._memory
+            self.demux = Demultiplexer(self._device_bus)
+        else:
+            self.demux = Demultiplexer(self._memory)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,164 @@
+import time
+from typing import Dict, List, Optional
+
+from . import isa
+from .alu import ArithmeticLogicUnit
+from .computer import Computer
+from .cpu import CentralProcessingUnit
+from .events import CoreProcess, EventScheduler
+from .source_map import SourceMap, STACK_SECTION
+
+
+class MultiCoreComputer(Computer):
+    """`core_count` CPUs running the same program on one RAM. Each core has its own registers, ALU and stack, and
+    reads its number (0 to `core_count - 1`) from the `id` register, so the program can split the work between them.
+
+    The cores are interleaved one instruction at a time: the core that is furthest behind in cycles always goes next
+    (the lowest core ID on a tie), so runs are deterministic and an instruction never sees another core halfway through
+    one of its own. `tas` loads a byte and sets it to 1 in one instruction, to build locks with.
+
+    The computer takes as many cycles as its slowest core. `self.cpu` is core 0, which also gets the interrupts when
+    an interrupt controller is mapped.
+    """
+
+    def __init__(
+            self,
+            core_count: int = 2,
+            clock_speed_limiter_in_hertz: int = 0,
+            source_map: Optional[SourceMap] = None,
+            compact_encoding: bool = False,
+            dma_setup_cycles: int = 1,
+            dma_bytes_per_cycle: int = 4,
+            ram_size_in_bytes: int = isa.DEFAULT_RAM_SIZE_IN_BYTES,
+            ram_page_size_in_bytes: Optional[int] = None,
+            core_stack_size_in_bytes: int = 16
+    ):
+        """The stack section of the source map is split evenly between the cores, core 0 on top. Without one, each
+        core gets `core_stack_size_in_bytes` from the top of the RAM down, unchecked."""
+        if core_count < 1:
+            raise ValueError('A computer needs at least one core')
+        self.core_count = core_count
+        self.core_stack_size_in_bytes = core_stack_size_in_bytes
+        self.cores: List[CentralProcessingUnit] = []
+        super().__init__(
+            clock_speed_limiter_in_hertz=clock_speed_limiter_in_hertz,
+            source_map=source_map,
+            compact_encoding=compact_encoding,
+            dma_setup_cycles=dma_setup_cycles,
+            dma_bytes_per_cycle=dma_bytes_per_cycle,
+            ram_size_in_bytes=ram_size_in_bytes,
+            ram_page_size_in_bytes=ram_page_size_in_bytes
+        )
+        self.cores = [self.cpu] + [
+            CentralProcessingUnit(
+                alu=ArithmeticLogicUnit(),
+                ram=self._ram,
+                clock_speed_limiter_in_hertz=clock_speed_limiter_in_hertz,
+                compact_encoding=compact_encoding,
+                dma=self._dma,
+                core_id=core_id
+            )
+            for core_id in range(1, core_count)
+        ]
+        self._place_stacks()
+
+    @Computer.source_map.setter
+    def source_map(self, source_map: Optional[SourceMap]):
+        Computer.source_map.fset(self, source_map)
+        self._place_stacks()
+
+    def _place_stacks(self):
+        ram_size_in_bytes = self.ram.memory_size
+        stack_addresses = self.source_map.addresses_of_section(STACK_SECTION) if self.source_map is not None else []
+        if stack_addresses:
+            stack_size_in_bytes = (ram_size_in_bytes - min(stack_addresses)) // self.core_count
+        else:
+            stack_size_in_bytes = self.core_stack_size_in_bytes
+        for core in self.cores:
+            stack_top = ram_size_in_bytes - core.core_id * stack_size_in_bytes
+            stack_limit = stack_top - stack_size_in_bytes if stack_addresses else None
+            core.place_stack(stack_top % ram_size_in_bytes, stack_limit)
+
+    def run(self, max_cycles: int = 0):
+        """Runs until every core halts, or until every core that still runs executed `max_cycles` cycles when it is
+        greater than 0."""
+        start_time = time.perf_counter()
+        try:
+            running_cores = [core for core in self.cores if not core.halt]
+            while running_cores:
+                core = min(running_cores, key=lambda running_core: running_core.cycle_counter)
+                if 0 < max_cycles <= core.cycle_counter:
+                    break
+                if not (core.waiting and (core.skip_idle_cycles(max_cycles) or core.halt)):
+                    core.cycle()
+                if core.halt:
+                    running_cores.remove(core)
+        finally:
+            self.ram.flush_devices()
+        self._total_run_time = time.perf_counter() - start_time
+
+    def attach(self, scheduler: EventScheduler, quantum_in_cycles: int = 1) -> List[CoreProcess]:
+        """A process per core. Cores due at the same cycle go in order of core ID, as in `run`; a quantum of more than
+        one cycle lets a core run that many cycles before the others get a turn."""
+        return [
+            CoreProcess(scheduler, core, quantum_in_cycles, priority=core.core_id, on_halt=self.ram.flush_devices)
+            for core in self.cores
+        ]
+
+    @property
+    def cycle_counter(self) -> int:
+        """Cycles the whole run took: those of the core that finished last."""
+        return max(core.cycle_counter for core in self.cores)
+
+    def get_core_stats(self) -> List[Dict[str, int]]:
+        """Per core: the cycles it ran, the cycles it sat halted waiting for the last core to finish, and how many of
+        its test-and-sets found the byte already set (a lock another core held)."""
+        cycle_counter = self.cycle_counter
+        return [
+            {
+                'core': core.core_id,
+                'cycles': core.cycle_counter,
+                'idle_cycles': cycle_counter - core.cycle_counter,
+                'test_and_sets': core.test_and_sets,
+                'contended_test_and_sets': core.contended_test_and_sets,
+            }
+            for core in self.cores
+        ]
+
+    def get_contention_stats(self) -> Dict[str, float]:
+        """Totals over all cores. `busy_cycles / cycles` is how many cores were busy on average, an upper bound of the
+        speedup over running the same work on one core."""
+        stats = self.get_core_stats()
+        busy_cycles = sum(core_stats['cycles'] for core_stats in stats)
+        test_and_sets = sum(core_stats['test_and_sets'] for core_stats in stats)
+        contended_test_and_sets = sum(core_stats['contended_test_and_sets'] for core_stats in stats)
+        return {
+            'cycles': self.cycle_counter,
+            'busy_cycles': busy_cycles,
+            'idle_cycles': sum(core_stats['idle_cycles'] for core_stats in stats),
+            'parallelism': busy_cycles / self.cycle_counter if self.cycle_counter else 0.0,
+            'test_and_sets': test_and_sets,
+            'contended_test_and_sets': contended_test_and_sets,
+            'contention_rate': contended_test_and_sets / test_and_sets if test_and_sets else 0.0,
+        }
+
+    def status(self):
+        super().status()
+        print(self._core_status())
+
+    def _core_status(self) -> str:
+        lines = ['-----------------------']
+        for core, core_stats in zip(self.cores, self.get_core_stats()):
+            lines.append(
+                f'core {core.core_id}: {core_stats["cycles"]} cycles ({core_stats["idle_cycles"]} idle), '
+                f'ax={core.register_A.value} bx={core.register_B.value} cx={core.register_C.value} '
+                f'dx={core.register_D.value}, test-and-sets: {core_stats["test_and_sets"]} '
+                f'({core_stats["contended_test_and_sets"]} contended)'
+            )
+        stats = self.get_contention_stats()
+        lines.append(
+            f'{self.core_count} cores: {stats["cycles"]} cycles, {stats["busy_cycles"]} busy core cycles '
+            f'({stats["parallelism"]:.2f} cores busy on average), '
+            f'{stats["contention_rate"]:.0%} of the test-and-sets contended'
+        )
+        return '\n'.join(lines)
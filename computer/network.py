@@ -0,0 +1,162 @@
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+from .computer import Computer
+from .devices import Device
+from .events import CoreProcess, EventScheduler
+from .interrupts import InterruptController
+
+
+class MailboxDevice(Device):
+    """A computer's port to a `Network`. Node IDs are 16 bits wide, least significant byte first.
+
+    Registers: offsets 0 and 1 are the node to send to. Storing a byte at offset 2 sends it there; loading offset 2
+    takes the next received byte (0 when there is none). Offset 3 gives how many received bytes are waiting, offsets 4
+    and 5 the computer's own node ID, and offsets 6 and 7 the node the next received byte came from. When the mailbox
+    has an interrupt line, every byte that arrives requests it.
+    """
+    size_in_bytes = 8
+    DESTINATION_LOW = 0
+    DESTINATION_HIGH = 1
+    DATA = 2
+    RECEIVED = 3
+    NODE_LOW = 4
+    NODE_HIGH = 5
+    SOURCE_LOW = 6
+    SOURCE_HIGH = 7
+
+    def __init__(
+            self,
+            network: 'Network',
+            node_id: int,
+            interrupt_controller: Optional[InterruptController] = None,
+            interrupt_line: Optional[int] = None,
+            capacity_in_bytes: int = 256
+    ):
+        self.network = network
+        self.node_id = node_id
+        self.interrupt_controller = interrupt_controller
+        self.interrupt_line = interrupt_line
+        self.capacity_in_bytes = capacity_in_bytes
+        self.destination = 0
+        # (source node, byte)
+        self.inbox: Deque[Tuple[int, int]] = deque()
+        self.sent_bytes = 0
+        self.received_bytes = 0
+        self.dropped_bytes = 0
+
+    def read(self, offset: int) -> int:
+        if offset == self.DATA:
+            return self.inbox.popleft()[1] if self.inbox else 0
+        if offset == self.RECEIVED:
+            return min(len(self.inbox), 255)
+        if offset == self.DESTINATION_LOW or offset == self.DESTINATION_HIGH:
+            return self.destination >> 8 * (offset - self.DESTINATION_LOW) & 0xFF
+        if offset == self.NODE_LOW or offset == self.NODE_HIGH:
+            return self.node_id >> 8 * (offset - self.NODE_LOW) & 0xFF
+        source = self.inbox[0][0] if self.inbox else 0
+        return source >> 8 * (offset - self.SOURCE_LOW) & 0xFF
+
+    def write(self, offset: int, value: int):
+        if offset == self.DATA:
+            self.sent_bytes += 1
+            self.network.send(self.node_id, self.destination, value)
+        elif offset == self.DESTINATION_LOW or offset == self.DESTINATION_HIGH:
+            shift = 8 * (offset - self.DESTINATION_LOW)
+            self.destination = self.destination & ~(0xFF << shift) | value << shift
+
+    def deliver(self, source: int, value: int):
+        if len(self.inbox) >= self.capacity_in_bytes:
+            self.dropped_bytes += 1
+            return
+        self.inbox.append((source, value))
+        self.received_bytes += 1
+        if self.interrupt_controller is not None and self.interrupt_line is not None:
+            self.interrupt_controller.request(self.interrupt_line)
+
+
+class Network:
+    """Many computers, each with a `MailboxDevice`, running together under one `EventScheduler` and sending each other
+    bytes.
+
+    A byte arrives `latency_in_cycles` after the cycle it was sent in. The computers are stepped in batches of
+    `batch_in_cycles` cycles, so one can't see a byte before the batch it arrives in is over: a batch no longer than
+    the latency keeps every byte on time, longer ones trade accuracy for fewer events. A computer waiting in `wfi` with
+    its mailbox on an interrupt line costs nothing until a byte arrives.
+    """
+
+    def __init__(
+            self,
+            latency_in_cycles: int = 16,
+            batch_in_cycles: int = 16,
+            scheduler: Optional[EventScheduler] = None
+    ):
+        if latency_in_cycles < 1:
+            raise ValueError('Bytes take at least one cycle to arrive')
+        self.latency_in_cycles = latency_in_cycles
+        self.batch_in_cycles = batch_in_cycles
+        self.scheduler = EventScheduler() if scheduler is None else scheduler
+        self.computers: List[Computer] = []
+        self.mailboxes: List[MailboxDevice] = []
+        self._processes: List[List[CoreProcess]] = []
+        self.sent_bytes = 0
+        self.delivered_bytes = 0
+        self.undeliverable_bytes = 0
+
+    def __len__(self) -> int:
+        return len(self.computers)
+
+    def add_computer(
+            self,
+            computer: Computer,
+            mailbox_address: int,
+            interrupt_line: Optional[int] = None
+    ) -> int:
+        """Maps a mailbox into the computer at `mailbox_address` and attaches it to the scheduler. With
+        `interrupt_line`, arriving bytes request that line of the computer's interrupt controller, which must be
+        mapped first. Returns the computer's node ID."""
+        if interrupt_line is not None and computer.interrupt_controller is None:
+            raise ValueError('A mailbox needs an interrupt controller to request interrupts from')
+        node_id = len(self.computers)
+        mailbox = MailboxDevice(self, node_id, computer.interrupt_controller, interrupt_line)
+        computer.map_device(mailbox_address, mailbox)
+        self.computers.append(computer)
+        self.mailboxes.append(mailbox)
+        self._processes.append(computer.attach(self.scheduler, self.batch_in_cycles))
+        return node_id
+
+    def _sender_time(self, node_id: int) -> int:
+        for process in self._processes[node_id]:
+            if process.stepping:
+                return process.time
+        return self.scheduler.now
+
+    def send(self, source: int, destination: int, value: int):
+        self.sent_bytes += 1
+        if not 0 <= destination < len(self.mailboxes):
+            self.undeliverable_bytes += 1
+            return
+        mailbox = self.mailboxes[destination]
+
+        def deliver():
+            self.delivered_bytes += 1
+            mailbox.deliver(source, value)
+
+        self.scheduler.schedule_at(self._sender_time(source) + self.latency_in_cycles, deliver)
+
+    def run(self, until: Optional[int] = None) -> int:
+        """Runs until every computer halted or sleeps with nothing left to wake it up, or until cycle `until`. Returns
+        the events that ran."""
+        return self.scheduler.run(until=until)
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            'computers': len(self.computers),
+            'halted': sum(bool(computer.cpu.halt) for computer in self.computers),
+            'cycles': max((computer.cycle_counter for computer in self.computers), default=0),
+            'events': self.scheduler.processed_events,
+            'sent_bytes': self.sent_bytes,
+            'delivered_bytes': self.delivered_bytes,
+            'undeliverable_bytes': self.undeliverable_bytes,
+            'dropped_bytes': sum(mailbox.dropped_bytes for mailbox in self.mailboxes),
+        }
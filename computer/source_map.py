@@ -0,0 +1,109 @@
+import json
+import os
+from typing import List, Optional, NamedTuple, Dict
+
+STACK_SECTION = '.stack'
+
+
+class SourceLocation(NamedTuple):
+    file: str
+    line: Optional[int]
+    section: str
+    label: Optional[str]
+
+    def __str__(self):
+        label = f' ({self.label})' if self.label else ''
+        return f'{os.path.basename(self.file)}:{self.line} {self.section}{label}'
+
+
+class SourceMap:
+    """Maps every RAM address of an image to the assembly line it came from.
+
+    On disk it is a JSON file next to the .bin, with string tables and one row per mapped address:
+        {"version": 1, "size": 256, "files": [...], "sections": [...], "labels": [...],
+         "rows": [[address, file_index, line, section_index, label_index or -1], ...]}
+    In memory it is a list with one entry per address, so lookups are a single index.
+    """
+    VERSION = 1
+
+    def __init__(self, size_in_bytes: int):
+        self.size_in_bytes = size_in_bytes
+        self._locations: List[Optional[SourceLocation]] = [None] * size_in_bytes
+
+    def __len__(self):
+        return sum(location is not None for location in self._locations)
+
+    def add(self, address: int, location: SourceLocation):
+        self._locations[address] = location
+
+    def lookup(self, address: int) -> Optional[SourceLocation]:
+        if 0 <= address < self.size_in_bytes:
+            return self._locations[address]
+        return None
+
+    def addresses_of_section(self, section: str) -> List[int]:
+        return [
+            address for address, location in enumerate(self._locations)
+            if location is not None and location.section == section
+        ]
+
+    def addresses_of_line(self, file: str, line: int) -> List[int]:
+        return [
+            address for address, location in enumerate(self._locations)
+            if location is not None and location.file == file and location.line == line
+        ]
+
+    def to_dict(self) -> Dict:
+        tables: Dict[str, List[str]] = {'files': [], 'sections': [], 'labels': []}
+        indexes: Dict[str, Dict[str, int]] = {'files': {}, 'sections': {}, 'labels': {}}
+
+        def index_of(table: str, value: Optional[str]) -> int:
+            if value is None:
+                return -1
+            if value not in indexes[table]:
+                indexes[table][value] = len(tables[table])
+                tables[table].append(value)
+            return indexes[table][value]
+
+        rows = []
+        for address, location in enumerate(self._locations):
+            if location is not None:
+                rows.append([
+                    address,
+                    index_of('files', location.file),
+                    location.line,
+                    index_of('sections', location.section),
+                    index_of('labels', location.label),
+                ])
+        return {'version': self.VERSION, 'size': self.size_in_bytes, **tables, 'rows': rows}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'SourceMap':
+        source_map = cls(data['size'])
+        for address, file, line, section, label in data['rows']:
+            source_map.add(address, SourceLocation(
+                file=data['files'][file],
+                line=line,
+                section=data['sections'][section],
+                label=data['labels'][label] if label >= 0 else None,
+            ))
+        return source_map
+
+    def save(self, path: str):
+        with open(path, 'w') as file:
+            json.dump(self.to_dict(), file, separators=(',', ':'))
+
+    @classmethod
+    def load(cls, path: str) -> 'SourceMap':
+        with open(path, 'r') as file:
+            return cls.from_dict(json.load(file))
+
+    @staticmethod
+    def path_for_image(path_to_bin_file: str) -> str:
+        return f'{os.path.splitext(path_to_bin_file)[0]}.map'
+
+    @classmethod
+    def load_for_image(cls, path_to_bin_file: str) -> Optional['SourceMap']:
+        """Loads the source map written next to a .bin file, if there is one."""
+        path = cls.path_for_image(path_to_bin_file)
+        return cls.load(path) if os.path.isfile(path) else None
@@ -0,0 +1,98 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import List, Dict, Iterator, Optional
+
+from compiler.assembler import Assembler
+from compiler.errors import CompilerError
+from computer.source_map import SourceMap
+
+
+def load_bin_file(path_to_bin_file: str) -> List[str]:
+    with open(path_to_bin_file, 'r') as file:
+        return list(map(lambda line: line.replace('\n', ''), file.readlines()))
+
+
+def run_image(
+        image: List[str],
+        max_cycles: int = 0,
+        compact_encoding: bool = False,
+        source_map: Optional[SourceMap] = None
+) -> Dict[str, object]:
+    from computer.computer import Computer
+    computer = Computer(source_map=source_map, compact_encoding=compact_encoding, ram_size_in_bytes=len(image))
+    computer.ram.from_list(image)
+    computer.run(max_cycles=max_cycles)
+    return {
+        'halted': bool(computer.cpu.halt),
+        'cycles': computer.cpu.cycle_counter,
+        'run_time': computer.total_run_time,
+        'registers': computer.registers(),
+    }
+
+
+def run_bin_file(path_to_bin_file: str, max_cycles: int = 0, compact_encoding: bool = False) -> Dict[str, object]:
+    return run_image(
+        load_bin_file(path_to_bin_file), max_cycles=max_cycles, compact_encoding=compact_encoding,
+        source_map=SourceMap.load_for_image(path_to_bin_file)
+    )
+
+
+def process_file(
+        path: str,
+        output_folder: Optional[str] = None,
+        should_also_run: bool = False,
+        max_cycles: int = 0,
+        assembler_options: Optional[Dict[str, object]] = None
+) -> Dict[str, object]:
+    """Assembles (and optionally runs) a single .asm or .bin file. Never raises: failures are reported in the
+    returned dictionary, which is JSON serializable. `assembler_options` are extra `Assembler` keyword arguments."""
+    result: Dict[str, object] = {'file': path, 'status': 'ok'}
+    start_time = time.perf_counter()
+    try:
+        if not os.path.isfile(path):
+            raise FileNotFoundError(f'file "{path}" does not exist')
+
+        if path.endswith('.asm'):
+            assembler = Assembler(path_to_assembly_file=path, output_path=output_folder, **(assembler_options or {}))
+            result['output'] = assembler.compile()
+            result['source_map'] = SourceMap.path_for_image(result['output'])
+        elif path.endswith('.bin'):
+            result['output'] = path
+            should_also_run = True
+        else:
+            raise CompilerError('Wrong file format. It should end with ".asm" or ".bin"')
+
+        if should_also_run:
+            compact_encoding = bool((assembler_options or {}).get('compact_encoding', False))
+            result['run'] = run_bin_file(result['output'], max_cycles=max_cycles, compact_encoding=compact_encoding)
+    except Exception as err:
+        result['status'] = 'error'
+        result['error'] = {'type': type(err).__name__, 'message': str(err)}
+
+    result['elapsed'] = time.perf_counter() - start_time
+    return result
+
+
+def process_files(
+        paths: List[str],
+        output_folder: Optional[str] = None,
+        should_also_run: bool = False,
+        max_cycles: int = 0,
+        jobs: Optional[int] = None,
+        assembler_options: Optional[Dict[str, object]] = None
+) -> Iterator[Dict[str, object]]:
+    """Processes every file across a process pool, yielding each result as soon as it is ready. `jobs` defaults to
+    the CPU count; with a single job everything runs in the current process."""
+    if jobs == 1 or len(paths) <= 1:
+        for path in paths:
+            yield process_file(path, output_folder, should_also_run, max_cycles, assembler_options)
+        return
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = [
+            executor.submit(process_file, path, output_folder, should_also_run, max_cycles, assembler_options)
+            for path in paths
+        ]
+        for future in as_completed(futures):
+            yield future.result()
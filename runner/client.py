@@ -0,0 +1,36 @@
+import json
+import socket
+from typing import Dict, List, Iterator
+
+
+class DaemonClient:
+    """Thin client for `runner.daemon.AssemblerDaemon`. It only depends on the standard library, so it starts fast
+    and does not import the compiler or the computer."""
+
+    def __init__(self, socket_path: str):
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._socket.connect(socket_path)
+        self._file = self._socket.makefile('rwb')
+
+    def request(self, request: Dict) -> Dict:
+        self._file.write(json.dumps(request).encode() + b'\n')
+        self._file.flush()
+        return json.loads(self._file.readline())
+
+    def requests(self, requests: List[Dict]) -> Iterator[Dict]:
+        """Sends all requests at once and yields the responses in the same order."""
+        for request in requests:
+            self._file.write(json.dumps(request).encode() + b'\n')
+        self._file.flush()
+        for _ in requests:
+            yield json.loads(self._file.readline())
+
+    def close(self):
+        self._file.close()
+        self._socket.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
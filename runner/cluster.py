@@ -0,0 +1,36 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Dict, Iterator, List, Optional
+
+from computer.network import Network
+
+
+def run_partition(
+        build_network: Callable[[object], Network],
+        partition: object,
+        until: Optional[int] = None
+) -> Dict[str, object]:
+    """Builds the network of one partition and runs it. The result is JSON serializable, like `process_file`'s."""
+    network = build_network(partition)
+    network.run(until=until)
+    return {'partition': partition, **network.get_stats()}
+
+
+def run_partitions(
+        build_network: Callable[[object], Network],
+        partitions: List[object],
+        jobs: Optional[int] = None,
+        until: Optional[int] = None
+) -> Iterator[Dict[str, object]]:
+    """Runs a network per partition across a process pool, yielding each result as soon as it is ready. Partitions
+    don't talk to each other, so a cluster too big for one process has to be split where few bytes cross. The network
+    is built in the process that runs it, so `build_network` must be a module-level function. `jobs` defaults to the
+    CPU count; with a single job everything runs in the current process."""
+    if jobs == 1 or len(partitions) <= 1:
+        for partition in partitions:
+            yield run_partition(build_network, partition, until)
+        return
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = [executor.submit(run_partition, build_network, partition, until) for partition in partitions]
+        for future in as_completed(futures):
+            yield future.result()
@@ -0,0 +1,175 @@
+import json
+import os
+import socketserver
+import threading
+import time
+from typing import Dict, Tuple, Optional, List, Callable
+
+from compiler.assembler import Assembler
+from compiler.errors import CompilerError
+from computer.source_map import SourceMap
+from .batch import load_bin_file, run_image
+
+
+class ImageCache:
+    """Keeps assemblers and RAM images in memory, keyed by the source file's path, size and modification time, so
+    unchanged files are never parsed or assembled twice."""
+
+    def __init__(self):
+        self._entries: Dict[Tuple[str, str], Tuple[Tuple[int, int], Optional[Assembler], List[str]]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path: str, assembler_options: Optional[Dict] = None) -> Tuple[Optional[Assembler], List[str]]:
+        path = os.path.realpath(path)
+        stat = os.stat(path)
+        version = (stat.st_mtime_ns, stat.st_size)
+        assembler_options = assembler_options or {}
+        key = (path, json.dumps(assembler_options, sort_keys=True))
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self.hits += 1
+                return entry[1], entry[2]
+            self.misses += 1
+
+        if path.endswith('.asm'):
+            assembler = Assembler(path_to_assembly_file=path, **assembler_options)
+            image = assembler.assemble()
+        elif path.endswith('.bin'):
+            assembler = None
+            image = load_bin_file(path)
+        else:
+            raise CompilerError('Wrong file format. It should end with ".asm" or ".bin"')
+
+        with self._lock:
+            self._entries[key] = (version, assembler, image)
+        return assembler, image
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    server: 'AssemblerDaemon'
+
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+            except json.JSONDecodeError as err:
+                response = {'status': 'error', 'error': {'type': type(err).__name__, 'message': str(err)}}
+            else:
+                response = self.server.handle_request(request)
+            self.wfile.write(json.dumps(response).encode() + b'\n')
+            self.wfile.flush()
+
+
+class AssemblerDaemon(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Resident assembler/simulator listening on a Unix domain socket.
+
+    Every request is a JSON object on its own line, answered by a single JSON line:
+        {"op": "assemble", "path": "a.asm", "output": "out_folder"}   -> writes the .bin file
+        {"op": "run", "path": "a.bin", "max_cycles": 0}               -> runs a .bin (or .asm) image
+        {"op": "assemble_and_run", "path": "a.asm"}                   -> both of the above
+        {"op": "stats"} / {"op": "clear"} / {"op": "shutdown"}
+    Set "image": true to also receive the RAM image in the response, and "options" to pass extra `Assembler` keyword
+    arguments, e.g. {"optimize": true}.
+    """
+    daemon_threads = True
+
+    def __init__(self, socket_path: str):
+        self.socket_path = socket_path
+        self.cache = ImageCache()
+        self._operations: Dict[str, Callable[[Dict], Dict]] = {
+            'assemble': self._assemble,
+            'run': self._run,
+            'assemble_and_run': self._assemble_and_run,
+            'stats': self._stats,
+            'clear': self._clear,
+            'shutdown': self._shutdown,
+        }
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        super().__init__(socket_path, _RequestHandler)
+
+    def handle_request(self, request: Dict) -> Dict:
+        start_time = time.perf_counter()
+        try:
+            operation = self._operations[request['op']]
+        except (KeyError, TypeError):
+            return {'status': 'error', 'error': {'type': 'ValueError', 'message': f'Invalid operation in "{request}"'}}
+
+        try:
+            response = {'status': 'ok'}
+            response.update(operation(request))
+        except Exception as err:
+            response = {'status': 'error', 'error': {'type': type(err).__name__, 'message': str(err)}}
+
+        if 'path' in request:
+            response['file'] = request['path']
+        response['elapsed'] = time.perf_counter() - start_time
+        return response
+
+    def _assemble(self, request: Dict) -> Dict:
+        assembler, image = self.cache.get(request['path'], request.get('options'))
+        if assembler is None:
+            raise CompilerError('Wrong file format. It should end with ".asm"')
+
+        response = {}
+        if request.get('write', True):
+            response['output'] = assembler.write_compiled_code_to_file(image, output_path=request.get('output'))
+            response['source_map'] = SourceMap.path_for_image(response['output'])
+            assembler.get_source_map().save(response['source_map'])
+        if request.get('image', False):
+            response['image'] = image
+        return response
+
+    def _run(self, request: Dict) -> Dict:
+        assembler, image = self.cache.get(request['path'], request.get('options'))
+        compact_encoding = bool((request.get('options') or {}).get('compact_encoding', False))
+        # prebuilt .bin images have no assembler, only the .map file next to them
+        if assembler is not None:
+            source_map = assembler.get_source_map()
+        else:
+            source_map = SourceMap.load_for_image(request['path'])
+        response = {'run': run_image(
+            image, max_cycles=request.get('max_cycles', 0), compact_encoding=compact_encoding, source_map=source_map
+        )}
+        if request.get('image', False):
+            response['image'] = image
+        return response
+
+    def _assemble_and_run(self, request: Dict) -> Dict:
+        response = self._assemble(request)
+        response.update(self._run(request))
+        return response
+
+    def _stats(self, request: Dict) -> Dict:
+        return {'cached_images': len(self.cache), 'hits': self.cache.hits, 'misses': self.cache.misses}
+
+    def _clear(self, request: Dict) -> Dict:
+        self.cache.clear()
+        return {}
+
+    def _shutdown(self, request: Dict) -> Dict:
+        threading.Thread(target=self.shutdown, daemon=True).start()
+        return {}
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+
+def serve(socket_path: str):
+    with AssemblerDaemon(socket_path) as daemon:
+        daemon.serve_forever()
@@ -0,0 +1,31 @@
+import glob
+import os
+from typing import List
+
+
+def _has_glob_pattern(path: str) -> bool:
+    return any(character in path for character in '*?[')
+
+
+def _find_assembly_files_in_folder(folder: str) -> List[str]:
+    result = []
+    for root, folders, files in os.walk(folder):
+        folders.sort()
+        for file_name in sorted(files):
+            if file_name.endswith('.asm'):
+                result.append(os.path.join(root, file_name))
+    return result
+
+
+def expand_paths(paths: List[str]) -> List[str]:
+    """Returns the files referenced by the given paths, folders (searched recursively for .asm files) and globs,
+    in order and without duplicates. Paths that match nothing are kept, so they are reported as errors."""
+    result = []
+    for path in paths:
+        if os.path.isdir(path):
+            result += _find_assembly_files_in_folder(path)
+        elif _has_glob_pattern(path):
+            result += sorted(glob.glob(path, recursive=True))
+        else:
+            result.append(path)
+    return list(dict.fromkeys(result))
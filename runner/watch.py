@@ -0,0 +1,151 @@
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+from compiler.errors import CompilerError
+from computer.source_map import SourceMap, STACK_SECTION
+from .daemon import ImageCache
+from .paths import expand_paths
+
+
+class FileWatcher:
+    """Polls files, folders and globs for changes. Only the size and modification time of each file are checked, so a
+    poll costs one `stat` per file."""
+
+    def __init__(self, paths: List[str]):
+        self.paths = paths
+        self._versions: Dict[str, Tuple[int, int]] = {}
+
+    def poll(self) -> List[str]:
+        """Files that were created or changed since the last poll (every file, on the first one)."""
+        changed = []
+        versions = {}
+        for path in expand_paths(self.paths):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            versions[path] = (stat.st_mtime_ns, stat.st_size)
+            if self._versions.get(path) != versions[path]:
+                changed.append(path)
+        self._versions = versions
+        return changed
+
+
+def hot_swap(computer, image: List[str], source_map: Optional[SourceMap] = None, reset_registers: bool = False):
+    """Loads a new image into a computer that may be in the middle of running another version of it.
+
+    When both the old and the new image have source maps, a variable that is still at the same address keeps its
+    current value, and so does the stack where it didn't move; every other byte (code, free space, new or moved
+    variables) is replaced. The registers are kept, so the program goes on from where it was, unless `reset_registers`
+    is set or the computer had already halted: then it starts over from address 0.
+    """
+    old_source_map = computer.source_map
+    memory = computer.ram.memory
+    for address, byte in enumerate(image):
+        if old_source_map is not None and source_map is not None:
+            old_location = old_source_map.lookup(address)
+            new_location = source_map.lookup(address)
+            if (
+                    old_location is not None and new_location is not None
+                    and old_location.section == new_location.section == '.data'
+                    and old_location.label == new_location.label
+            ):
+                continue
+            if (
+                    old_location is not None and new_location is not None
+                    and old_location.section == new_location.section == STACK_SECTION
+            ):
+                continue
+        memory[address] = int(byte, 2)
+
+    computer.source_map = source_map
+    if reset_registers or computer.cpu.halt:
+        computer.cpu.reset()
+
+
+class WatchSession:
+    """Reassembles watched .asm files whenever they change and, optionally, keeps running one of them on a `Computer`,
+    hot-swapping each new version of it into the running computer.
+
+    Parsed and assembled files are kept in an `ImageCache`, so a change only reassembles the file that changed.
+    """
+
+    def __init__(
+            self,
+            paths: List[str],
+            output_folder: Optional[str] = None,
+            assembler_options: Optional[Dict[str, object]] = None,
+            run_path: Optional[str] = None,
+            reset_registers: bool = False,
+            cycles_per_poll: int = 1000,
+            poll_interval_in_seconds: float = 0.5,
+            output=print
+    ):
+        self.watcher = FileWatcher(paths)
+        self.cache = ImageCache()
+        self.output_folder = output_folder
+        self.assembler_options = assembler_options or {}
+        self.run_path = None if run_path is None else os.path.realpath(run_path)
+        self.reset_registers = reset_registers
+        self.cycles_per_poll = cycles_per_poll
+        self.poll_interval_in_seconds = poll_interval_in_seconds
+        self.output = output
+        self.computer = None
+
+    def _log(self, message: str):
+        self.output(f'[Watch] {message}')
+
+    def assemble(self, path: str) -> Optional[Tuple[List[str], SourceMap]]:
+        """Assembles a file and writes its .bin and .map. Errors are reported, not raised, so watching goes on."""
+        start_time = time.perf_counter()
+        try:
+            assembler, image = self.cache.get(path, self.assembler_options)
+            path_to_bin_file = assembler.write_compiled_code_to_file(image, self.output_folder)
+            source_map = assembler.get_source_map()
+            source_map.save(SourceMap.path_for_image(path_to_bin_file))
+        except (CompilerError, OSError, ValueError, KeyError, IndexError) as err:
+            self._log(f'{path}: {type(err).__name__}: {err}')
+            return None
+        self._log(f'{path} -> {path_to_bin_file} ({time.perf_counter() - start_time:.3f}s)')
+        return image, source_map
+
+    def _load(self, image: List[str], source_map: SourceMap):
+        from computer.computer import Computer
+        if self.computer is None:
+            self.computer = Computer(
+                source_map=source_map,
+                compact_encoding=bool(self.assembler_options.get('compact_encoding', False)),
+                ram_size_in_bytes=len(image)
+            )
+            self.computer.ram.from_list(image)
+            self._log(f'running {self.run_path}')
+            return
+        hot_swap(self.computer, image, source_map, self.reset_registers)
+        self._log(f'reloaded {self.run_path} at cycle {self.computer.cpu.cycle_counter}')
+
+    def poll(self):
+        for path in self.watcher.poll():
+            if not path.endswith('.asm'):
+                continue
+            result = self.assemble(path)
+            if result is not None and self.run_path == os.path.realpath(path):
+                self._load(*result)
+
+    def step(self) -> bool:
+        """Runs the computer for a while. Returns False when there is nothing to run."""
+        if self.computer is None or self.computer.cpu.halt:
+            return False
+        self.computer.run(max_cycles=self.computer.cpu.cycle_counter + self.cycles_per_poll)
+        if self.computer.cpu.halt:
+            self._log(f'halted after {self.computer.cpu.cycle_counter} cycles, registers: {self.computer.registers()}')
+        return True
+
+    def serve_forever(self):
+        next_poll_time = 0
+        while True:
+            if time.perf_counter() >= next_poll_time:
+                self.poll()
+                next_poll_time = time.perf_counter() + self.poll_interval_in_seconds
+            if not self.step():
+                time.sleep(self.poll_interval_in_seconds)
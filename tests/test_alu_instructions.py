@@ -0,0 +1,99 @@
+import pytest
+
+from computer.computer import Computer
+from .utils import assemble_image
+
+NEGATIVE = 0b100
+ZERO = 0b010
+
+
+def run_operation(directory, operation: str, a: int, b: int) -> dict:
+    image = assemble_image(directory, f'''
+section .text
+    ldi ax, {a}
+    ldi bx, {b}
+    {operation} ax, bx
+    hlt
+''')
+    computer = Computer()
+    computer.ram.from_list(image)
+    computer.run(max_cycles=50)
+    return computer.registers()
+
+
+@pytest.mark.parametrize('operation, a, b, result', [
+    ('and', 0b1100, 0b1010, 0b1000),
+    ('or', 0b1100, 0b1010, 0b1110),
+    ('xor', 0b1100, 0b1010, 0b0110),
+    ('shl', 0b10000001, 1, 0b00000010),
+    ('shr', 0b10000001, 7, 0b00000001),
+    ('rol', 0b10000001, 1, 0b00000011),
+    ('ror', 0b10000001, 1, 0b11000000),
+    ('mul', 20, 30, 600 & 0xFF),
+    ('mulh', 20, 30, 600 >> 8),
+    ('mulh', 255, 255, 254),
+    ('div', 200, 7, 28),
+    ('mod', 200, 7, 4),
+])
+def test_result_goes_to_accumulator(tmp_path, operation, a, b, result):
+    registers = run_operation(tmp_path, operation, a, b)
+
+    assert registers['acc'] == result
+    assert (registers['ax'], registers['bx']) == (a, b)
+
+
+@pytest.mark.parametrize('operation', ['shl', 'shr', 'rol', 'ror'])
+def test_shift_amount_is_taken_modulo_8(tmp_path, operation):
+    assert run_operation(tmp_path, operation, 0b10010110, 11)['acc'] == \
+        run_operation(tmp_path, operation, 0b10010110, 3)['acc']
+
+
+def test_division_by_zero(tmp_path):
+    assert run_operation(tmp_path, 'div', 5, 0)['acc'] == 255
+    assert run_operation(tmp_path, 'mod', 5, 0)['acc'] == 5
+
+
+@pytest.mark.parametrize('operation', ['and', 'xor', 'shl', 'rol', 'mul', 'mulh', 'div', 'mod'])
+def test_zero_flag_compares_both_registers(tmp_path, operation):
+    assert run_operation(tmp_path, operation, 9, 9)['sr'] & ZERO
+    assert not run_operation(tmp_path, operation, 9, 3)['sr'] & ZERO
+
+
+@pytest.mark.parametrize('operation, a, b', [('mul', 128, 2), ('shl', 255, 7), ('xor', 255, 0)])
+def test_results_never_set_the_negative_flag(tmp_path, operation, a, b):
+    assert not run_operation(tmp_path, operation, a, b)['sr'] & NEGATIVE
+
+
+def test_not_inverts_in_place(tmp_path):
+    image = assemble_image(tmp_path, '''
+section .text
+    ldi ax, 165
+    not ax
+    hlt
+''')
+    computer = Computer()
+    computer.ram.from_list(image)
+    computer.run(max_cycles=50)
+
+    assert computer.registers()['ax'] == 90
+
+
+def test_result_is_read_through_the_stack(tmp_path):
+    image = assemble_image(tmp_path, '''
+section .text
+    ldi ax, 12
+    ldi bx, 5
+    mul ax, bx
+    push acc
+    pop cx
+    mod cx, bx
+    push acc
+    pop dx
+    hlt
+''')
+    computer = Computer()
+    computer.ram.from_list(image)
+    computer.run(max_cycles=50)
+    registers = computer.registers()
+
+    assert (registers['cx'], registers['dx']) == (60, 0)
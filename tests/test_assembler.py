@@ -0,0 +1,36 @@
+from runner.batch import run_image
+from .utils import assemble_source
+
+# loads the addresses of its variables with `ldi`, so they must fit in a register
+BUFFERS = '''
+section .data
+    first = 7
+    second = 9
+    copy = 0
+    copy2 = 0
+    sum = 0
+
+section .text
+    ldi bx, second
+    ld ax, [bx+1]
+    ldi dx, copy2
+    ldi cx, 2
+    memcpy dx, bx
+    ld dx, copy2
+    add ax, dx
+    st ax, sum
+    hlt
+'''
+
+
+def test_large_ram_keeps_variables_below_address_256(tmp_path):
+    results = {}
+    for ram_size_in_bytes in (256, 65536):
+        assembler = assemble_source(tmp_path, BUFFERS, ram_size_in_bytes=ram_size_in_bytes)
+        assert assembler.data_end_address == 256
+        results[ram_size_in_bytes] = run_image(assembler.assemble(), max_cycles=1000)
+
+    assert results[65536]['halted']
+    # `first`, read right above `second`, plus `second` copied to `copy2`
+    assert results[256]['registers']['acc'] == 16
+    assert results[65536]['registers']['acc'] == results[256]['registers']['acc']
@@ -0,0 +1,30 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from .utils import write_source
+
+CLI = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'asm-cli.py')
+
+
+def run_cli(*arguments: str) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, CLI, *arguments], capture_output=True, text=True, timeout=60)
+
+
+@pytest.mark.parametrize('arguments, message', [
+    (['-ram', 'big'], '"-ram" expects a number, not "big"'),
+    (['-cores', '0', '-run'], '"-cores" must be at least 1'),
+    (['-console'], 'Missing value for "-console"'),
+    (['-batch', '-jobs', 'x'], '"-jobs" expects a number, not "x"'),
+    (['-batch', '-console', '200', '-run'], '-console can only be used to run a single file or linked objects'),
+    (['-watch', '-cores', '2'], '-cores can only be used to run a single file or linked objects'),
+])
+def test_bad_options_are_reported(tmp_path, arguments, message):
+    path = write_source(tmp_path, 'section .text\n    hlt\n')
+    result = run_cli(path, *arguments)
+
+    assert result.returncode == 2
+    assert f'[Assembler] (Error): {message}' in result.stderr
+    assert 'Traceback' not in result.stderr
@@ -0,0 +1,96 @@
+import os
+import threading
+
+import pytest
+
+from compiler.assembler import Assembler
+from runner.batch import run_bin_file
+from runner.client import DaemonClient
+from runner.daemon import AssemblerDaemon
+from .utils import write_source
+
+COUNTDOWN = '''
+section .text
+    ldi ax, 3
+    ldi bx, 0
+label loop:
+    inc bx
+    subi ax, 1
+    cmpi ax, 0
+    jne loop
+    hlt
+'''
+
+
+@pytest.fixture
+def daemon_socket(tmp_path):
+    socket_path = os.path.join(str(tmp_path), 'daemon.sock')
+    daemon = AssemblerDaemon(socket_path)
+    thread = threading.Thread(target=daemon.serve_forever, daemon=True)
+    thread.start()
+    yield socket_path
+    daemon.shutdown()
+    daemon.server_close()
+    thread.join()
+
+
+def test_run_prebuilt_bin_file(tmp_path, daemon_socket):
+    path_to_bin_file = Assembler(write_source(tmp_path, COUNTDOWN)).compile()
+
+    with DaemonClient(daemon_socket) as client:
+        response = client.request({'op': 'run', 'path': path_to_bin_file})
+
+    assert response['status'] == 'ok', response
+    expected = run_bin_file(path_to_bin_file)
+    assert response['run']['halted']
+    assert response['run']['registers']['bx'] == 3
+    assert response['run']['cycles'] == expected['cycles']
+    assert response['run']['registers'] == expected['registers']
+
+
+def test_unchanged_sources_are_assembled_once(tmp_path, daemon_socket):
+    path = write_source(tmp_path, COUNTDOWN)
+    request = {'op': 'assemble', 'path': path, 'write': False, 'image': True}
+
+    with DaemonClient(daemon_socket) as client:
+        first, second = client.requests([request, request])
+        optimized = client.request({**request, 'options': {'optimize': True}})
+        stats = client.request({'op': 'stats'})
+
+    assert first['image'] == second['image'] == Assembler(path).assemble()
+    assert optimized['image'] == Assembler(path, optimize=True).assemble()
+    # the assembler options are part of the cache key
+    assert (stats['cached_images'], stats['hits'], stats['misses']) == (2, 1, 2)
+
+
+def test_edited_source_is_assembled_again(tmp_path, daemon_socket):
+    path = write_source(tmp_path, COUNTDOWN)
+    request = {'op': 'assemble_and_run', 'path': path, 'output': str(tmp_path)}
+
+    with DaemonClient(daemon_socket) as client:
+        before = client.request(request)
+        write_source(tmp_path, COUNTDOWN.replace('ldi ax, 3', 'ldi ax, 12'))
+        after = client.request(request)
+        stats = client.request({'op': 'stats'})
+
+    assert before['run']['registers']['bx'] == 3
+    assert after['run']['registers']['bx'] == 12
+    assert os.path.exists(after['output']) and os.path.exists(after['source_map'])
+    # assemble_and_run looks the image up twice: it assembles it, then runs the cached image
+    assert (stats['hits'], stats['misses']) == (2, 2)
+
+
+def test_errors_are_answered_and_the_daemon_keeps_serving(tmp_path, daemon_socket):
+    broken = write_source(tmp_path, 'section .text\n    ldi ax, nowhere\n    hlt\n', name='broken.asm')
+
+    with DaemonClient(daemon_socket) as client:
+        unknown, failed, running = client.requests([
+            {'op': 'format'},
+            {'op': 'run', 'path': broken},
+            {'op': 'run', 'path': write_source(tmp_path, COUNTDOWN)},
+        ])
+
+    assert unknown['status'] == 'error' and unknown['error']['type'] == 'ValueError'
+    assert failed['status'] == 'error' and failed['error']['type'] == 'CompilerError'
+    assert failed['file'] == broken
+    assert running['status'] == 'ok' and running['run']['registers']['bx'] == 3
@@ -0,0 +1,77 @@
+from compiler.optimizer import eliminate_dead_code
+from compiler.parser import get_parsed_code_from_file
+from runner.batch import run_image
+from .utils import assemble_source, write_source
+
+PROGRAM = '''
+section .data
+    used = 5
+    read_by_helper = 2
+    unused = 9
+    read_by_dead_code = 1
+
+section .text
+    ld ax, used
+    call entry
+    ldi dx, handler
+    hlt
+
+section .subroutines
+entry:
+    call helper
+    ret
+helper:
+    ld bx, read_by_helper
+    ret
+never_called:
+    ld cx, read_by_dead_code
+    call helper
+    ret
+handler:
+    iret
+'''
+
+
+def names(parsed_code) -> tuple:
+    return (
+        [subroutine['label'] for subroutine in parsed_code['subroutines']],
+        [variable['variable_name'] for variable in parsed_code['data']],
+    )
+
+
+def test_unreachable_subroutines_and_unused_variables_are_dropped(tmp_path):
+    parsed_code = get_parsed_code_from_file(write_source(tmp_path, PROGRAM))
+
+    assert eliminate_dead_code(parsed_code)
+    # subroutines reached through other subroutines or only by their address are kept
+    assert names(parsed_code) == (['entry', 'helper', 'handler'], ['used', 'read_by_helper'])
+    assert not eliminate_dead_code(parsed_code)
+
+
+def test_dropped_code_frees_ram(tmp_path):
+    assembler = assemble_source(tmp_path, PROGRAM)
+    optimized_assembler = assemble_source(tmp_path, PROGRAM, optimize=True)
+    result = run_image(assembler.assemble(), max_cycles=100)
+    optimized_result = run_image(optimized_assembler.assemble(), max_cycles=100)
+
+    assert (optimized_result['registers']['ax'], optimized_result['registers']['bx']) == (5, 2)
+    assert optimized_result['registers']['bx'] == result['registers']['bx']
+    # the remaining subroutines sit right below the variables, so the free RAM under them grows
+    assert min(int(subroutine['ram_address'], 2) for subroutine in optimized_assembler.subroutines) > \
+        min(int(subroutine['ram_address'], 2) for subroutine in assembler.subroutines)
+
+
+def test_nothing_is_dropped_when_a_literal_address_points_into_the_variables(tmp_path):
+    # the variables sit right below the stack, with `unused` at $237
+    source = PROGRAM.replace('    hlt', '    ld cx, $237\n    hlt')
+    parsed_code = get_parsed_code_from_file(write_source(tmp_path, source))
+
+    assert not eliminate_dead_code(parsed_code)
+    assert len(parsed_code['subroutines']) == 4 and len(parsed_code['data']) == 4
+
+
+def test_nothing_is_dropped_when_memory_is_accessed_through_registers(tmp_path):
+    source = PROGRAM.replace('    hlt', '    ldi bx, 100\n    ld cx, [bx+0]\n    hlt')
+    parsed_code = get_parsed_code_from_file(write_source(tmp_path, source))
+
+    assert not eliminate_dead_code(parsed_code)
@@ -0,0 +1,53 @@
+import io
+
+import pytest
+
+from computer.computer import Computer
+from computer.devices import ConsoleDevice
+from .utils import assemble_source
+
+CONSOLE_ADDRESS = 200
+
+# stores the flush command, then reads the console's control register back: it holds 0 bytes by then
+READ_BACK = '''
+section .text
+    ldi ax, 72
+    st ax, $200
+    st ax, $201
+    ld ax, $201
+    hlt
+'''
+
+
+def run_with_console(assembler) -> tuple:
+    stream = io.BytesIO()
+    computer = Computer(ram_size_in_bytes=assembler.ram_size_in_bytes)
+    computer.ram.from_list(assembler.assemble())
+    computer.map_device(CONSOLE_ADDRESS, ConsoleDevice(stream))
+    computer.run(max_cycles=100)
+    return computer.registers(), stream.getvalue()
+
+
+@pytest.mark.parametrize('compact_encoding', [False, True])
+def test_optimizer_keeps_loads_from_devices(tmp_path, compact_encoding):
+    registers, output = run_with_console(assemble_source(tmp_path, READ_BACK, compact_encoding=compact_encoding))
+    optimized_registers, optimized_output = run_with_console(
+        assemble_source(tmp_path, READ_BACK, compact_encoding=compact_encoding, optimize=True)
+    )
+
+    assert registers['ax'] == 0
+    assert output == optimized_output == b'H'
+    assert optimized_registers['ax'] == registers['ax']
+
+
+def test_console_buffers_until_flushed(tmp_path):
+    stream = io.BytesIO()
+    console = ConsoleDevice(stream, buffer_size_in_bytes=4)
+    for byte in b'abc':
+        console.write(ConsoleDevice.DATA, byte)
+    assert stream.getvalue() == b''
+    assert console.read(ConsoleDevice.CONTROL) == 3
+
+    console.write(ConsoleDevice.DATA, ord('d'))
+    assert stream.getvalue() == b'abcd'
+    assert console.flushes == 1
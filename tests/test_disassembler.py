@@ -0,0 +1,88 @@
+import pytest
+
+from compiler.disassembler import Disassembler
+from .utils import assemble_source
+
+SOURCE = '''
+section .data
+    counter = 3
+    limit = 250
+
+section .text
+    ld bx, limit
+label loop:
+    ld ax, counter
+    inc ax
+    st ax, counter
+    ldi cx, 5
+    ld dx, [bx+2]
+    cmp ax, bx
+    jne loop
+    call bump
+    hlt
+
+section .subroutines
+bump:
+    push ax
+    pop ax
+    ret
+'''
+
+INSTRUCTIONS = [
+    'ld bx, limit', 'ld ax, counter', 'inc ax', 'st ax, counter', 'ldi cx, 5', 'ld dx, [bx+2]', 'cmp ax, bx',
+    'jne loop', 'call bump', 'hlt', 'push ax', 'pop ax', 'ret',
+]
+
+
+def disassembler_for(assembler, with_source_map: bool = True) -> Disassembler:
+    return Disassembler(
+        assembler.get_source_map() if with_source_map else None,
+        assembler.operation_compiler.compact_encoding,
+        assembler.ram_size_in_bytes
+    )
+
+
+@pytest.mark.parametrize('assembler_options', [
+    {},
+    {'compact_encoding': True},
+    {'ram_size_in_bytes': 65536},
+    {'ram_size_in_bytes': 65536, 'compact_encoding': True},
+])
+def test_disassembly_gives_back_the_source(tmp_path, assembler_options):
+    assembler = assemble_source(tmp_path, SOURCE, **assembler_options)
+    image = assembler.assemble()
+    instructions = disassembler_for(assembler).disassemble(image)
+
+    code = [instruction for instruction in instructions if instruction['mnemonic'] != 'db']
+    assert [instruction['text'] for instruction in code] == INSTRUCTIONS
+    for instruction in instructions:
+        address = instruction['address']
+        assert instruction['bytes'] == [int(byte, 2) for byte in image[address:address + len(instruction['bytes'])]]
+
+    data = {
+        instruction['address']: instruction['text'] for instruction in instructions if instruction['mnemonic'] == 'db'
+    }
+    assert sorted(data.values()) == ['db 250', 'db 3']
+
+
+def test_addresses_are_as_wide_as_the_ram(tmp_path):
+    for ram_size_in_bytes, jne_size in ((256, 2), (65536, 3)):
+        assembler = assemble_source(tmp_path, SOURCE, ram_size_in_bytes=ram_size_in_bytes)
+        instructions = disassembler_for(assembler, with_source_map=False).disassemble(assembler.assemble(), 0, 24)
+        jump = next(instruction for instruction in instructions if instruction['mnemonic'] == 'jne')
+        assert len(jump['bytes']) == jne_size
+        # without a source map, addresses stay numbers
+        loop_address = int(assembler.raw_labels[0]['value'], 2)
+        assert jump['text'] == f'jne ${loop_address}'
+
+
+def test_listing_names_symbols_from_the_source_map(tmp_path):
+    assembler = assemble_source(tmp_path, SOURCE)
+    listing = disassembler_for(assembler).listing(assembler.assemble())
+    lines = {line.split()[0]: line for line in listing.splitlines()}
+
+    assert 'loop:' in lines['2'] and 'ld ax, counter' in lines['2'] and '; line 9' in lines['2']
+    counter_line = next(line for line in lines.values() if 'counter:' in line)
+    assert 'db 3' in counter_line and '; line 3' in counter_line
+    bump_line = next(line for line in lines.values() if 'bump:' in line)
+    assert 'push ax' in bump_line and '; line 21' in bump_line
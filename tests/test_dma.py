@@ -0,0 +1,100 @@
+from math import ceil
+
+import pytest
+
+from compiler.analysis import CostEstimator
+from computer.computer import Computer
+from .utils import assemble_source
+
+# copies the 6 bytes at $100 to $102 (overlapping) and fills $120 onwards with 7s
+TRANSFERS = '''
+section .text
+    ldi ax, 102
+    ldi bx, 100
+    ldi cx, 6
+    memcpy ax, bx
+    ldi ax, 120
+    ldi bx, 7
+    ldi cx, 9
+    memset ax, bx
+    hlt
+'''
+
+
+def block_program(operation: str, length: int) -> str:
+    return f'''
+section .text
+    ldi ax, 100
+    ldi bx, 140
+    ldi cx, {length}
+    {operation} ax, bx
+    hlt
+'''
+
+
+def run(assembler, **computer_options) -> Computer:
+    computer = Computer(**computer_options)
+    computer.ram.from_list(assembler.assemble())
+    computer.run(max_cycles=100)
+    return computer
+
+
+def test_transfer_results(tmp_path):
+    assembler = assemble_source(tmp_path, TRANSFERS)
+    computer = Computer()
+    computer.ram.from_list(assembler.assemble())
+    computer.ram.memory[100:106] = bytearray([1, 2, 3, 4, 5, 6])
+    computer.run(max_cycles=100)
+    memory = computer.ram.memory
+
+    # the source block is read as a whole before the overlapping destination is written
+    assert list(memory[100:108]) == [1, 2, 1, 2, 3, 4, 5, 6]
+    assert list(memory[119:130]) == [0] + [7] * 9 + [0]
+    assert computer.dma.transferred_bytes == 15
+
+
+def test_blocks_wrap_around_the_end_of_ram(tmp_path):
+    assembler = assemble_source(tmp_path, '''
+section .text
+    ldi ax, 250
+    ldi bx, 9
+    ldi cx, 8
+    memset ax, bx
+    hlt
+''')
+    computer = run(assembler)
+
+    assert list(computer.ram.memory[250:256]) == [9] * 6
+    assert list(computer.ram.memory[:2]) == [9, 9]
+
+
+@pytest.mark.parametrize('operation', ['memcpy', 'memset'])
+@pytest.mark.parametrize('setup_cycles, bytes_per_cycle', [(1, 4), (3, 1), (2, 5)])
+def test_cpu_stalls_for_the_transfer(tmp_path, operation, setup_cycles, bytes_per_cycle):
+    options = {'dma_setup_cycles': setup_cycles, 'dma_bytes_per_cycle': bytes_per_cycle}
+    empty = run(assemble_source(tmp_path, block_program(operation, 0)), **options)
+
+    for length in (1, 4, 13, 40):
+        computer = run(assemble_source(tmp_path, block_program(operation, length)), **options)
+
+        assert computer.cycle_counter - empty.cycle_counter == ceil(length / bytes_per_cycle)
+    # an empty block still pays the setup, on top of the instruction's own cycle
+    assert empty.cycle_counter - run(assemble_source(tmp_path, block_program(operation, 0))).cycle_counter == \
+        setup_cycles - 1
+
+
+def test_dma_arguments_are_validated():
+    with pytest.raises(ValueError):
+        Computer(dma_setup_cycles=0)
+    with pytest.raises(ValueError):
+        Computer(dma_bytes_per_cycle=0)
+
+
+@pytest.mark.parametrize('setup_cycles, bytes_per_cycle', [(1, 4), (3, 2)])
+def test_cost_estimate_matches_the_stall(tmp_path, setup_cycles, bytes_per_cycle):
+    assembler = assemble_source(tmp_path, TRANSFERS)
+    estimator = CostEstimator(assembler, dma_setup_cycles=setup_cycles, dma_bytes_per_cycle=bytes_per_cycle)
+    computer = run(assembler, dma_setup_cycles=setup_cycles, dma_bytes_per_cycle=bytes_per_cycle)
+
+    assert estimator.variable_cost_addresses() == []
+    assert estimator.total_cost() == computer.cycle_counter
@@ -0,0 +1,106 @@
+import pytest
+
+from computer.computer import Computer
+from computer.events import EventScheduler
+from computer.interrupts import TimerDevice
+from .utils import assemble_source
+
+LOOP = '''
+section .data
+    counter = 0
+
+section .text
+    ldi bx, 6
+    ldi ax, 0
+    dly ax
+label loop:
+    call bump
+    cmp ax, bx
+    jne loop
+    hlt
+
+section .subroutines
+bump:
+    ld ax, counter
+    inc ax
+    st ax, counter
+    ret
+'''
+
+# starts a one-shot timer of 40 cycles on the controller at 100, and sleeps until its interrupt
+SLEEP = '''
+section .text
+    ldi ax, tick
+    st ax, $100
+    ldi ax, 40
+    st ax, $108
+    ldi ax, 3
+    st ax, $110
+    ei
+    wfi
+    hlt
+
+section .subroutines
+tick:
+    ldi dx, 1
+    iret
+'''
+
+
+def load(assembler, with_timer: bool = False) -> Computer:
+    computer = Computer()
+    computer.ram.from_list(assembler.assemble())
+    if with_timer:
+        computer.map_interrupt_controller(100)
+        computer.map_timer(108)
+    return computer
+
+
+@pytest.mark.parametrize('quantum_in_cycles', [1, 16])
+@pytest.mark.parametrize('source, with_timer', [(LOOP, False), (SLEEP, True)])
+def test_scheduler_runs_a_computer_like_run(tmp_path, source, with_timer, quantum_in_cycles):
+    assembler = assemble_source(tmp_path, source)
+    expected = load(assembler, with_timer)
+    expected.run(max_cycles=10000)
+
+    computer = load(assembler, with_timer)
+    scheduler = EventScheduler()
+    computer.attach(scheduler, quantum_in_cycles)
+    scheduler.run(until=10000)
+
+    assert computer.cpu.halt
+    assert computer.registers() == expected.registers()
+    assert computer.cycle_counter == expected.cycle_counter
+
+
+def test_timer_interrupt_comes_at_its_cycle(tmp_path):
+    computer = load(assemble_source(tmp_path, SLEEP), with_timer=True)
+    scheduler = EventScheduler()
+    [process] = computer.attach(scheduler)
+    requests = []
+    computer.interrupt_controller.on_request(lambda line: requests.append(process.time))
+    timer_started = []
+    timer = next(device for address, device in computer.ram.devices if isinstance(device, TimerDevice))
+    write = timer.write
+    timer.write = lambda offset, value: (timer_started.append(process.time), write(offset, value))
+    scheduler.run()
+
+    # the timer counts from the cycle of the `st` that starts it
+    assert requests == [timer_started[-1] + 40]
+    # sleeping in `wfi` takes no events, its cycles are skipped at once
+    assert computer.cpu.skipped_idle_cycles >= 30
+    assert scheduler.processed_events < computer.cycle_counter / 2
+
+
+def test_events_run_at_their_time_between_cpu_cycles(tmp_path):
+    computer = load(assemble_source(tmp_path, LOOP))
+    scheduler = EventScheduler()
+    computer.attach(scheduler)
+    seen = []
+    for time in (5, 20):
+        scheduler.schedule_at(time, lambda: seen.append((scheduler.now, computer.cycle_counter)))
+    scheduler.run()
+
+    assert seen == [(5, 5), (20, 20)]
+    with pytest.raises(ValueError):
+        scheduler.schedule_at(scheduler.now - 1, lambda: None)
@@ -0,0 +1,74 @@
+import pytest
+
+from compiler.optimizer import inline_subroutines
+from compiler.parser import get_parsed_code_from_file
+from runner.batch import run_image
+from .utils import assemble_image, write_source
+
+DOUBLE = '''
+section .text
+    ldi ax, 3
+    call double
+    call double
+    hlt
+
+section .subroutines
+double:
+    add ax, ax
+    push acc
+    pop ax
+    ret
+'''
+
+
+def test_small_subroutine_replaces_its_calls(tmp_path):
+    parsed_code = get_parsed_code_from_file(write_source(tmp_path, DOUBLE))
+
+    assert inline_subroutines(parsed_code)
+    assert [line['operation'] for line in parsed_code['text']] == ['ldi'] + ['add', 'push', 'pop'] * 2 + ['hlt']
+    # the subroutine itself is left for dead code elimination
+    assert [subroutine['label'] for subroutine in parsed_code['subroutines']] == ['double']
+
+
+def test_inlining_saves_the_call_and_ret_cycles(tmp_path):
+    plain = run_image(assemble_image(tmp_path, DOUBLE), max_cycles=100)
+    inlined = run_image(assemble_image(tmp_path, DOUBLE, optimize=True), max_cycles=100)
+
+    assert plain['registers']['ax'] == inlined['registers']['ax'] == 12
+    assert inlined['cycles'] < plain['cycles']
+
+
+@pytest.mark.parametrize('subroutine', [
+    # too long
+    'double:\n    add ax, ax\n    push acc\n    pop ax\n    inc ax\n    dec ax\n    ret',
+    # calls another subroutine
+    'double:\n    add ax, ax\n    call keep\n    ret\nkeep:\n    push acc\n    pop ax\n    ret',
+    # returns early
+    'double:\n    cmpi ax, 0\n    jie zero\n    add ax, ax\n    ret\nzero:\n    ret',
+])
+def test_subroutines_that_are_not_inlined(tmp_path, subroutine):
+    source = DOUBLE.split('double:')[0] + subroutine + '\n'
+    parsed_code = get_parsed_code_from_file(write_source(tmp_path, source))
+
+    assert not inline_subroutines(parsed_code)
+
+
+@pytest.mark.parametrize('ram_size_in_bytes, operations', [
+    # 8 bytes of .text and 8 of `double`: no free RAM at all
+    (16, ['ldi', 'call', 'call', 'hlt']),
+    # each inlined call grows .text by 4 bytes
+    (20, ['ldi', 'add', 'push', 'pop', 'call', 'hlt']),
+    (24, ['ldi', 'add', 'push', 'pop', 'add', 'push', 'pop', 'hlt']),
+])
+def test_calls_are_inlined_while_ram_is_free(tmp_path, ram_size_in_bytes, operations):
+    parsed_code = get_parsed_code_from_file(write_source(tmp_path, DOUBLE))
+    inline_subroutines(parsed_code, ram_size_in_bytes=ram_size_in_bytes)
+
+    assert [line['operation'] for line in parsed_code['text']] == operations
+
+
+def test_nothing_is_inlined_when_memory_is_accessed_through_registers(tmp_path):
+    source = DOUBLE.replace('    hlt', '    ldi bx, 200\n    st ax, [bx+0]\n    hlt')
+    parsed_code = get_parsed_code_from_file(write_source(tmp_path, source))
+
+    assert not inline_subroutines(parsed_code)
@@ -0,0 +1,90 @@
+import pytest
+
+from computer.computer import Computer
+from .utils import assemble_source
+
+CONTROLLER_ADDRESS = 100
+TIMER_ADDRESS = 108
+
+# a one-shot timer of 50 cycles, whose handler counts its ticks. Storing to the timer's counter register does
+# nothing, and loading it gives the cycles counted since the timer was started
+ONE_SHOT = '''
+section .data
+    ticks = 0
+
+section .text
+    ldi ax, tick
+    st ax, $100
+    ldi ax, 50
+    st ax, $108
+    ldi ax, 0
+    st ax, $109
+    ldi ax, 3
+    st ax, $110
+    ldi ax, 200
+    st ax, $111
+    ld ax, $111
+    ei
+    wfi
+    ld dx, ticks
+    hlt
+
+section .subroutines
+tick:
+    push bx
+    ld bx, ticks
+    inc bx
+    st bx, ticks
+    pop bx
+    iret
+'''
+
+
+def load(assembler) -> Computer:
+    computer = Computer(ram_size_in_bytes=assembler.ram_size_in_bytes)
+    computer.ram.from_list(assembler.assemble())
+    computer.map_interrupt_controller(CONTROLLER_ADDRESS)
+    computer.map_timer(TIMER_ADDRESS)
+    return computer
+
+
+@pytest.mark.parametrize('optimize', [False, True])
+def test_timer_interrupt_is_delivered(tmp_path, optimize):
+    computer = load(assemble_source(tmp_path, ONE_SHOT, optimize=optimize))
+    computer.run(max_cycles=1000)
+
+    registers = computer.registers()
+    assert computer.cpu.halt
+    assert registers['dx'] == 1
+    assert registers['ax'] < 200
+    assert computer.interrupt_controller.requested_interrupts == computer.interrupt_controller.serviced_interrupts == 1
+
+
+def test_wfi_skips_the_cycles_it_would_idle(tmp_path):
+    assembler = assemble_source(tmp_path, ONE_SHOT)
+    skipping = load(assembler)
+    skipping.run(max_cycles=1000)
+
+    # without `run`, a waiting CPU idles one cycle at a time
+    stepping = load(assembler)
+    while not stepping.cpu.halt:
+        stepping.cpu.cycle()
+
+    assert skipping.cpu.skipped_idle_cycles > 0
+    assert stepping.cpu.skipped_idle_cycles == 0
+    assert skipping.cycle_counter == stepping.cycle_counter
+    assert skipping.registers() == stepping.registers()
+
+
+def test_timer_requests_every_period(tmp_path):
+    computer = Computer()
+    controller = computer.map_interrupt_controller(CONTROLLER_ADDRESS)
+    timer = computer.map_timer(TIMER_ADDRESS, line=2)
+    timer.start(10)
+
+    controller.advance(25)
+    assert controller.pending_line() == 2
+    assert controller.requested_interrupts == 2
+    assert controller.cycles_until_next_event() == 0
+    controller.acknowledge(2)
+    assert controller.cycles_until_next_event() == 5
@@ -0,0 +1,112 @@
+import pytest
+
+from compiler.assembler import Assembler
+from compiler.errors import LinkerError
+from compiler.linker import Linker
+from compiler.object_file import ObjectFile, assemble_object
+from runner.batch import run_image
+from .utils import write_source
+
+MAIN = '''
+section .data
+    result = 0
+
+section .text
+    ldi bx, 3
+label loop:
+    call add_step
+    subi bx, 1
+    cmpi bx, 0
+    jne loop
+    ld ax, total
+    st ax, result
+    hlt
+'''
+
+# `loop` is also a label of MAIN: labels stay local to their file
+LIBRARY = '''
+section .data
+    total = 0
+    step = 4
+
+section .text
+label loop:
+    jmp loop
+
+section .subroutines
+add_step:
+    ld ax, total
+    ld dx, step
+    add ax, dx
+    push acc
+    pop ax
+    st ax, total
+    ret
+'''
+
+
+def link(tmp_path, ram_size_in_bytes: int = 256, **options) -> Linker:
+    objects = [
+        assemble_object(write_source(tmp_path, source, name), ram_size_in_bytes=ram_size_in_bytes, **options)
+        for name, source in (('main.asm', MAIN), ('library.asm', LIBRARY))
+    ]
+    return Linker(objects, ram_size_in_bytes=ram_size_in_bytes)
+
+
+@pytest.mark.parametrize('ram_size_in_bytes', [256, 65536])
+@pytest.mark.parametrize('compact_encoding', [False, True])
+def test_objects_call_each_other(tmp_path, compact_encoding, ram_size_in_bytes):
+    linker = link(tmp_path, ram_size_in_bytes, compact_encoding=compact_encoding)
+    main, library = linker.objects
+    result = run_image(
+        linker.link(), max_cycles=1000, compact_encoding=compact_encoding, source_map=linker.get_source_map()
+    )
+
+    assert main.undefined_symbols == ['add_step', 'total']
+    assert library.undefined_symbols == []
+    assert result['halted']
+    assert result['registers']['ax'] == 12
+    # the library's `.text` follows main's, and each object sees its own `loop`
+    assert linker.bases[1]['.text'] == main.section_size('.text')
+    assert linker.get_symbol_address('loop', 1) == linker.bases[1]['.text']
+    assert linker.get_symbol_address('loop', 0) < linker.bases[1]['.text']
+    source_map = linker.get_source_map()
+    assert source_map.lookup(linker.get_symbol_address('result', 0)).label == 'result'
+    assert source_map.lookup(linker.get_symbol_address('add_step', 0)).file == library.file
+
+
+@pytest.mark.parametrize('ram_size_in_bytes', [256, 65536])
+@pytest.mark.parametrize('compact_encoding', [False, True])
+def test_single_object_links_like_direct_assembly(tmp_path, compact_encoding, ram_size_in_bytes):
+    path = write_source(tmp_path, LIBRARY.replace('    jmp loop', '    call add_step\n    hlt'))
+    options = {'compact_encoding': compact_encoding, 'ram_size_in_bytes': ram_size_in_bytes}
+    linker = Linker([assemble_object(path, **options)], ram_size_in_bytes=ram_size_in_bytes)
+    assembler = Assembler(path, **options)
+
+    assert linker.link() == assembler.assemble()
+    assert linker.get_source_map().to_dict() == assembler.get_source_map().to_dict()
+
+
+def test_saved_objects_link_the_same(tmp_path):
+    linker = link(tmp_path)
+    paths = [str(tmp_path / f'{index}.obj') for index in range(2)]
+    for path, object_file in zip(paths, linker.objects):
+        object_file.save(path)
+
+    assert Linker([ObjectFile.load(path) for path in paths]).link() == linker.link()
+
+
+def test_link_errors(tmp_path):
+    main = assemble_object(write_source(tmp_path, MAIN, 'main.asm'))
+    library = assemble_object(write_source(tmp_path, LIBRARY, 'library.asm'))
+
+    with pytest.raises(LinkerError, match='Undefined symbol "add_step"'):
+        Linker([main]).link()
+    with pytest.raises(LinkerError, match='"add_step" is defined in both'):
+        Linker([main, library, library])
+    with pytest.raises(LinkerError, match='same instruction encoding'):
+        Linker([main, assemble_object(write_source(tmp_path, LIBRARY, 'compact.asm'), compact_encoding=True)])
+    with pytest.raises(LinkerError, match='byte addresses'):
+        Linker([main, library], ram_size_in_bytes=65536)
+    with pytest.raises(LinkerError, match='the RAM only has'):
+        Linker([main, library], ram_size_in_bytes=40)
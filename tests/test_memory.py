@@ -0,0 +1,100 @@
+import pytest
+
+from computer.computer import Computer
+from computer.memory import PagedMemory, RandomAccessMemory
+from .utils import assemble_image
+
+
+def test_unmapped_pages_read_as_zeros():
+    memory = PagedMemory(1024, page_size_in_bytes=256)
+
+    assert memory[300] == 0
+    assert memory[0:16] == bytearray(16)
+    assert memory.unmapped_reads == 17
+    assert memory.mapped_pages() == {}
+
+
+def test_slices_cross_page_boundaries():
+    memory = PagedMemory(1024, page_size_in_bytes=256)
+    memory[250:262] = bytes(range(1, 13))
+
+    assert sorted(memory.mapped_pages()) == [0, 1]
+    assert memory[250:262] == bytearray(range(1, 13))
+    assert memory[255] == 6
+    assert memory[256] == 7
+    assert memory[248:264:4] == bytearray([0, 3, 7, 11])
+    assert list(memory)[250:262] == list(range(1, 13))
+
+
+def test_zeros_do_not_allocate_pages():
+    memory = PagedMemory(1024, page_size_in_bytes=256)
+    memory[700] = 0
+    memory[0:512] = bytes(512)
+    assert memory.mapped_pages() == {}
+
+    memory[700] = 5
+    memory[700] = 0
+    assert sorted(memory.mapped_pages()) == [2]
+
+
+def test_resizing_and_bad_page_sizes_are_refused():
+    with pytest.raises(ValueError):
+        PagedMemory(1024, page_size_in_bytes=100)
+    with pytest.raises(ValueError):
+        PagedMemory(1000, page_size_in_bytes=256)
+    with pytest.raises(ValueError):
+        PagedMemory(1024)[0:4] = b'\x01'
+
+
+def test_page_stats():
+    ram = RandomAccessMemory(65536, page_size_in_bytes=256)
+    ram.memory[0x1234] = 1
+    ram.memory[0x1235] = 2
+    ram.memory[0xFFFF] = 3
+    ram.memory[0x8000]
+
+    assert ram.is_paged
+    assert ram.get_page_stats() == {
+        'page_size': 256,
+        'pages': 256,
+        'mapped_pages': 2,
+        'mapped_bytes': 512,
+        'unmapped_reads': 1,
+    }
+    assert RandomAccessMemory(256).get_page_stats() is None
+
+
+def test_program_runs_the_same_on_a_paged_ram(tmp_path):
+    source = '''
+section .data
+    first = 7
+    second = 9
+    copy = 0
+    total = 0
+
+section .text
+    ldi bx, second
+    ld ax, [bx+1]
+    ldi dx, copy
+    ldi cx, 1
+    memcpy dx, bx
+    ld cx, copy
+    push cx
+    pop dx
+    add ax, dx
+    st ax, total
+    ld ax, total
+    hlt
+'''
+    image = assemble_image(tmp_path, source, ram_size_in_bytes=65536)
+    results = []
+    for page_size_in_bytes in (None, 256):
+        computer = Computer(ram_size_in_bytes=65536, ram_page_size_in_bytes=page_size_in_bytes)
+        computer.ram.from_list(image)
+        computer.run(max_cycles=1000)
+        results.append((computer.registers(), computer.cycle_counter, bytes(computer.ram.memory[0:512])))
+
+    assert results[0] == results[1]
+    assert results[0][0]['dx'] == 9
+    # the code and variables, and the stack at the top of the RAM
+    assert computer.ram.get_page_stats()['mapped_pages'] == 2
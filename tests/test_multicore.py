@@ -0,0 +1,87 @@
+import pytest
+
+from compiler.errors import CompilerError
+from computer.multicore import MultiCoreComputer
+from .utils import assemble_source
+
+# every core adds 5 to the shared counter, one locked increment at a time
+LOCKED_COUNTER = '''
+section .data
+    lock = 0
+    counter = 0
+
+section .text
+    ldi cx, 5
+label acquire:
+    tas dx, lock
+    cmpi dx, 0
+    jne acquire
+    ld ax, counter
+    inc ax
+    st ax, counter
+    ldi dx, 0
+    st dx, lock
+    subi cx, 1
+    cmpi cx, 0
+    jne acquire
+    hlt
+'''
+
+
+def run_cores(assembler, core_count: int) -> MultiCoreComputer:
+    computer = MultiCoreComputer(core_count, source_map=assembler.get_source_map())
+    computer.ram.from_list(assembler.assemble())
+    steps = []
+    for core in computer.cores:
+        def cycle(core=core, cycle=core.cycle):
+            steps.append(core.core_id)
+            cycle()
+        core.cycle = cycle
+    computer.steps = steps
+    computer.run(max_cycles=10000)
+    return computer
+
+
+@pytest.mark.parametrize('core_count', [2, 3])
+def test_cores_share_a_counter_under_a_lock(tmp_path, core_count):
+    assembler = assemble_source(tmp_path, LOCKED_COUNTER, stack_size_in_bytes=0)
+    computer = run_cores(assembler, core_count)
+
+    counter_address = next(
+        address for address in computer.source_map.addresses_of_section('.data')
+        if computer.source_map.lookup(address).label == 'counter'
+    )
+    assert all(core.halt for core in computer.cores)
+    assert computer.ram.memory[counter_address] == 5 * core_count
+    stats = computer.get_contention_stats()
+    assert stats['test_and_sets'] >= 5 * core_count
+    assert stats['busy_cycles'] == sum(core.cycle_counter for core in computer.cores)
+
+
+def test_cores_take_turns_in_a_repeatable_order(tmp_path):
+    assembler = assemble_source(tmp_path, LOCKED_COUNTER, stack_size_in_bytes=0)
+    first, second = run_cores(assembler, 2), run_cores(assembler, 2)
+
+    assert first.steps == second.steps
+    assert first.get_core_stats() == second.get_core_stats()
+    # the core furthest behind goes next, core 0 on a tie
+    assert first.steps[:2] == [0, 1]
+
+
+def test_id_register_is_read_only_per_core(tmp_path):
+    source = '''
+section .text
+    ldi ax, 9
+    push ax
+    pop id
+    push id
+    pop bx
+    hlt
+'''
+    assembler = assemble_source(tmp_path, source, stack_size_in_bytes=48)
+    computer = run_cores(assembler, 3)
+
+    assert [core.register_B.value for core in computer.cores] == [0, 1, 2]
+    assert [core.core_id_register.value for core in computer.cores] == [0, 1, 2]
+    with pytest.raises(CompilerError):
+        assemble_source(tmp_path, 'section .text\n    ldi id, 7\n    hlt\n').assemble()
@@ -0,0 +1,76 @@
+import pytest
+
+from computer.computer import Computer
+from computer.network import Network
+from .utils import assemble_image
+
+MAILBOX_ADDRESS = 108
+
+# sends 42 to node 1, then loads the data register back: its own inbox is empty, so that gives 0
+SENDER = '''
+section .text
+    ldi ax, 1
+    st ax, $108
+    ldi ax, 0
+    st ax, $109
+    ldi ax, 42
+    st ax, $110
+    ld ax, $110
+    hlt
+'''
+
+# polls the received count until the byte is there, then takes it and who it came from
+RECEIVER = '''
+section .text
+label poll:
+    ld ax, $111
+    cmpi ax, 0
+    jie poll
+    ld cx, $114
+    ld dx, $110
+    hlt
+'''
+
+
+def build_network(directory, optimize: bool) -> Network:
+    network = Network(latency_in_cycles=8, batch_in_cycles=4)
+    for source in (SENDER, RECEIVER):
+        computer = Computer()
+        computer.ram.from_list(assemble_image(directory, source, optimize=optimize))
+        network.add_computer(computer, MAILBOX_ADDRESS)
+    return network
+
+
+@pytest.mark.parametrize('optimize', [False, True])
+def test_message_is_sent_and_polled(tmp_path, optimize):
+    network = build_network(tmp_path, optimize)
+    network.run(until=1000)
+
+    sender, receiver = network.computers
+    assert sender.registers()['ax'] == 0
+    assert receiver.registers()['dx'] == 42
+    assert receiver.registers()['cx'] == 0
+    stats = network.get_stats()
+    assert stats['halted'] == 2
+    assert stats['sent_bytes'] == stats['delivered_bytes'] == 1
+
+
+def test_bytes_arrive_after_the_latency(tmp_path):
+    network = build_network(tmp_path, optimize=False)
+    network.run(until=1000)
+
+    sender, receiver = network.computers
+    # the receiver can't see the byte before the sender's store plus the latency
+    assert receiver.cycle_counter >= 6 + network.latency_in_cycles
+    assert network.mailboxes[1].received_bytes == 1
+    assert network.mailboxes[0].sent_bytes == 1
+
+
+def test_bytes_to_unknown_nodes_are_counted(tmp_path):
+    network = Network()
+    computer = Computer()
+    computer.ram.from_list(assemble_image(tmp_path, SENDER.replace('ldi ax, 1\n', 'ldi ax, 9\n')))
+    network.add_computer(computer, MAILBOX_ADDRESS)
+    network.run()
+
+    assert network.get_stats()['undeliverable_bytes'] == 1
@@ -0,0 +1,149 @@
+from typing import Dict
+
+from compiler.optimizer import peephole
+from compiler.parser import get_parsed_code_from_file
+from computer.computer import Computer
+from .utils import assemble_source, listing, write_source
+
+
+def optimize_source(directory, source: str) -> Dict:
+    parsed_code = get_parsed_code_from_file(write_source(directory, source))
+    while peephole(parsed_code):
+        pass
+    return parsed_code
+
+
+def test_load_after_store_of_the_same_register_is_dropped(tmp_path):
+    parsed_code = optimize_source(tmp_path, '''
+section .data
+    counter = 0
+
+section .text
+    ldi ax, 4
+    st ax, counter
+    ld ax, counter
+    st ax, counter
+    ld bx, counter
+    st ax, $200
+    ld ax, $200
+    hlt
+''')
+
+    assert listing(parsed_code['text']) == [
+        'ldi ax, 4',
+        'st ax, counter',
+        'st ax, counter',
+        'ld bx, counter',
+        'st ax, $200',
+        'ld ax, $200',
+        'hlt',
+    ]
+
+
+def test_jumps_are_threaded_and_dead_jumps_removed(tmp_path):
+    parsed_code = optimize_source(tmp_path, '''
+section .text
+    ldi ax, 3
+label loop:
+    subi ax, 1
+    cmpi ax, 0
+    jne trampoline
+    jmp done
+label trampoline:
+    jmp loop
+label done:
+    hlt
+''')
+
+    # `jne` goes straight to `loop`, the `jmp done` falls through, and the trampoline's `jmp` is unreachable
+    assert listing(parsed_code['text']) == [
+        'ldi ax, 3',
+        'label loop:',
+        'subi ax, 1',
+        'cmpi ax, 0',
+        'jne loop',
+        'label trampoline:',
+        'label done:',
+        'hlt',
+    ]
+
+
+def test_code_after_jmp_is_kept_from_the_next_used_label(tmp_path):
+    parsed_code = optimize_source(tmp_path, '''
+section .text
+    jmp skip
+    ldi ax, 1
+label unused:
+    ldi ax, 2
+label skip:
+    ldi ax, 3
+    hlt
+''')
+
+    assert listing(parsed_code['text']) == ['label unused:', 'label skip:', 'ldi ax, 3', 'hlt']
+
+
+def test_call_before_ret_becomes_a_jump(tmp_path):
+    parsed_code = optimize_source(tmp_path, '''
+section .text
+    call outer
+    hlt
+
+section .subroutines
+outer:
+    inc ax
+    call inner
+    ret
+inner:
+    inc ax
+    ret
+''')
+
+    assert [listing(subroutine['lines']) for subroutine in parsed_code['subroutines']] == [
+        ['inc ax', 'jmp inner'],
+        ['inc ax', 'ret'],
+    ]
+
+
+def test_peephole_program_computes_the_same_in_fewer_cycles(tmp_path):
+    source = '''
+section .data
+    total = 0
+
+section .text
+    ldi ax, 0
+    ldi bx, 5
+label loop:
+    call add_two
+    st ax, total
+    ld ax, total
+    subi bx, 1
+    cmpi bx, 0
+    jne next
+    jmp done
+label next:
+    jmp loop
+label done:
+    hlt
+
+section .subroutines
+add_two:
+    inc ax
+    call add_one
+    ret
+add_one:
+    inc ax
+    ret
+'''
+    results = []
+    for optimize in (False, True):
+        assembler = assemble_source(tmp_path, source, optimize=optimize)
+        computer = Computer()
+        computer.ram.from_list(assembler.assemble())
+        computer.run(max_cycles=1000)
+        assert computer.cpu.halt
+        results.append((computer.cycle_counter, computer.registers()['ax']))
+
+    (cycles, total), (optimized_cycles, optimized_total) = results
+    assert total == optimized_total == 10
+    assert optimized_cycles < cycles
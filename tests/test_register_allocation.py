@@ -0,0 +1,145 @@
+from typing import Dict, Tuple
+
+import pytest
+
+from compiler.optimizer import allocate_registers, get_live_registers
+from compiler.parser import get_parsed_code_from_file
+from computer.computer import Computer
+from .utils import assemble_source, listing, write_source
+
+COUNT = '''
+section .data
+    counter = 0
+    limit = 5
+    total = 100
+
+section .text
+    ld bx, limit
+label loop:
+    ld ax, counter
+    inc ax
+    st ax, counter
+    ld ax, total
+    dec ax
+    st ax, total
+    ld ax, counter
+    cmp ax, bx
+    jne loop
+    ldi ax, 0
+    ldi cx, 0
+    ldi dx, 0
+    hlt
+'''
+
+
+def allocate(directory, source: str) -> Dict:
+    parsed_code = get_parsed_code_from_file(write_source(directory, source))
+    while allocate_registers(parsed_code):
+        pass
+    return parsed_code
+
+
+def run_variables(assembler, compact_encoding: bool) -> Tuple[int, Dict[str, int]]:
+    """Runs the program to its `hlt`. Returns the cycles it took and the final value of each variable."""
+    source_map = assembler.get_source_map()
+    computer = Computer(compact_encoding=compact_encoding)
+    computer.ram.from_list(assembler.assemble())
+    computer.run(max_cycles=1000)
+    assert computer.cpu.halt
+    return computer.cycle_counter, {
+        source_map.lookup(address).label: computer.ram.memory[address]
+        for address in source_map.addresses_of_section('.data')
+    }
+
+
+def test_hot_variables_stay_in_spare_registers(tmp_path):
+    parsed_code = allocate(tmp_path, COUNT)
+
+    assert listing(parsed_code['text']) == [
+        'ld bx, limit',
+        'ld cx, counter',
+        'ld dx, total',
+        'label loop:',
+        'inc cx',
+        'dec dx',
+        'cmp cx, bx',
+        'jne loop',
+        'st dx, total',
+        'st cx, counter',
+        'ldi ax, 0',
+        'ldi cx, 0',
+        'ldi dx, 0',
+        'hlt',
+    ]
+
+
+def test_variable_is_not_promoted_while_its_register_is_read_after_the_loop(tmp_path):
+    # `hlt` reads every register, so the last `ld ax, counter` must still leave the value in ax
+    parsed_code = allocate(tmp_path, COUNT.replace('    ldi ax, 0\n', ''))
+    body = listing(parsed_code['text'])
+
+    assert 'ld ax, counter' in body and 'st ax, counter' in body
+    assert 'ld ax, total' not in body and 'dec dx' in body
+
+
+def test_variables_the_loop_only_reads_are_not_stored_back(tmp_path):
+    parsed_code = allocate(tmp_path, '''
+section .data
+    step = 2
+
+section .text
+    ldi ax, 0
+    ldi bx, 10
+label loop:
+    ld dx, step
+    add ax, dx
+    push acc
+    pop ax
+    cmp ax, bx
+    jne loop
+    ldi cx, 0
+    ldi dx, 0
+    hlt
+''')
+
+    assert listing(parsed_code['text'])[:7] == [
+        'ldi ax, 0', 'ldi bx, 10', 'ld cx, step', 'label loop:', 'add ax, cx', 'push acc', 'pop ax'
+    ]
+    assert [line for line in listing(parsed_code['text']) if line.startswith('st ')] == []
+
+
+@pytest.mark.parametrize('compact_encoding', [False, True])
+def test_allocated_program_computes_the_same_in_fewer_cycles(tmp_path, compact_encoding):
+    cycles, variables = run_variables(
+        assemble_source(tmp_path, COUNT, compact_encoding=compact_encoding), compact_encoding
+    )
+    optimized_cycles, optimized_variables = run_variables(
+        assemble_source(tmp_path, COUNT, compact_encoding=compact_encoding, optimize=True), compact_encoding
+    )
+
+    assert variables == optimized_variables == {'counter': 5, 'limit': 5, 'total': 95}
+    assert optimized_cycles < cycles
+
+
+@pytest.mark.parametrize('reason, edit', [
+    ('a handler may change the variables', ('    ld bx, limit\n', '    ei\n    ld bx, limit\n')),
+    ('an indexed access may reach the variables', ('    dec ax\n', '    dec ax\n    ld cx, [bx+0]\n')),
+    ('a device may own a $n address', ('    dec ax\n', '    dec ax\n    st ax, $200\n')),
+    ('a call may use every register', ('    dec ax\n', '    dec ax\n    call nothing\n')),
+])
+def test_loops_that_are_left_alone(tmp_path, reason, edit):
+    subroutines = '\nsection .subroutines\nnothing:\n    ret\n'
+    assert allocate_registers(get_parsed_code_from_file(write_source(tmp_path, COUNT + subroutines)))
+
+    parsed_code = get_parsed_code_from_file(write_source(tmp_path, COUNT.replace(*edit) + subroutines))
+    assert not allocate_registers(parsed_code), reason
+
+
+def test_live_registers(tmp_path):
+    text = get_parsed_code_from_file(write_source(tmp_path, COUNT))['text']
+    live_registers = get_live_registers(text)
+
+    # only bx, the loop bound, is live across the whole loop
+    assert live_registers[1] == {'bx'}
+    assert live_registers[-1] == set()
+    assert live_registers[-2] == {'ax', 'bx', 'cx', 'dx'}
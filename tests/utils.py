@@ -0,0 +1,29 @@
+import os
+from typing import Dict, List
+
+from compiler.assembler import Assembler
+
+
+def write_source(directory, source: str, name: str = 'program.asm') -> str:
+    """Writes assembly source to a file in `directory`, for the compiler to read it from. Returns its path."""
+    path = os.path.join(str(directory), name)
+    with open(path, 'w') as file:
+        file.write(source)
+    return path
+
+
+def assemble_source(directory, source: str, **assembler_options) -> Assembler:
+    return Assembler(write_source(directory, source), **assembler_options)
+
+
+def assemble_image(directory, source: str, **assembler_options) -> List[str]:
+    return assemble_source(directory, source, **assembler_options).assemble()
+
+
+def listing(lines: List[Dict]) -> List[str]:
+    """Each instruction written back as its source line."""
+    result = []
+    for line in lines:
+        statements = ', '.join(filter(None, (line['first_statement'], line['second_statement'])))
+        result.append(f"{line['operation']} {statements}".strip())
+    return result
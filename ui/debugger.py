@@ -1,35 +1,28 @@
 import tkinter as tk
+from typing import Optional
 
-from compiler.operation_compiler import OperationCompiler
-from computer.base import Bit
+from compiler.disassembler import get_opcode_name
 from computer.computer import Computer
 from computer.memory import Register
+from computer.source_map import SourceMap
 from computer.status import StatusEmitter
 
 
-def run(ram_data):
+def run(ram_data, source_map: Optional[SourceMap] = None):
     def generate_label(text, register):
         label = tk.Label(root, text=f'{text}: 00000000 (0)')
         emitter.on_cpu_update(lambda event, cpu: label.config(
             text=f'{text}: {register}'))
         label.pack()
 
-    def get_operation_from_opcode(operation_compiler: OperationCompiler, register: Register) -> str:
-        instructions = {v: k for k, v in operation_compiler.opcodes.items()}
-        register.read_enable = Bit(1)
-        try:
-            result: str = instructions[str(register.memory)]
-        except KeyError:
-            result = ''
-        register.read_enable = Bit(0)
-        return result
+    def get_operation_from_opcode(register: Register) -> str:
+        return get_opcode_name(register.value) or ''
 
     root = tk.Tk()
     root.title("8 bit computer")
     root.geometry("300x400")
 
-    oc = OperationCompiler()
-    pc = Computer()
+    pc = Computer(source_map=source_map, ram_size_in_bytes=len(ram_data))
     pc.ram.from_list(ram_data)
     emitter = StatusEmitter(pc.cpu)
     phase_generator = pc.cpu.next_phase()
@@ -41,14 +34,19 @@ def run(ram_data):
 
     generate_label('program_counter_register', pc.cpu.program_counter_register)
 
-    instruction_register_text = f'instruction_register "{get_operation_from_opcode(oc, pc.cpu.instruction_register)}"'
+    if source_map is not None:
+        source_location = tk.Label(root, text=f'source: {pc.source_location()}')
+        emitter.on_cpu_update(lambda event, cpu: source_location.config(text=f'source: {pc.source_location()}'))
+        source_location.pack()
+
+    instruction_register_text = f'instruction_register "{get_operation_from_opcode(pc.cpu.instruction_register)}"'
     instruction_register = tk.Label(root,
                                     text=instruction_register_text)
     emitter.on_cpu_update(lambda event, cpu: instruction_register.config(
-        text=f'instruction_register "{get_operation_from_opcode(oc, pc.cpu.instruction_register)}": {pc.cpu.instruction_register}'))
+        text=f'instruction_register "{get_operation_from_opcode(pc.cpu.instruction_register)}": {pc.cpu.instruction_register}'))
     instruction_register.pack()
 
-    # generate_label(f'instruction_register "{get_operation_from_opcode(oc, pc.cpu.instruction_register)}"',
+    # generate_label(f'instruction_register "{get_operation_from_opcode(pc.cpu.instruction_register)}"',
     #                pc.cpu.instruction_register)
 
     generate_label('address_register', pc.cpu.address_register)